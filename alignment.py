@@ -0,0 +1,205 @@
+import difflib
+import functools
+import html
+import re
+import unicodedata
+
+# ----------------- ALINHAMENTO TOLERANTE A OCR (GRÁFICA x ARTE) -----------------
+# Quando um dos lados da página 3 vem de imagem (curvas/scan), o texto é uma transcrição
+# e traz ruído típico de OCR: "rn" no lugar de "m", acento perdido, vírgula virando ponto.
+# Um diff exato pinta tudo isso de amarelo. Aqui o diff é feito em dois passos:
+#
+#   1. SequenceMatcher sobre os tokens já normalizados (sem acento, confusões de OCR
+#      desfeitas) ancora tudo o que bate;
+#   2. só nos trechos que sobram roda uma distância de edição em banda, token a token,
+#      que também aceita junções ("medica mento" x "medicamento").
+#
+# Cada par alinhado é classificado. Só é RUÍDO (pontilhado, não conta como divergência) a
+# diferença que o OCR explica: confusões de CONFUSOES_OCR, acento perdido, pontuação nas
+# pontas e palavra partida ou colada. Palavras apenas parecidas são DIVERGÊNCIA (amarelo):
+# "hipertensão" x "hipotensão", "adulto" x "adultos" mudam o sentido da bula. Números,
+# doses/unidades e negações também. Com tolerante=False só é igual o que for idêntico —
+# o mesmo critério de um diff exato.
+
+BANDA = 3                 # Folga da banda além da diferença de tamanho do trecho
+CUSTO_JUNCAO = 0.3        # Um pouco acima do ruído 1 x 1, para que empates prefiram o par simples
+LIMITE_CELULAS = 200_000  # Trechos maiores que isso (em células da banda) são marcados inteiros
+
+CLASSE_DIVERGENCIA = "highlight-yellow"
+CLASSE_RUIDO = "highlight-ocr"
+
+NEGACOES = {"nao", "nunca", "jamais", "nem", "nenhum", "nenhuma", "sem", "exceto"}
+UNIDADES = {"mg", "mcg", "µg", "ug", "g", "kg", "ml", "l", "ui", "mmol", "meq", "h", "%"}
+
+# Confusões clássicas de OCR, aplicadas só ao que não é número (números são críticos)
+# (primeiro as de um caractere, para "inc1uem" virar "incluem" antes de "cl" -> "d")
+CONFUSOES_OCR = (("1", "l"), ("0", "o"), ("|", "l"), ("rn", "m"), ("cl", "d"), ("vv", "w"), ("ii", "u"), ("li", "h"))
+
+SPAN_RE = re.compile(r'</?span\b[^>]*>', re.IGNORECASE)
+MARCACAO_RE = re.compile(r'<[^>]+>|\*\*')
+PONTUACAO_RE = re.compile(r'^[^\w%]+|[^\w%]+$')
+# Número, com ou sem unidade colada ("500", "0,5", "1/2", "500mg", "10%"); "s0dio" não é número
+NUMERO_RE = re.compile(r'[\d.,/x-]*\d[\d.,/x-]*(?:mg|mcg|µg|ug|g|kg|ml|l|ui|mmol|meq|h|%)?')
+
+IGUAL, RUIDO, TROCA = "igual", "ruido", "troca"
+
+
+# ----------------- TOKENS -----------------
+
+def _sem_acentos(texto):
+    return "".join(c for c in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(c))
+
+def _limpo(token):
+    """Token sem tags/markdown — o que de fato está escrito."""
+    return MARCACAO_RE.sub("", token)
+
+def _chave(token):
+    """Forma normalizada usada na ancoragem: sem acento, minúscula, sem pontuação nas pontas e sem confusões de OCR."""
+    base = PONTUACAO_RE.sub("", _sem_acentos(_limpo(token)).lower())
+    if NUMERO_RE.fullmatch(base): return base
+    for errado, certo in CONFUSOES_OCR:
+        base = base.replace(errado, certo)
+    return base
+
+def _critico(base):
+    return bool(NUMERO_RE.fullmatch(base)) or base in NEGACOES or base in UNIDADES
+
+def tokenizar(texto):
+    """[(token, quebra_antes)] preservando as quebras de linha do texto original."""
+    tokens = []
+    for linha in (texto or "").split("\n"):
+        for i, token in enumerate(linha.split()):
+            tokens.append((token, i == 0 and bool(tokens)))
+    return tokens
+
+
+# ----------------- CLASSIFICAÇÃO -----------------
+
+@functools.lru_cache(maxsize=65536)
+def classificar(ref, cand, tolerante=True):
+    """IGUAL, RUIDO ou TROCA para um par de tokens alinhados."""
+    limpo_ref, limpo_cand = _limpo(ref), _limpo(cand)
+    if limpo_ref == limpo_cand: return IGUAL
+    if not tolerante: return TROCA
+    base_ref = PONTUACAO_RE.sub("", _sem_acentos(limpo_ref).lower())
+    base_cand = PONTUACAO_RE.sub("", _sem_acentos(limpo_cand).lower())
+    if not base_ref and not base_cand: return RUIDO  # Só pontuação trocada ("," x ".")
+    # Só acento, pontuação nas pontas e as confusões de OCR ("rncg" x "mcg", "nã0" x "não")
+    # podem variar. Semelhança aproximada não basta: "hipotensão" x "hipertensão" é troca
+    return RUIDO if _chave(ref) == _chave(cand) else TROCA
+
+def _insercao_irrelevante(token, tolerante):
+    """Pontuação solta que o OCR inventou ou perdeu."""
+    return tolerante and not PONTUACAO_RE.sub("", _limpo(token))
+
+
+# ----------------- DISTÂNCIA DE EDIÇÃO EM BANDA -----------------
+
+def _custo(classe):
+    return {IGUAL: 0.0, RUIDO: 0.2, TROCA: 1.0}[classe]
+
+def _juntavel(*tokens):
+    """Números nunca são colados a outra palavra para fechar um alinhamento."""
+    return not any(_critico(PONTUACAO_RE.sub("", _sem_acentos(_limpo(t)).lower())) for t in tokens)
+
+def _alinhar_trecho(a, b, tolerante):
+    """
+    Alinha a[] x b[] (tokens da referência e do candidato) por programação dinâmica só
+    dentro da banda |i - j| <= |m - n| + BANDA. Devolve [(classe, i, j, n_ref, n_cand)].
+    """
+    m, n = len(a), len(b)
+    largura = abs(m - n) + BANDA
+    if (m + 1) * (2 * largura + 1) > LIMITE_CELULAS:
+        return [(TROCA, 0, 0, m, n)]
+
+    infinito = float("inf")
+    custo = {(0, 0): 0.0}
+    volta = {}
+
+    def relaxar(i, j, valor, origem):
+        if abs(i - j) <= largura and valor < custo.get((i, j), infinito):
+            custo[(i, j)] = valor
+            volta[(i, j)] = origem
+
+    for i in range(m + 1):
+        for j in range(max(0, i - largura), min(n, i + largura) + 1):
+            atual = custo.get((i, j))
+            if atual is None: continue
+            if i < m:
+                relaxar(i + 1, j, atual + (0.2 if _insercao_irrelevante(a[i], tolerante) else 1.0), (i, j, "remove", 1, 0))
+            if j < n:
+                relaxar(i, j + 1, atual + (0.2 if _insercao_irrelevante(b[j], tolerante) else 1.0), (i, j, "insere", 0, 1))
+            if i < m and j < n:
+                classe = classificar(a[i], b[j], tolerante)
+                relaxar(i + 1, j + 1, atual + _custo(classe), (i, j, classe, 1, 1))
+                if tolerante:
+                    # Palavra partida ou colada pelo OCR: 1 token de um lado = 2 do outro
+                    if j + 1 < n and _juntavel(b[j], b[j + 1]) and classificar(a[i], _limpo(b[j]) + _limpo(b[j + 1])) != TROCA:
+                        relaxar(i + 1, j + 2, atual + CUSTO_JUNCAO, (i, j, RUIDO, 1, 2))
+                    if i + 1 < m and _juntavel(a[i], a[i + 1]) and classificar(_limpo(a[i]) + _limpo(a[i + 1]), b[j]) != TROCA:
+                        relaxar(i + 2, j + 1, atual + CUSTO_JUNCAO, (i, j, RUIDO, 2, 1))
+
+    passos, posicao = [], (m, n)
+    while posicao != (0, 0):
+        i, j, classe, n_ref, n_cand = volta[posicao]
+        if classe == "remove":
+            classe = RUIDO if _insercao_irrelevante(a[i], tolerante) else "remove"
+        elif classe == "insere":
+            classe = RUIDO if _insercao_irrelevante(b[j], tolerante) else "insere"
+        passos.append((classe, i, j, n_ref, n_cand))
+        posicao = (i, j)
+    return passos[::-1]
+
+
+# ----------------- DIFF -----------------
+
+def alinhar_tolerante(texto_ref, texto_cand, tolerante=True):
+    """
+    Diff do candidato contra a referência. Devolve (html do candidato, divergente, ruídos):
+    divergências reais em amarelo, ruído de OCR pontilhado (com a leitura da referência
+    no title). Marcações <span> que já vierem no candidato (do modelo) são descartadas.
+    """
+    ref = [t for t, _ in tokenizar(SPAN_RE.sub("", texto_ref or ""))]
+    cand = tokenizar(SPAN_RE.sub("", texto_cand or ""))
+    tokens_cand = [t for t, _ in cand]
+
+    matcher = difflib.SequenceMatcher(None, [_chave(t) for t in ref], [_chave(t) for t in tokens_cand], autojunk=False)
+    marcas = [None] * len(cand)   # Classe e leitura da referência por token do candidato
+    removidos = {}                # Posição no candidato -> tokens da referência que faltam ali
+    divergente, ruidos = False, 0
+
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            # Mesma chave normalizada: igual de fato, ou ruído (acento/confusão de OCR)
+            for k in range(j2 - j1):
+                classe = classificar(ref[i1 + k], tokens_cand[j1 + k], tolerante)
+                if classe != IGUAL: marcas[j1 + k] = (classe, ref[i1 + k])
+            continue
+        for classe, i, j, n_ref, n_cand in _alinhar_trecho(ref[i1:i2], tokens_cand[j1:j2], tolerante):
+            if classe == IGUAL: continue
+            if not n_cand:
+                # Texto da referência que sumiu do candidato: aparece riscado no lugar
+                if classe != RUIDO: removidos.setdefault(j1 + j, []).extend(ref[i1 + i:i1 + i + n_ref])
+                continue
+            leitura = " ".join(ref[i1 + i:i1 + i + n_ref])
+            for k in range(n_cand):
+                marcas[j1 + j + k] = (RUIDO if classe == RUIDO else TROCA, leitura)
+
+    # Tokens vizinhos com divergência viram um único destaque amarelo
+    partes, em_troca = [], False
+    for posicao, ((token, quebra), marca) in enumerate(zip(cand + [("", False)], marcas + [None])):
+        troca = marca is not None and marca[0] == TROCA
+        if em_troca and (not troca or posicao in removidos): partes.append("</span>")
+        if partes: partes.append("\n" if quebra else " ")
+        if posicao in removidos:
+            divergente, em_troca = True, False
+            partes.append(f'<span class="{CLASSE_DIVERGENCIA}"><s>{" ".join(removidos[posicao])}</s></span> ')
+        if troca and not em_troca: partes.append(f'<span class="{CLASSE_DIVERGENCIA}">')
+        if marca is not None and marca[0] == RUIDO:
+            ruidos += 1
+            partes.append(f'<span class="{CLASSE_RUIDO}" title="Arte: {html.escape(marca[1], quote=True)}">{token}</span>')
+        else:
+            partes.append(token)
+        divergente = divergente or troca
+        em_troca = troca
+    return "".join(partes).strip(), divergente, ruidos
@@ -0,0 +1,76 @@
+import re
+import unicodedata
+
+# ----------------- DATA DE APROVAÇÃO ANVISA -----------------
+# A frase procurada é "... aprovada pela Anvisa em DD/MM/AAAA".
+# Em vez de um regex com ".*?" (que retrocede muito em textos longos sem a frase),
+# percorremos os tokens UMA vez com um pequeno autômato: cada token custa O(1).
+
+NAO_ENCONTRADA = "Não encontrada"
+
+# Sequência de âncoras (já normalizadas) que precisa aparecer antes da data
+ANCORAS = ("aprovada", "pela", "anvisa", "em")
+
+# Quantos tokens "estranhos" toleramos entre uma âncora e a próxima
+MAX_SALTOS = 2
+
+# Tag HTML curta (<b>, </b>, <span ...>) | data | palavra
+TOKEN_RE = re.compile(r'<[^<>\n]{0,40}>|(\d{1,2}/\d{1,2}/\d{2,4}|\d{1,2}/\d{4})|(\w+)')
+
+
+def normalizar_token(token):
+    """Minúsculas e sem acentos ('ANVISA' -> 'anvisa', 'Aprovação' -> 'aprovacao')."""
+    token = unicodedata.normalize('NFKD', token)
+    return "".join(c for c in token if not unicodedata.combining(c)).lower()
+
+
+def localizar_data_anvisa(texto):
+    """
+    Procura a primeira data de aprovação Anvisa no texto em tempo linear.
+    Retorna {"data", "inicio", "fim", "inicio_frase"} (offsets de caractere no texto
+    original, com tags <b> incluídas) ou None se a frase não existir.
+    """
+    if not texto: return None
+
+    estado = 0          # quantas âncoras já casaram
+    saltos = 0          # tokens ignorados desde a última âncora
+    inicio_frase = None
+
+    for m in TOKEN_RE.finditer(texto):
+        data, palavra = m.group(1), m.group(2)
+        if data is None and palavra is None:
+            continue  # Tag HTML: transparente para o autômato
+
+        if estado == len(ANCORAS) and data is not None:
+            return {"data": data, "inicio": m.start(1), "fim": m.end(1), "inicio_frase": inicio_frase}
+
+        token = normalizar_token(palavra) if palavra is not None else None
+
+        if estado < len(ANCORAS) and token == ANCORAS[estado]:
+            if estado == 0: inicio_frase = m.start()
+            estado += 1
+            saltos = 0
+        elif token == ANCORAS[0]:
+            # Recomeça a frase a partir deste "aprovada"
+            estado, saltos, inicio_frase = 1, 0, m.start()
+        elif estado > 0:
+            saltos += 1
+            if saltos > MAX_SALTOS:
+                estado, saltos, inicio_frase = 0, 0, None
+
+    return None
+
+
+def extrair_data_anvisa(texto, padrao=NAO_ENCONTRADA):
+    """Atalho para o resumo: só a data (dd/mm/aaaa) ou o texto padrão."""
+    achado = localizar_data_anvisa(texto)
+    return achado["data"] if achado else padrao
+
+
+def destacar_datas(texto):
+    """Destaca em azul a data da frase de aprovação Anvisa (apenas a primeira)."""
+    if not texto: return ""
+    achado = localizar_data_anvisa(texto)
+    if not achado: return texto
+    i, f = achado["inicio"], achado["fim"]
+    return f'{texto[:i]}<span class="highlight-blue">{texto[i:f]}</span>{texto[f:]}'
@@ -0,0 +1,132 @@
+"""
+API HTTP (WSGI) do validador, para integrações sem passar pelo Streamlit.
+
+    gunicorn api:server --workers 1 --threads 8 --timeout 300
+
+Um worker só: os jobs (jobs.py) vivem na memória do processo, então com dois workers o
+GET/DELETE /jobs/<id> podia cair no que não conhece o job. A concorrência vem das threads
+(e do pool de jobs.py, que roda as conferências fora da thread da requisição).
+
+Endpoints:
+    GET  /saude                        -> {"status": "ok"}
+    POST /conferencias/<modo>          -> multipart com "referencia" e "candidato"
+                                          (modo: referencia | mkt | grafica)
+                                          opcionais: "secao" (repetível) e "paginas_referencia" /
+                                          "paginas_candidato" ("1-3, 5") para conferir só parte
+    GET  /jobs/<job_id>                -> estado/resultado de uma conferência que estourou o prazo
+    DELETE /jobs/<job_id>              -> cancela a conferência (o resultado parcial, se houver, fica no GET)
+
+A resposta de sucesso é o mesmo resultado que as páginas renderizam (datas + "secoes");
+conferências interrompidas (prazo do modelo ou cancelamento) trazem também "parcial".
+Sem memória para rasterizar (memory.py), a conferência é recusada com 503.
+"""
+import os
+
+from flask import Flask, jsonify, request
+
+from core import SECOES_PACIENTE, ErroConferencia, conferir_grafica, conferir_textos, interpretar_paginas, keys_do_ambiente
+from jobs import ESTADO_CANCELADO, ESTADO_ERRO, ESTADOS_ATIVOS, aguardar_job, cancelar_job, chave_job, obter_job, submeter_job
+from memory import MemoriaInsuficiente, guardar_upload
+
+# ----------------- CONFIGURAÇÃO -----------------
+LIMITE_UPLOAD_MB = int(os.environ.get("VALIDADOR_API_LIMITE_MB", "40"))
+TIMEOUT_REQUISICAO_S = float(os.environ.get("VALIDADOR_API_TIMEOUT_S", "240"))  # abaixo do --timeout do gunicorn
+TOKEN_API = os.environ.get("VALIDADOR_API_TOKEN")  # se definido, exige "Authorization: Bearer <token>"
+
+EXTENSOES_POR_MODO = {
+    "referencia": (".pdf", ".docx"),
+    "mkt": (".pdf", ".docx"),
+    "grafica": (".pdf", ".docx", ".jpg", ".jpeg", ".png"),
+}
+
+server = Flask(__name__)
+server.config["MAX_CONTENT_LENGTH"] = LIMITE_UPLOAD_MB * 1024 * 1024
+
+
+def _erro(mensagem, status, **extras):
+    return jsonify(dict(erro=mensagem, **extras)), status
+
+
+def _resposta_job(job):
+    """Traduz o estado de um job em resposta HTTP."""
+    if job is None:
+        return _erro("Job não encontrado (expirou ou nunca existiu).", 404)
+    if job["estado"] in ESTADOS_ATIVOS:
+        return jsonify(job_id=job["id"], estado=job["estado"]), 202
+    if job["estado"] == ESTADO_CANCELADO and job["resultado"] is None:
+        return _erro(job["erro"] or "Conferência cancelada.", 409, job_id=job["id"])
+    if job["estado"] == ESTADO_ERRO:
+        if isinstance(job["excecao"], MemoriaInsuficiente):
+            return _erro(job["erro"], 503, job_id=job["id"])  # Recusado pelo governador de memória: tentar depois
+        status = 422 if isinstance(job["excecao"], ErroConferencia) else 500
+        return _erro(job["erro"], status, job_id=job["id"])
+    return jsonify(dict(job["resultado"], job_id=job["id"]))
+
+
+@server.before_request
+def _autenticar():
+    if TOKEN_API and request.endpoint != "saude":
+        if request.headers.get("Authorization", "") != f"Bearer {TOKEN_API}":
+            return _erro("Não autorizado.", 401)
+
+
+@server.errorhandler(413)
+def _muito_grande(_):
+    return _erro(f"Arquivos acima do limite de {LIMITE_UPLOAD_MB} MB.", 413)
+
+
+@server.get("/saude")
+def saude():
+    return jsonify(status="ok")
+
+
+@server.post("/conferencias/<modo>")
+def conferir(modo):
+    if modo not in EXTENSOES_POR_MODO:
+        return _erro(f"Modo inválido: {modo}. Use um de {sorted(EXTENSOES_POR_MODO)}.", 404)
+
+    f1, f2 = request.files.get("referencia"), request.files.get("candidato")
+    if not f1 or not f2:
+        return _erro("Envie os arquivos 'referencia' e 'candidato' (multipart/form-data).", 400)
+    for arquivo in (f1, f2):
+        if not arquivo.filename.lower().endswith(EXTENSOES_POR_MODO[modo]):
+            return _erro(f"Tipo de arquivo não suportado no modo {modo}: {arquivo.filename}", 415)
+
+    secoes = request.form.getlist("secao")
+    invalidas = [s for s in secoes if s not in SECOES_PACIENTE]
+    if invalidas:
+        return _erro(f"Seção desconhecida: {invalidas[0]}. Use os títulos oficiais.", 400, secoes=SECOES_PACIENTE)
+    try:
+        paginas = [interpretar_paginas(request.form.get(campo)) for campo in ("paginas_referencia", "paginas_candidato")]
+    except ValueError as e:
+        return _erro(str(e), 400)
+    selecao = {c: v for c, v in zip(("secoes_escolhidas", "paginas_ref", "paginas_cand"), [secoes] + paginas) if v}
+
+    keys_validas = keys_do_ambiente()
+    if not keys_validas:
+        return _erro("Nenhuma chave API encontrada.", 503)
+
+    dados1, dados2 = guardar_upload(f1, f1.filename), guardar_upload(f2, f2.filename)
+    chave = chave_job(modo, f1.filename, dados1, f2.filename, dados2, selecao)
+    if modo == "grafica":
+        job_id = submeter_job(conferir_grafica, f1.filename, dados1, f2.filename, dados2, keys_validas, **selecao, chave=chave)
+    else:
+        job_id = submeter_job(conferir_textos, modo, f1.filename, dados1, f2.filename, dados2, keys_validas, **selecao, chave=chave)
+
+    job = aguardar_job(job_id, timeout=TIMEOUT_REQUISICAO_S)
+    if job is not None and job["estado"] in ESTADOS_ATIVOS:
+        # Prazo da requisição estourou: o trabalho continua e pode ser buscado depois
+        return _erro("Tempo limite da requisição atingido; consulte /jobs/<job_id>.", 504, job_id=job_id)
+    return _resposta_job(job)
+
+
+@server.get("/jobs/<job_id>")
+def consultar_job(job_id):
+    return _resposta_job(obter_job(job_id))
+
+
+@server.delete("/jobs/<job_id>")
+def cancelar(job_id):
+    if not cancelar_job(job_id):
+        return _resposta_job(obter_job(job_id))  # Já terminou (ou não existe): devolve o estado final
+    return jsonify(job_id=job_id, estado=ESTADO_CANCELADO), 202
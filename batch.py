@@ -0,0 +1,239 @@
+"""
+Conferência em lote (sem Streamlit) para revalidar portfólios inteiros.
+
+Uso:
+    python batch.py --manifesto pares.csv --saida resultados/
+    python batch.py --pasta bulas/ --modo mkt --saida resultados/ --workers 3 --rpm 10
+
+Manifesto CSV: colunas id, referencia, candidato e (opcional) modo.
+Pasta: uma subpasta por par; o arquivo cujo nome começa com "ref" é a referência,
+o outro é o candidato. O id do par é o nome da subpasta.
+
+Cada par gera <saida>/<id>.json; ao final, resumo.json e resumo.csv.
+Rodar de novo com a mesma saída retoma de onde parou (pares concluídos são pulados).
+As chaves vêm das variáveis GEMINI_API_KEY, GEMINI_API_KEY2 e GEMINI_API_KEY3.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core import conferir_grafica, conferir_textos, keys_do_ambiente
+from jobs import chave_job
+
+MODOS = ("referencia", "mkt", "grafica")
+EXTENSOES = (".pdf", ".docx", ".jpg", ".jpeg", ".png")
+
+# Trechos de erro que indicam cota/limite de taxa esgotados (HTTP 429 / ResourceExhausted)
+SINAIS_DE_COTA = ("429", "quota", "resourceexhausted", "rate limit")
+
+
+# ----------------- DESCOBERTA DOS PARES -----------------
+
+def pares_do_manifesto(caminho, modo_padrao):
+    base = os.path.dirname(os.path.abspath(caminho))
+    with open(caminho, newline="", encoding="utf-8-sig") as f:
+        for linha in csv.DictReader(f):
+            yield {
+                "id": linha["id"].strip(),
+                "modo": (linha.get("modo") or modo_padrao).strip(),
+                "referencia": os.path.join(base, linha["referencia"].strip()),
+                "candidato": os.path.join(base, linha["candidato"].strip()),
+            }
+
+def pares_da_pasta(pasta, modo_padrao):
+    for nome in sorted(os.listdir(pasta)):
+        subpasta = os.path.join(pasta, nome)
+        if not os.path.isdir(subpasta): continue
+        arquivos = sorted(a for a in os.listdir(subpasta) if a.lower().endswith(EXTENSOES))
+        refs = [a for a in arquivos if a.lower().startswith("ref")]
+        outros = [a for a in arquivos if a not in refs]
+        if len(refs) != 1 or len(outros) != 1:
+            print(f"⚠️ {nome}: esperado 1 arquivo 'ref*' e 1 candidato, encontrados {arquivos}", file=sys.stderr)
+            continue
+        yield {
+            "id": nome,
+            "modo": modo_padrao,
+            "referencia": os.path.join(subpasta, refs[0]),
+            "candidato": os.path.join(subpasta, outros[0]),
+        }
+
+
+# ----------------- AGENDAMENTO CIENTE DE COTA -----------------
+
+class Cota:
+    """
+    Limita o ritmo (chamadas por minuto) e o total de pares que podem chamar o modelo.
+    Quando a API responde 429, o lote para de iniciar pares novos; o que sobrou
+    fica para a próxima execução (retomada). Par respondido pelo histórico devolve a vaga.
+    """
+
+    def __init__(self, rpm=None, limite=None):
+        self.intervalo = 60.0 / rpm if rpm else 0.0
+        self.limite = limite
+        self.usadas = 0
+        self.esgotada = False
+        self._proximo = 0.0
+        self._lock = threading.Lock()
+
+    def reservar(self):
+        """Bloqueia até haver vaga no ritmo; False se a cota acabou."""
+        with self._lock:
+            if self.esgotada or (self.limite is not None and self.usadas >= self.limite):
+                return False
+            self.usadas += 1
+            agora = time.monotonic()
+            espera = max(0.0, self._proximo - agora)
+            self._proximo = max(agora, self._proximo) + self.intervalo
+        if espera: time.sleep(espera)
+        return True
+
+    def devolver(self):
+        """Par que não chamou o modelo (veio do histórico): a vaga volta para o limite."""
+        with self._lock: self.usadas -= 1
+
+    def marcar_esgotada(self):
+        with self._lock: self.esgotada = True
+
+
+# ----------------- EXECUÇÃO -----------------
+
+def caminho_saida(saida, par):
+    return os.path.join(saida, f"{par['id']}.json")
+
+def hash_entrada(par, dados_ref, dados_cand):
+    return chave_job(par["modo"], os.path.basename(par["referencia"]), dados_ref, os.path.basename(par["candidato"]), dados_cand)
+
+def ja_concluido(saida, par, hash_atual):
+    caminho = caminho_saida(saida, par)
+    if not os.path.exists(caminho): return False
+    try:
+        with open(caminho, encoding="utf-8") as f: anterior = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return anterior.get("estado") == "concluido" and anterior.get("hash_entrada") == hash_atual
+
+def salvar_json(caminho, dados):
+    temporario = f"{caminho}.tmp"
+    with open(temporario, "w", encoding="utf-8") as f: json.dump(dados, f, ensure_ascii=False, indent=2)
+    os.replace(temporario, caminho)
+
+def conferir_par(par, dados_ref, dados_cand, keys_validas):
+    nome_ref, nome_cand = os.path.basename(par["referencia"]), os.path.basename(par["candidato"])
+    if par["modo"] == "grafica":
+        return conferir_grafica(nome_ref, dados_ref, nome_cand, dados_cand, keys_validas)
+    return conferir_textos(par["modo"], nome_ref, dados_ref, nome_cand, dados_cand, keys_validas)
+
+def arquivos_faltando(par):
+    return [par[lado] for lado in ("referencia", "candidato") if not os.path.isfile(par[lado])]
+
+def processar_par(par, saida, keys_validas, cota):
+    # Arquivo sumido ou ilegível é erro do par, como uma conferência que falhou: o lote segue
+    try:
+        with open(par["referencia"], "rb") as f: dados_ref = f.read()
+        with open(par["candidato"], "rb") as f: dados_cand = f.read()
+    except OSError as e:
+        registro = dict(par, estado="erro", erro=f"Não foi possível ler o arquivo: {e}")
+        salvar_json(caminho_saida(saida, par), registro)
+        return registro
+    hash_atual = hash_entrada(par, dados_ref, dados_cand)
+
+    if ja_concluido(saida, par, hash_atual):
+        return {"id": par["id"], "estado": "pulado"}
+    if not cota.reservar():
+        return {"id": par["id"], "estado": "adiado"}
+
+    registro = dict(par, hash_entrada=hash_atual)
+    inicio = time.perf_counter()
+    try:
+        registro["resultado"] = conferir_par(par, dados_ref, dados_cand, keys_validas)
+        if registro["resultado"].get("historico"): cota.devolver()
+        # Modelo interrompido pelo prazo: fica salvo, mas a próxima execução refaz o par
+        registro["estado"] = "parcial" if registro["resultado"].get("parcial") else "concluido"
+    except Exception as e:
+        registro["estado"] = "erro"
+        registro["erro"] = str(e)
+        if any(sinal in str(e).lower() for sinal in SINAIS_DE_COTA):
+            cota.marcar_esgotada()
+            registro["estado"] = "adiado"
+    registro["duracao_s"] = round(time.perf_counter() - inicio, 2)
+
+    if registro["estado"] != "adiado":
+        salvar_json(caminho_saida(saida, par), registro)
+    return registro
+
+def resumir(saida, pares):
+    """Lê os JSON por par (inclusive de execuções anteriores) e escreve resumo.json/resumo.csv."""
+    linhas = []
+    for par in pares:
+        caminho = caminho_saida(saida, par)
+        registro = {}
+        if os.path.exists(caminho):
+            with open(caminho, encoding="utf-8") as f: registro = json.load(f)
+        resultado = registro.get("resultado") or {}
+        secoes = resultado.get("secoes", [])
+        linhas.append({
+            "id": par["id"],
+            "modo": par["modo"],
+            "estado": registro.get("estado", "pendente"),
+            "data_ref": resultado.get("data_ref", ""),
+            "data_candidato": resultado.get("data_mkt", resultado.get("data_grafica", "")),
+            "secoes": len(secoes),
+            "divergentes": sum(1 for s in secoes if s.get("status") != "CONFORME"),
+            "erro": registro.get("erro", ""),
+        })
+
+    totais = {}
+    for linha in linhas: totais[linha["estado"]] = totais.get(linha["estado"], 0) + 1
+    salvar_json(os.path.join(saida, "resumo.json"), {"totais": totais, "pares": linhas})
+    with open(os.path.join(saida, "resumo.csv"), "w", newline="", encoding="utf-8") as f:
+        escritor = csv.DictWriter(f, fieldnames=list(linhas[0].keys()) if linhas else ["id"])
+        escritor.writeheader()
+        escritor.writerows(linhas)
+    return totais
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Conferência de bulas em lote.")
+    origem = parser.add_mutually_exclusive_group(required=True)
+    origem.add_argument("--manifesto", help="CSV com colunas id, referencia, candidato[, modo]")
+    origem.add_argument("--pasta", help="Pasta com uma subpasta por par (ref* + candidato)")
+    parser.add_argument("--saida", required=True, help="Pasta dos JSON por par e do resumo")
+    parser.add_argument("--modo", choices=MODOS, default="mkt", help="Modo padrão (páginas 1, 2 ou 3)")
+    parser.add_argument("--workers", type=int, default=2, help="Pares processados ao mesmo tempo")
+    parser.add_argument("--rpm", type=float, default=None, help="Máximo de pares iniciados por minuto")
+    parser.add_argument("--cota", type=int, default=None, help="Máximo de pares processados nesta execução")
+    args = parser.parse_args(argv)
+
+    keys_validas = keys_do_ambiente()
+    if not keys_validas:
+        parser.error("Nenhuma chave API encontrada (GEMINI_API_KEY...).")
+
+    pares = list(pares_do_manifesto(args.manifesto, args.modo) if args.manifesto else pares_da_pasta(args.pasta, args.modo))
+    invalidos = [p["id"] for p in pares if p["modo"] not in MODOS]
+    if invalidos:
+        parser.error(f"Modo inválido nos pares: {invalidos}")
+    for par in pares:
+        faltando = arquivos_faltando(par)
+        if faltando: print(f"⚠️ {par['id']}: arquivo não encontrado: {', '.join(faltando)}", file=sys.stderr)
+    os.makedirs(args.saida, exist_ok=True)
+
+    cota = Cota(rpm=args.rpm, limite=args.cota)
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        futuros = [executor.submit(processar_par, par, args.saida, keys_validas, cota) for par in pares]
+        for futuro in futuros:
+            registro = futuro.result()
+            print(f"{registro['id']}: {registro['estado']}" + (f" ({registro['erro']})" if registro.get("erro") else ""))
+
+    totais = resumir(args.saida, pares)
+    print(f"Resumo: {totais}")
+    if cota.esgotada:
+        print("⛔ Cota da API esgotada: rode o mesmo comando mais tarde para continuar.")
+    return 0 if not totais.get("erro") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""
+Cold start por página: cada página roda uma vez (AppTest) num interpretador novo, como
+na primeira navegação depois de um restart do dyno.
+
+    python -m bench.cold_start                 # tempo do primeiro run de cada página
+    python -m bench.cold_start --detalhar      # + módulos mais caros importados pela página
+
+O import do próprio Streamlit fica fora da medida (é pago uma vez pelo servidor, não por página).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGINAS = {
+    "home": os.path.join(RAIZ, "app.py"),
+    "referencia": os.path.join(RAIZ, "pages", "1_Med._Referencia_x_BELFAR.py"),
+    "mkt": os.path.join(RAIZ, "pages", "2_Conferencia_MKT.py"),
+    "grafica": os.path.join(RAIZ, "pages", "3_Grafica_x_Arte.py"),
+}
+
+# Roda no processo filho: mede o primeiro run e lista os módulos que a página trouxe
+SCRIPT_FILHO = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+antes = set(sys.modules)
+inicio = time.perf_counter()
+AppTest.from_file(sys.argv[1], default_timeout=120).run()
+print(json.dumps({"segundos": time.perf_counter() - inicio, "modulos": sorted(set(sys.modules) - antes)}))
+"""
+
+
+def medir_pagina(caminho, detalhar=False):
+    comando = [sys.executable] + (["-X", "importtime"] if detalhar else []) + ["-c", SCRIPT_FILHO, caminho]
+    processo = subprocess.run(comando, capture_output=True, text=True, cwd=RAIZ, check=True)
+    medida = json.loads(processo.stdout.strip().splitlines()[-1])
+    if detalhar:
+        medida["mais_caros"] = mais_caros(processo.stderr, set(medida["modulos"]))
+    return medida
+
+
+def mais_caros(saida_importtime, novos, limite=8):
+    """(módulo, ms cumulativos) dos imports de topo mais caros feitos pela página."""
+    linhas = []
+    for linha in saida_importtime.splitlines():
+        if not linha.startswith("import time:") or "cumulative" in linha: continue
+        _, cumulativo, nome = linha.split("|")
+        if nome.strip() in novos and "." not in nome.strip():
+            linhas.append((nome.strip(), int(cumulativo) / 1000))
+    return sorted(linhas, key=lambda item: -item[1])[:limite]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tempo de cold start de cada página.")
+    parser.add_argument("--paginas", default=",".join(PAGINAS))
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--detalhar", action="store_true", help="Mostra os imports mais caros de cada página")
+    args = parser.parse_args(argv)
+
+    for pagina in (p.strip() for p in args.paginas.split(",") if p.strip()):
+        medidas = [medir_pagina(PAGINAS[pagina]) for _ in range(args.repeticoes)]
+        mediana = statistics.median(m["segundos"] for m in medidas)
+        print(f"{pagina:<12} {mediana * 1000:>8.0f} ms  ({len(medidas[0]['modulos'])} módulos novos)")
+        if args.detalhar:
+            for nome, ms in medir_pagina(PAGINAS[pagina], detalhar=True)["mais_caros"]:
+                print(f"    {nome:<32} {ms:>8.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""
+Gerador de bulas sintéticas para o benchmark.
+
+Usa os títulos reais de SECOES_PACIENTE, com tamanho, colunas, densidade de negrito
+e divergências configuráveis, e grava em três formatos:
+  - PDF digital (texto selecionável, em colunas);
+  - PDF "em curva" (o mesmo layout com o texto convertido em contornos vetoriais);
+  - DOCX.
+ruido_ocr() simula a transcrição de um scan para o alinhamento tolerante da página 3.
+"""
+import io
+import random
+
+import docx
+import fitz  # PyMuPDF
+
+from core import SECOES_PACIENTE
+
+VOCABULARIO = (
+    "este medicamento deve ser utilizado somente sob orientação médica não use caso "
+    "tenha alergia ao princípio ativo ou a qualquer componente da fórmula informe ao "
+    "seu médico ou cirurgião-dentista se você está fazendo uso de algum outro "
+    "comprimido revestido cápsula solução oral gotas uso adulto e pediátrico acima de "
+    "anos dose máxima diária mantenha em temperatura ambiente proteger da luz e umidade "
+    "reações adversas comuns incluem náusea cefaleia tontura sonolência diarreia "
+    "em caso de superdosagem procure imediatamente atendimento médico"
+).split()
+
+UNIDADES = ("mg", "mL", "g", "mcg", "gotas", "horas", "dias")
+
+
+def _frase(rng, palavras):
+    tokens = []
+    for _ in range(palavras):
+        if rng.random() < 0.06:
+            tokens.append(f"{rng.randint(1, 500)} {rng.choice(UNIDADES)}")
+        else:
+            tokens.append(rng.choice(VOCABULARIO))
+    return " ".join(tokens).capitalize() + "."
+
+
+def gerar_bula(paragrafos_por_secao=3, palavras_por_paragrafo=60, densidade_negrito=0.1,
+               divergencias=5, semente=42, data_anvisa="12/03/2021"):
+    """
+    Devolve (referencia, candidato). Cada bula é uma lista de (titulo, paragrafos),
+    e cada parágrafo é uma lista de trechos (texto, negrito).
+    O candidato é a referência com `divergencias` alterações de palavra/número.
+    """
+    rng = random.Random(semente)
+    referencia = []
+    for i, titulo in enumerate(SECOES_PACIENTE):
+        paragrafos = []
+        for _ in range(paragrafos_por_secao):
+            trechos = []
+            for palavra in _frase(rng, palavras_por_paragrafo).split(" "):
+                negrito = rng.random() < densidade_negrito
+                if trechos and trechos[-1][1] == negrito:
+                    trechos[-1] = (trechos[-1][0] + " " + palavra, negrito)
+                else:
+                    trechos.append(((" " if trechos else "") + palavra, negrito))
+            paragrafos.append(trechos)
+        if titulo == "DIZERES LEGAIS":
+            paragrafos.append([(f"Esta bula foi aprovada pela Anvisa em {data_anvisa}.", False)])
+        referencia.append((f"{i - 1}. {titulo}" if 2 <= i <= 10 else titulo, paragrafos))
+
+    candidato = [(titulo, [list(p) for p in paragrafos]) for titulo, paragrafos in referencia]
+    comparaveis = [i for i, (t, _) in enumerate(candidato) if not any(s in t for s in ("APRESENTAÇÕES", "COMPOSIÇÃO", "DIZERES LEGAIS"))]
+    for _ in range(divergencias):
+        _, paragrafos = candidato[rng.choice(comparaveis)]
+        trechos = rng.choice(paragrafos)
+        k = rng.randrange(len(trechos))
+        texto, negrito = trechos[k]
+        palavras = texto.split(" ")
+        j = rng.randrange(len(palavras))
+        palavras[j] = str(rng.randint(1, 999)) if rng.random() < 0.5 else rng.choice(VOCABULARIO).upper()
+        trechos[k] = (" ".join(palavras), negrito)
+    return referencia, candidato
+
+
+# Trocas que um OCR costuma fazer em texto limpo (só em letras: números ficam intactos)
+TROCAS_OCR = (("m", "rn"), ("d", "cl"), ("l", "1"), ("o", "0"), ("ã", "a"), ("é", "e"), ("ç", "c"), (".", ","))
+
+
+def ruido_ocr(texto, taxa=0.05, semente=7):
+    """O mesmo texto com ~`taxa` das palavras lidas "com ruído" (rn/m, acento perdido, vírgula/ponto)."""
+    rng = random.Random(semente)
+    palavras = texto.split(" ")
+    for i, palavra in enumerate(palavras):
+        if rng.random() >= taxa or any(c.isdigit() for c in palavra): continue
+        possiveis = [(a, b) for a, b in TROCAS_OCR if a in palavra]
+        if possiveis:
+            a, b = rng.choice(possiveis)
+            palavras[i] = palavra.replace(a, b, 1)
+    return " ".join(palavras)
+
+
+# ----------------- ESCRITORES -----------------
+
+def salvar_docx(bula):
+    documento = docx.Document()
+    for titulo, paragrafos in bula:
+        documento.add_paragraph().add_run(titulo).bold = True
+        for trechos in paragrafos:
+            p = documento.add_paragraph()
+            for texto, negrito in trechos:
+                p.add_run(texto).bold = negrito
+    saida = io.BytesIO()
+    documento.save(saida)
+    return saida.getvalue()
+
+
+def _html_bula(bula):
+    partes = []
+    for titulo, paragrafos in bula:
+        partes.append(f"<p><b>{titulo}</b></p>")
+        for trechos in paragrafos:
+            partes.append("<p>" + "".join(f"<b>{t}</b>" if n else t for t, n in trechos) + "</p>")
+    return "".join(partes)
+
+
+def salvar_pdf(bula, colunas=2, largura=595, altura=842, margem=36):
+    """PDF digital A4 com o texto fluindo por `colunas` colunas e quantas páginas forem precisas."""
+    historia = fitz.Story(html=_html_bula(bula), user_css="* {font-family: sans-serif; font-size: 8pt;}")
+    saida = io.BytesIO()
+    escritor = fitz.DocumentWriter(saida)
+    largura_coluna = (largura - 2 * margem) / colunas
+    retangulos = [fitz.Rect(margem + c * largura_coluna, margem, margem + (c + 1) * largura_coluna - 6, altura - margem) for c in range(colunas)]
+
+    mais = True
+    while mais:
+        dispositivo = escritor.begin_page(fitz.Rect(0, 0, largura, altura))
+        for retangulo in retangulos:
+            mais, _ = historia.place(retangulo)
+            historia.draw(dispositivo)
+            if not mais: break
+        escritor.end_page()
+    escritor.close()
+    return saida.getvalue()
+
+
+def converter_em_curvas(pdf_digital):
+    """Mesmo PDF com o texto virado contorno vetorial (sem camada de texto), como sai da gráfica."""
+    original = fitz.open(stream=pdf_digital, filetype="pdf")
+    curvas = fitz.open()
+    for pagina in original:
+        svg = pagina.get_svg_image(text_as_path=True)
+        pagina_svg = fitz.open(stream=svg.encode("utf-8"), filetype="svg")
+        curvas.insert_pdf(fitz.open(stream=pagina_svg.convert_to_pdf(), filetype="pdf"))
+    return curvas.tobytes()
+
+
+def gerar_arquivos(colunas=2, **opcoes):
+    """Atalho: {"digital"|"curvas"|"docx": (bytes_ref, bytes_cand)} para a mesma bula sintética."""
+    referencia, candidato = gerar_bula(**opcoes)
+    pdf_ref, pdf_cand = salvar_pdf(referencia, colunas), salvar_pdf(candidato, colunas)
+    return {
+        "digital": (pdf_ref, pdf_cand),
+        "curvas": (converter_em_curvas(pdf_ref), converter_em_curvas(pdf_cand)),
+        "docx": (salvar_docx(referencia), salvar_docx(candidato)),
+    }
@@ -0,0 +1,126 @@
+"""
+Teste de carga offline: N sessões Streamlit simultâneas (via AppTest) nas três páginas,
+com o modelo substituído por fake_model.py.
+
+    python -m bench.loadtest --sessoes 30 --concorrencia 10 --latencia 0.5-2 --taxa-429 0.1
+
+Cada sessão usa uma bula sintética diferente (senão o pool de jobs reaproveitaria o
+resultado), envia os dois arquivos, clica no botão e espera o relatório aparecer.
+Ao final imprime vazão e percentis de latência por página.
+
+O AppTest não é thread-safe (simula um runtime global), então as sessões simultâneas
+rodam em processos separados, cada um com o seu pool de jobs.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from streamlit.testing.v1 import AppTest
+
+import history
+import page_cache
+import section_cache
+from bench.corpus import gerar_bula, salvar_docx, salvar_pdf
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGINAS = {
+    "referencia": (os.path.join(RAIZ, "pages", "1_Med._Referencia_x_BELFAR.py"), "docx"),
+    "mkt": (os.path.join(RAIZ, "pages", "2_Conferencia_MKT.py"), "docx"),
+    "grafica": (os.path.join(RAIZ, "pages", "3_Grafica_x_Arte.py"), "pdf"),
+}
+MIMES = {"docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document", "pdf": "application/pdf"}
+
+
+def percentil(valores, p):
+    """Percentil por posição mais próxima (valores já ordenados)."""
+    if not valores: return 0.0
+    return valores[min(len(valores) - 1, max(0, int(round(p / 100 * len(valores) + 0.5)) - 1))]
+
+
+def gerar_par(formato, semente, tamanho):
+    referencia, candidato = gerar_bula(paragrafos_por_secao=tamanho, semente=semente)
+    if formato == "docx":
+        return salvar_docx(referencia), salvar_docx(candidato)
+    return salvar_pdf(referencia), salvar_pdf(candidato)
+
+
+def executar_sessao(tarefa):
+    pagina, semente, tamanho, timeout = tarefa
+    caminho, formato = PAGINAS[pagina]
+    dados_ref, dados_cand = gerar_par(formato, semente, tamanho)
+
+    at = AppTest.from_file(caminho, default_timeout=timeout)
+    at.secrets["GEMINI_API_KEY"] = "fake-1"
+    at.secrets["GEMINI_API_KEY2"] = "fake-2"
+    at.run()
+    at.file_uploader[0].set_value((f"ref-{semente}.{formato}", dados_ref, MIMES[formato]))
+    at.file_uploader[1].set_value((f"cand-{semente}.{formato}", dados_cand, MIMES[formato]))
+
+    inicio = time.perf_counter()
+    try:
+        at.button[0].click().run()  # A página faz polling com st.rerun até o job terminar
+        ok = not at.exception and not at.error and any("Resumo da Conferência" in m.value for m in at.markdown)
+        erro = "; ".join(e.value for e in at.error) or "; ".join(str(e.value) for e in at.exception)
+    except Exception as e:  # Timeout do AppTest
+        ok, erro = False, str(e)
+    return {"pagina": pagina, "ok": ok, "latencia_s": time.perf_counter() - inicio, "erro": erro}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Teste de carga offline das três páginas.")
+    parser.add_argument("--sessoes", type=int, default=12, help="Total de sessões (divididas entre as páginas)")
+    parser.add_argument("--concorrencia", type=int, default=4, help="Sessões simultâneas")
+    parser.add_argument("--paginas", default="referencia,mkt,grafica")
+    parser.add_argument("--tamanho", type=int, default=3, help="Parágrafos por seção da bula sintética")
+    parser.add_argument("--latencia", default="0.2-1.0", help="Latência do modelo fake (s ou faixa a-b)")
+    parser.add_argument("--taxa-429", type=float, default=0.0)
+    parser.add_argument("--taxa-timeout", type=float, default=0.0)
+    parser.add_argument("--taxa-truncado", type=float, default=0.0)
+    parser.add_argument("--timeout", type=float, default=180.0, help="Tempo máximo por sessão (s)")
+    args = parser.parse_args(argv)
+
+    pasta_cache = tempfile.mkdtemp(prefix="validador-carga-")
+    os.environ.update({
+        "VALIDADOR_MODELO": "fake",
+        "VALIDADOR_FAKE_LATENCIA_S": args.latencia,
+        "VALIDADOR_FAKE_TAXA_429": str(args.taxa_429),
+        "VALIDADOR_FAKE_TAXA_TIMEOUT": str(args.taxa_timeout),
+        "VALIDADOR_FAKE_TAXA_TRUNCADO": str(args.taxa_truncado),
+        # Caches e histórico isolados: o teste de carga não pode reaproveitar (nem poluir) os reais
+        "VALIDADOR_CACHE_SECOES": pasta_cache,
+        "VALIDADOR_CACHE_PAGINAS": os.path.join(pasta_cache, "paginas"),
+        "VALIDADOR_HISTORICO": os.path.join(pasta_cache, "historico.sqlite3"),
+    })
+    # section_cache, page_cache e history já foram importados (via bench.corpus -> core) e leram as variáveis antes daqui
+    section_cache.PASTA_CACHE_SECOES = pasta_cache
+    page_cache.PASTA_CACHE_PAGINAS = os.environ["VALIDADOR_CACHE_PAGINAS"]
+    history.ARQUIVO_HISTORICO = os.environ["VALIDADOR_HISTORICO"]
+
+    paginas = [p.strip() for p in args.paginas.split(",") if p.strip()]
+    tarefas = [(paginas[i % len(paginas)], i, args.tamanho, args.timeout) for i in range(args.sessoes)]
+
+    inicio = time.perf_counter()
+    # Referência pelo nome real do módulo: o AppTest troca o __main__ dos processos filhos
+    from bench.loadtest import executar_sessao as sessao
+    with ProcessPoolExecutor(max_workers=args.concorrencia) as executor:
+        resultados = list(executor.map(sessao, tarefas))
+    duracao = time.perf_counter() - inicio
+
+    print(f"{len(resultados)} sessões em {duracao:.1f} s -> {len(resultados) / duracao:.2f} sessões/s")
+    print(f"{'página':<12}{'ok':>5}{'falhas':>8}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for pagina in paginas:
+        da_pagina = [r for r in resultados if r["pagina"] == pagina]
+        latencias = sorted(r["latencia_s"] for r in da_pagina if r["ok"])
+        falhas = [r for r in da_pagina if not r["ok"]]
+        print(f"{pagina:<12}{len(latencias):>5}{len(falhas):>8}"
+              f"{percentil(latencias, 50):>8.2f}s{percentil(latencias, 95):>8.2f}s{percentil(latencias, 99):>8.2f}s")
+        for falha in falhas[:3]:
+            print(f"    ↳ {falha['erro'][:160]}")
+    return 0 if all(r["ok"] for r in resultados) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
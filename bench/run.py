@@ -0,0 +1,135 @@
+"""
+Benchmark das etapas locais (sem modelo): extração, normalização, diff e renderização.
+
+    python -m bench.run                      # mede e compara com bench/baseline.json
+    python -m bench.run --salvar-baseline    # grava as medições atuais como baseline
+    python -m bench.run --tamanhos 2,8 --colunas 3 --negrito 0.3 --divergencias 20
+
+Cada etapa é medida `--repeticoes` vezes (mediana do tempo) e, numa execução à parte,
+com tracemalloc (pico de memória). Sai com código 1 se alguma etapa piorar mais que
+`--tolerancia` em relação ao baseline.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import page_cache
+from alignment import alinhar_tolerante
+from bench.corpus import gerar_arquivos, ruido_ocr
+from core import (SECOES_PACIENTE, arquivo_em_memoria, extract_text_from_file, gerar_diff_html,
+                  limpar_ruido_visual, montar_secao, normalizar_rigorosa, process_file_content)
+from sections import normalizar_texto, segmentar_secoes
+from spelling import carregar_lexico, marcar_ortografia
+from styles import comparar as comparar_estilos
+
+CAMINHO_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def medir(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+
+    tracemalloc.start()
+    funcao()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"tempo_ms": round(statistics.median(tempos) * 1000, 3), "pico_kb": round(pico / 1024, 1)}
+
+
+def sem_cache_paginas(funcao):
+    """Medição a frio: o cache de rasters por página (page_cache.py) desligado durante a chamada."""
+    def medida():
+        page_cache.ATIVO = False
+        try:
+            return funcao()
+        finally:
+            page_cache.ATIVO = True
+    return medida
+
+
+def etapas(tamanho, colunas, negrito, divergencias):
+    """Monta {nome_da_etapa: função sem argumentos} para uma bula sintética."""
+    opcoes = dict(paragrafos_por_secao=tamanho, densidade_negrito=negrito, divergencias=divergencias)
+    arquivos = gerar_arquivos(colunas=colunas, **opcoes)
+    texto_ref, estilos_ref = extract_text_from_file(arquivo_em_memoria("ref.pdf", arquivos["digital"][0]))
+    texto_cand, estilos_cand = extract_text_from_file(arquivo_em_memoria("cand.pdf", arquivos["digital"][1]))
+    seg_ref = segmentar_secoes(texto_ref, SECOES_PACIENTE)
+    seg_cand = segmentar_secoes(texto_cand, SECOES_PACIENTE)
+    paragrafos = texto_cand.split("\n")
+    texto_movido = "\n".join([paragrafos[-1]] + paragrafos[:-1])  # Último parágrafo levado para o topo
+    seg_ocr = segmentar_secoes(ruido_ocr(texto_cand), SECOES_PACIENTE)
+    carregar_lexico()  # Carga única do processo: fora da medição
+    page_cache.PASTA_CACHE_PAGINAS = tempfile.mkdtemp(prefix="validador-bench-")  # Não mede (nem polui) o cache real
+
+    return {
+        "extracao_pdf": lambda: extract_text_from_file(arquivo_em_memoria("ref.pdf", arquivos["digital"][0])),
+        "extracao_docx": lambda: extract_text_from_file(arquivo_em_memoria("ref.docx", arquivos["docx"][0])),
+        "extracao_curvas": sem_cache_paginas(lambda: process_file_content(arquivo_em_memoria("ref.pdf", arquivos["curvas"][0]))),
+        "extracao_curvas_cache": lambda: process_file_content(arquivo_em_memoria("ref.pdf", arquivos["curvas"][0])),
+        "normalizacao": lambda: (limpar_ruido_visual(texto_cand), normalizar_rigorosa(texto_cand), normalizar_texto(texto_cand)),
+        "segmentacao": lambda: segmentar_secoes(texto_cand, SECOES_PACIENTE),
+        "diff": lambda: gerar_diff_html(texto_ref, texto_cand),
+        "diff_rigoroso": lambda: gerar_diff_html(texto_ref, texto_cand, rigoroso=True),
+        "diff_paragrafo_movido": lambda: gerar_diff_html(texto_ref, texto_movido),
+        "estilo": lambda: comparar_estilos(texto_ref, estilos_ref, texto_cand, estilos_cand),
+        "ortografia": lambda: marcar_ortografia(texto_cand),
+        "alinhamento_ocr": lambda: [alinhar_tolerante(seg_ref.get(t, ""), seg_ocr.get(t, "")) for t in SECOES_PACIENTE],
+        "renderizacao": lambda: [montar_secao(t, seg_ref.get(t, ""), seg_cand.get(t, "")) for t in SECOES_PACIENTE],
+    }
+
+
+def comparar(atual, baseline, tolerancia):
+    regressoes = []
+    for chave, medida in atual.items():
+        anterior = baseline.get(chave)
+        if not anterior: continue
+        for metrica in ("tempo_ms", "pico_kb"):
+            if anterior[metrica] > 0 and medida[metrica] > anterior[metrica] * (1 + tolerancia):
+                regressoes.append(f"{chave} {metrica}: {anterior[metrica]} -> {medida[metrica]}")
+    return regressoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark das etapas locais do validador.")
+    parser.add_argument("--tamanhos", default="2,8", help="Parágrafos por seção, separados por vírgula")
+    parser.add_argument("--colunas", type=int, default=2)
+    parser.add_argument("--negrito", type=float, default=0.1, help="Fração de palavras em negrito")
+    parser.add_argument("--divergencias", type=int, default=5)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--tolerancia", type=float, default=0.2, help="Piora aceitável (0.2 = 20%%)")
+    parser.add_argument("--baseline", default=CAMINHO_BASELINE)
+    parser.add_argument("--salvar-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    resultados = {}
+    for tamanho in (int(t) for t in args.tamanhos.split(",")):
+        for nome, funcao in etapas(tamanho, args.colunas, args.negrito, args.divergencias).items():
+            chave = f"{nome}@{tamanho}p/{args.colunas}col"
+            resultados[chave] = medir(funcao, args.repeticoes)
+            print(f"{chave:<32} {resultados[chave]['tempo_ms']:>10.1f} ms {resultados[chave]['pico_kb']:>10.1f} KB")
+
+    if args.salvar_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f: json.dump(resultados, f, indent=2)
+        print(f"Baseline salvo em {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("Sem baseline para comparar (use --salvar-baseline).")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f: baseline = json.load(f)
+    regressoes = comparar(resultados, baseline, args.tolerancia)
+    for regressao in regressoes: print(f"⚠️ REGRESSÃO {regressao}")
+    if not regressoes: print("✅ Nenhuma regressão acima da tolerância.")
+    return 1 if regressoes else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+import math
+import re
+
+# ----------------- CABEÇALHOS, RODAPÉS E RUÍDO DE PÁGINA -----------------
+# Bulas de várias páginas repetem em toda página o cabeçalho (produto, "Bula do paciente"),
+# o rodapé (número da página, código da arte), o texto das marcas de corte da gráfica e
+# pontilhados de índice. Nada disso é conteúdo: ia para o prompt uma vez por página e
+# virava divergência quando só a numeração ou o código da versão mudava.
+#
+# As linhas de cada página do PDF (get_text("dict")) passam por aqui antes do prompt e do diff:
+# - repetidas: na margem de cima ou de baixo, na mesma altura (faixa de 2% da página, com
+#   tolerância de uma faixa), em pelo menos metade das páginas (mínimo 2), com o mesmo
+#   texto ou com números que andam junto com a página ("Pág. 3 de 8", "Pág. 4 de 8");
+#   número sozinho ("3") só na borda da folha, nunca mais para dentro (célula de tabela
+#   de dose no pé da página também é só um número);
+# - fora da área de corte (TrimBox), quando o PDF tem uma: marcas e slug da gráfica;
+# - só pontilhado; pontilhado no meio da linha vira um espaço (sem_pontilhado).
+# Um PDF de uma página só perde as duas últimas: sem repetição não há como saber.
+
+MARGEM = 0.12             # Fração da altura da página em cima e embaixo
+FAIXA = 0.02              # Altura de cada faixa de posição
+MIN_FRACAO_PAGINAS = 0.5  # Em quantas páginas a linha precisa se repetir
+BORDA = 0.06              # Número sozinho só conta como número de página tão perto da borda
+
+_NUMERO = re.compile(r"\d+")
+_PONTILHADO = re.compile(r"[\._]{3,}")
+_SO_PONTILHADO = re.compile(r"[\s\._…·\d]*[\._]{3,}[\s\._…·\d]*")
+
+
+def sem_pontilhado(texto):
+    """Pontilhado de índice ("Composição ........ 3") vira um espaço."""
+    return _PONTILHADO.sub(" ", texto)
+
+def texto_da_linha(linha):
+    return "".join(span["text"] for span in linha.get("spans", []))
+
+def _fora(bbox, corte):
+    x0, y0, x1, y1 = bbox
+    return x1 <= corte.x0 or x0 >= corte.x1 or y1 <= corte.y0 or y0 >= corte.y1
+
+def _anda_com_a_pagina(ocorrencias):
+    """
+    [(página, números da linha)] com o mesmo texto a menos dos números: cada número é igual
+    em todas (código da arte) ou avança junto com a página (numeração).
+    """
+    if len({len(numeros) for _, numeros in ocorrencias}) > 1: return False
+    for posicao in range(len(ocorrencias[0][1])):
+        valores = {numeros[posicao] for _, numeros in ocorrencias}
+        deslocamentos = {numeros[posicao] - p for p, numeros in ocorrencias}
+        if len(valores) > 1 and len(deslocamentos) > 1: return False
+    return True
+
+def linhas_de_ruido(paginas):
+    """
+    `paginas` = [(page do PyMuPDF, blocos do get_text("dict"))]. Devolve {(página, bloco, linha):
+    zona} das linhas a descartar, com zona "topo", "base" ou "corpo" (pontilhado, fora do corte).
+    """
+    ruido, candidatas, por_chave = {}, [], {}
+    for p, (page, blocos) in enumerate(paginas):
+        altura = page.rect.height or 1
+        corte = page.trimbox if page.rotation == 0 and page.trimbox != page.mediabox else None
+        for b, bloco in enumerate(blocos):
+            for l, linha in enumerate(bloco.get("lines", [])):
+                texto = " ".join(texto_da_linha(linha).split())
+                if not texto: continue
+                centro = (linha["bbox"][1] + linha["bbox"][3]) / 2 / altura
+                zona = "topo" if centro < MARGEM else "base" if centro > 1 - MARGEM else "corpo"
+                if (corte is not None and _fora(linha["bbox"], corte)) or _SO_PONTILHADO.fullmatch(texto):
+                    ruido[(p, b, l)] = zona
+                elif zona == "corpo":
+                    continue
+                elif _NUMERO.fullmatch(texto) and BORDA <= centro <= 1 - BORDA:
+                    continue  # Número sozinho longe da borda: célula de tabela, não numeração
+                else:
+                    chave = (round(centro / FAIXA), _NUMERO.sub("#", texto.lower()))
+                    ocorrencia = (p, tuple(int(n) for n in _NUMERO.findall(texto)))
+                    candidatas.append((chave, (p, b, l), zona))
+                    por_chave.setdefault(chave, []).append(ocorrencia)
+
+    if len(paginas) < 2: return ruido
+    minimo = max(2, math.ceil(MIN_FRACAO_PAGINAS * len(paginas)))
+    for (faixa, texto), posicao, zona in candidatas:
+        # Faixas vizinhas também contam: a mesma linha pode cair na borda entre duas
+        ocorrencias = [o for f in (faixa - 1, faixa, faixa + 1) for o in por_chave.get((f, texto), ())]
+        if len({p for p, _ in ocorrencias}) >= minimo and _anda_com_a_pagina(ocorrencias):
+            ruido[posicao] = zona
+    return ruido
+
+def apagar_linhas(page, linhas):
+    """
+    Apaga da página (só o texto, por redação) as `linhas` do get_text("dict"), pela posição:
+    o get_text("text", sort=True) junta linhas de colunas diferentes, então não dá para
+    tirá-las depois pelo conteúdo. A faixa apagada é o meio de cada linha, para não
+    encostar nas linhas vizinhas.
+    """
+    import fitz
+    if not linhas: return
+    for linha in linhas:
+        x0, y0, x1, y1 = linha["bbox"]
+        folga = (y1 - y0) / 4
+        page.add_redact_annot(fitz.Rect(x0, y0 + folga, x1, y1 - folga))
+    page.apply_redactions(images=fitz.PDF_REDACT_IMAGE_NONE, graphics=fitz.PDF_REDACT_LINE_ART_NONE)
@@ -0,0 +1,104 @@
+import datetime
+import hashlib
+import os
+import threading
+import time
+
+from tracing import estimar_tokens
+
+# ----------------- CACHE DE CONTEXTO DA REFERÊNCIA (PROVEDOR) -----------------
+# Nas páginas 1 e 2 a mesma referência Anvisa costuma ser conferida contra várias
+# artes no mesmo dia, e o prompt reenviava o texto inteiro dela a cada vez. O início
+# do prompt (instrução + referência) fica guardado no provedor (context caching do
+# Gemini); as conferências seguintes enviam só o candidato e as regras.
+#
+# A chave é o hash do arquivo de referência + modelo + chave de API (o cache pertence
+# ao projeto da chave; a chave em si nunca é guardada, só um hash dela). O registro
+# local sabe quando cada conteúdo expira: o uso renova a validade (TTL deslizante) e
+# referências paradas somem sozinhas no provedor. Com VALIDADOR_MODELO=fake o
+# substituto é o fake_model.ConteudoEmCacheFalso, em memória.
+#
+#   VALIDADOR_CACHE_CONTEXTO=0                  desliga (prompt inteiro sempre)
+#   VALIDADOR_CACHE_CONTEXTO_TTL_S=3600         validade de cada conteúdo guardado
+#   VALIDADOR_CACHE_CONTEXTO_MIN_TOKENS=4096    abaixo disso o provedor recusa o cache
+
+ATIVO = os.environ.get("VALIDADOR_CACHE_CONTEXTO", "1") != "0"
+TTL_S = int(os.environ.get("VALIDADOR_CACHE_CONTEXTO_TTL_S", "3600"))
+MIN_TOKENS = int(os.environ.get("VALIDADOR_CACHE_CONTEXTO_MIN_TOKENS", "4096"))
+PAUSA_FALHA_S = 600  # Modelo/chave que recusou o cache não é tentado de novo por 10 min
+
+_lock = threading.Lock()
+_registro = {}   # chave -> {"conteudo": objeto do provedor, "expira": time.monotonic()}
+_falhas = {}     # (hash da chave API, modelo) -> time.monotonic() até quando não tentar
+_travas = {}     # chave -> Lock: conferências simultâneas da mesma referência criam um só cache
+
+
+# ----------------- PROVEDOR -----------------
+
+def _classe_cache():
+    if os.environ.get("VALIDADOR_MODELO", "gemini") == "fake":
+        from fake_model import ConteudoEmCacheFalso
+        return ConteudoEmCacheFalso
+    from google.generativeai import caching
+    return caching.CachedContent
+
+def _criar(api_key, modelo, identificador, texto):
+    if os.environ.get("VALIDADOR_MODELO", "gemini") != "fake":
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+    return _classe_cache().create(model=modelo, contents=[texto], ttl=datetime.timedelta(seconds=TTL_S),
+                                  display_name=f"validador-ref-{identificador[:24]}")
+
+def _hash_chave(api_key):
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+def _chave(api_key, modelo, identificador):
+    return f"{_hash_chave(api_key)}|{modelo}|{identificador}"
+
+
+# ----------------- REGISTRO LOCAL -----------------
+
+def obter_contexto(api_key, modelo, identificador, texto):
+    """
+    (conteúdo em cache, situação) para o início de prompt `texto` da referência
+    `identificador`: "reaproveitado", "criado", ou conteúdo None com "desligado",
+    "pequeno" (abaixo do mínimo do provedor) ou "indisponivel" (o provedor recusou).
+    """
+    if not ATIVO: return None, "desligado"
+    if estimar_tokens(texto) < MIN_TOKENS: return None, "pequeno"
+    agora = time.monotonic()
+    if _falhas.get((_hash_chave(api_key), modelo), 0) > agora: return None, "indisponivel"
+
+    chave = _chave(api_key, modelo, identificador)
+    with _lock:
+        _limpar_expirados(agora)
+        trava = _travas.setdefault(chave, threading.Lock())
+    with trava:
+        entrada = _registro.get(chave)
+        if entrada is not None:
+            if entrada["expira"] - time.monotonic() > TTL_S / 2:
+                return entrada["conteudo"], "reaproveitado"
+            try:  # Passou da metade da validade: renova em vez de recriar
+                entrada["conteudo"].update(ttl=datetime.timedelta(seconds=TTL_S))
+                entrada["expira"] = time.monotonic() + TTL_S
+                return entrada["conteudo"], "reaproveitado"
+            except Exception:
+                _registro.pop(chave, None)  # Sumiu no provedor: cria de novo abaixo
+        try:
+            conteudo = _criar(api_key, modelo, identificador, texto)
+        except Exception:
+            _falhas[(_hash_chave(api_key), modelo)] = time.monotonic() + PAUSA_FALHA_S
+            return None, "indisponivel"
+        _registro[chave] = {"conteudo": conteudo, "expira": time.monotonic() + TTL_S}
+        return conteudo, "criado"
+
+def descartar_contexto(api_key, modelo, identificador):
+    """Esquece o conteúdo (o provedor respondeu que ele não existe mais)."""
+    with _lock:
+        _registro.pop(_chave(api_key, modelo, identificador), None)
+
+def _limpar_expirados(agora):
+    for chave in [c for c, e in _registro.items() if e["expira"] <= agora]:
+        del _registro[chave]
+        trava = _travas.get(chave)
+        if trava is not None and not trava.locked(): del _travas[chave]
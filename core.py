@@ -0,0 +1,1053 @@
+import difflib
+import io
+import json
+import os
+import queue
+import re
+import threading
+import time
+import unicodedata
+
+from alignment import alinhar_tolerante
+from anvisa import NAO_ENCONTRADA, destacar_datas, extrair_data_anvisa
+from boilerplate import apagar_linhas, linhas_de_ruido, sem_pontilhado, texto_da_linha
+from context_cache import descartar_contexto, obter_contexto
+from history import buscar_par, chave_par, hash_arquivo, registrar_conferencia
+from jobs import ao_cancelar, cancelamento_solicitado
+from memory import ZOOMS, ArquivoGrande, MemoriaInsuficiente, conteudo_pdf, reservar_raster
+from page_cache import (chave_transcricao, impressao_pagina, obter_raster, obter_transcricao, salvar_raster,
+                        salvar_transcricao)
+from routing import MODELOS, escolher_modelo, fatores_de_conteudo
+from section_cache import planejar_revalidacao, registrar_secao, textos_para_prompt
+from sections import hash_texto, segmentar_secoes, titulo_canonico
+from sentences import unidades
+from spelling import aplicar_ortografia
+from styles import acrescentar, anexar, comparar, localizar, recortar, sem_marcacao
+from styles import aplicar as aplicar_estilo
+from tracing import anotar, anotar_item, estimar_tokens, etapa, exportar, iniciar_rastro
+
+# ----------------- NÚCLEO DAS CONFERÊNCIAS -----------------
+# Tudo o que as páginas fazem ENTRE o upload e a renderização, sem nenhuma chamada
+# ao Streamlit: assim o trabalho pode rodar numa thread do pool de jobs (jobs.py).
+#
+# PyMuPDF, python-docx, PIL e google.generativeai são importados dentro das funções
+# que os usam: abrir uma página (ou a API) não paga o import do SDK do Gemini (~0,7 s)
+# nem dos leitores de arquivo. O primeiro uso carrega o módulo e o sys.modules o mantém
+# para o processo inteiro, então as chamadas seguintes saem de graça.
+
+SECOES_PACIENTE = [
+    "APRESENTAÇÕES", "COMPOSIÇÃO",
+    "PARA QUE ESTE MEDICAMENTO É INDICADO", "COMO ESTE MEDICAMENTO FUNCIONA?",
+    "QUANDO NÃO DEVO USAR ESTE MEDICAMENTO?", "O QUE DEVO SABER ANTES DE USAR ESTE MEDICAMENTO?",
+    "ONDE, COMO E POR QUANTO TEMPO POSSO GUARDAR ESTE MEDICAMENTO?", "COMO DEVO USAR ESTE MEDICAMENTO?",
+    "O QUE DEVO FAZER QUANDO EU ME ESQUECER DE USAR ESTE MEDICAMENTO?",
+    "QUAIS OS MALES QUE ESTE MEDICAMENTO PODE CAUSAR?",
+    "O QUE FAZER SE ALGUEM USAR UMA QUANTIDADE MAIOR DO QUE A INDICADA DESTE MEDICAMENTO?",
+    "DIZERES LEGAIS"
+]
+
+# A Gráfica x Arte confere a mesma lista
+SECOES_COMPLETAS = SECOES_PACIENTE
+
+SECOES_SEM_COMPARACAO = ["APRESENTAÇÕES", "COMPOSIÇÃO", "DIZERES LEGAIS"]
+
+# Prazos por etapa (s). A do modelo corta a chamada no meio (o stream é abortado); a
+# extração é local e só é conferida ao terminar. Somados, ficam abaixo do --timeout do gunicorn.
+PRAZOS_S = {
+    "extracao": float(os.environ.get("VALIDADOR_PRAZO_EXTRACAO_S", "60")),
+    "modelo": float(os.environ.get("VALIDADOR_PRAZO_MODELO_S", "180")),
+}
+MOTIVO_PRAZO = "prazo"
+MOTIVO_CANCELADO = "cancelado"
+
+# Frases mais curtas que isso ("Não.", "Uso oral.") se repetem demais para contar como deslocamento
+MIN_PALAVRAS_DESLOCAMENTO = 4
+
+# Diferenças entre as páginas de texto (1 = Referência x BELFAR, 2 = Conferência MKT).
+# O negrito não passa pelo modelo: vem da extração (styles.py) e é conferido localmente;
+# "estilo_diverge" diz se negrito/itálico diferente torna a seção DIVERGENTE.
+MODOS_TEXTO = {
+    "referencia": {
+        "rigoroso": False,
+        "estilo_diverge": False,
+        "formatacao": [
+            "NÃO CORRIJA O PORTUGUÊS. Copie ipsis litteris.",
+        ],
+    },
+    "mkt": {
+        "rigoroso": True,
+        "estilo_diverge": True,
+        "formatacao": [
+            "NÃO CORRIJA O PORTUGUÊS. Copie ipsis litteris.",
+            "NÃO ACRESCENTE tags nem marcação de estilo: o texto vem puro e deve sair puro.",
+        ],
+    },
+}
+
+
+class ErroConferencia(Exception):
+    """Falha que deve ser mostrada ao usuário (arquivo ilegível, chaves esgotadas, JSON inválido)."""
+
+    def __init__(self, mensagem, resposta_bruta=None):
+        super().__init__(mensagem)
+        self.resposta_bruta = resposta_bruta
+
+
+class ConferenciaInterrompida(ErroConferencia):
+    """Prazo de uma etapa esgotado ou cancelamento pedido; `texto_parcial` é o que o modelo já tinha enviado."""
+
+    def __init__(self, motivo, etapa_interrompida, texto_parcial=""):
+        if motivo == MOTIVO_CANCELADO:
+            mensagem = "Conferência cancelada."
+        else:
+            mensagem = f"Prazo da etapa '{etapa_interrompida}' esgotado ({PRAZOS_S.get(etapa_interrompida, 0):.0f} s)."
+        super().__init__(mensagem, resposta_bruta=texto_parcial or None)
+        self.motivo = motivo
+        self.etapa = etapa_interrompida
+        self.texto_parcial = texto_parcial
+
+
+def verificar_interrupcao(etapa_atual, limite=None):
+    """Entre etapas: cancelamento pedido ou prazo (time.monotonic) vencido encerram a conferência."""
+    if cancelamento_solicitado(): raise ConferenciaInterrompida(MOTIVO_CANCELADO, etapa_atual)
+    if limite is not None and time.monotonic() >= limite: raise ConferenciaInterrompida(MOTIVO_PRAZO, etapa_atual)
+
+
+# ----------------- LIMPEZA E DIFF -----------------
+
+def limpar_ruido_visual(texto, rigoroso=False):
+    if not texto: return ""
+    # Remove caracteres puramente técnicos/invisíveis
+    texto = texto.replace(u'\xa0', u' ')   # Espaço não separável
+    texto = texto.replace(u'\xad', u'')    # Hífen invisível
+    if rigoroso:
+        texto = texto.replace(u'‐', u'-').replace(u'‑', u'-')
+    else:
+        texto = texto.replace(u'\u200b', u'')  # Zero width space
+        # NÃO normalizamos hífens visíveis (-, –, —) para permitir detectar diferenças de símbolos
+
+    texto = re.sub(r'[\._]{3,}', ' ', texto) # Remove pontilhados de índice
+    texto = re.sub(r'[ \t]+', ' ', texto)     # Remove excesso de espaços
+    return texto.strip()
+
+def eh_conteudo_visivel(texto):
+    """
+    Retorna True se o texto tiver qualquer tinta (letra, número, pontuação, símbolo).
+    Retorna False se for apenas espaço, tab ou enter.
+    Isso resolve o problema da 'Divergência Fantasma'.
+    """
+    if not texto: return False
+    # Procura qualquer caractere que NÃO seja espaço em branco (\S)
+    return bool(re.search(r'\S', texto))
+
+def normalizar_rigorosa(texto):
+    """
+    Remove TUDO que não for letra ou número para comparação.
+    Ignora: Espaços, Enters, Pontos soltos, Tags HTML, Quebras de token.
+    Se sobrar 'medicamentoinforme' de um lado e 'medicamentoinforme' do outro, é IGUAL.
+    """
+    if not texto: return ""
+    # Remove tags HTML
+    txt = re.sub(r'<[^>]+>', '', texto)
+    # Remove o token interno de quebra
+    txt = txt.replace('[[BREAK]]', '')
+    # Remove TODOS os espaços em branco (espaço, tab, enter)
+    txt = re.sub(r'\s+', '', txt)
+    return unicodedata.normalize('NFKD', txt).lower().strip()
+
+def _diff_palavras(ref_limpo, novo_limpo, rigoroso=False):
+    """Diff palavra a palavra de dois trechos já limpos; devolve (html do trecho novo, houve_divergencia)."""
+    def visivel(texto):
+        return normalizar_rigorosa(texto) != "" if rigoroso else eh_conteudo_visivel(texto)
+
+    TOKEN_QUEBRA = " [[BREAK]] "
+
+    # Substitui enter por token para manter estrutura visual
+    a = ref_limpo.replace('\n', TOKEN_QUEBRA).split()
+    b = novo_limpo.replace('\n', TOKEN_QUEBRA).split()
+
+    matcher = difflib.SequenceMatcher(None, a, b, autojunk=False)
+    html_output = []
+    eh_divergente = False
+
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        trecho = b[j1:j2]
+        texto_trecho = " ".join(trecho).replace("[[BREAK]]", "\n")
+
+        if tag == 'equal':
+            html_output.append(texto_trecho)
+
+        elif tag == 'replace':
+            texto_antigo = " ".join(a[i1:i2]).replace("[[BREAK]]", "\n")
+            if rigoroso:
+                # Se retirar espaços e enters o texto for igual, NÃO MARCA AMARELO.
+                marcar = normalizar_rigorosa(texto_trecho) != normalizar_rigorosa(texto_antigo) and bool(texto_trecho.strip())
+            else:
+                # AGORA detecta diferença entre • e - pois ambos são visíveis
+                marcar = eh_conteudo_visivel(texto_trecho)
+
+            if marcar:
+                html_output.append(f'<span class="highlight-yellow">{texto_trecho}</span>')
+                eh_divergente = True
+            else:
+                html_output.append(texto_trecho)
+
+        elif tag == 'insert':
+            # O que foi inserido só conta se não for apenas quebra de linha/espaço
+            if visivel(texto_trecho):
+                html_output.append(f'<span class="highlight-yellow">{texto_trecho}</span>')
+                eh_divergente = True
+            else:
+                html_output.append(texto_trecho)
+
+        elif tag == 'delete':
+            # SÓ MARCA DIVERGÊNCIA SE O QUE SUMIU ERA VISÍVEL
+            texto_deletado = " ".join(a[i1:i2]).replace("[[BREAK]]", "\n")
+            if visivel(texto_deletado):
+                eh_divergente = True
+
+    resultado_final = " ".join(html_output)
+    # Limpeza final de quebras duplas criadas pelo processo
+    resultado_final = resultado_final.replace(" \n ", "\n").replace("\n ", "\n").replace(" \n", "\n")
+    return resultado_final, eh_divergente
+
+def _juntar(unidades_trecho):
+    """Frases de volta em texto, com os separadores entre elas (sem o do fim)."""
+    return "".join(frase + separador for frase, separador in unidades_trecho[:-1]) + (unidades_trecho[-1][0] if unidades_trecho else "")
+
+def gerar_diff_html(texto_ref, texto_novo, rigoroso=False):
+    """
+    Diff em dois níveis; devolve (html do texto novo com amarelo, houve_divergencia).
+    rigoroso=True (Conferência MKT) ignora trechos que só diferem em espaços/tags.
+
+    1. As frases (sentences.py) dos dois lados são alinhadas pela chave normalizada, como
+       âncoras: frases idênticas saem direto, sem diff de palavras.
+    2. O diff palavra a palavra só roda dentro de cada bloco de frases que não bateu.
+    Uma frase que sumiu de um ponto e reapareceu em outro é um bloco DESLOCADO
+    (highlight-moved), e não uma remoção + inserção pintadas de amarelo.
+    """
+    ref_limpo = limpar_ruido_visual(texto_ref or "", rigoroso)
+    novo_limpo = limpar_ruido_visual(texto_novo or "", rigoroso)
+    if ref_limpo == novo_limpo: return novo_limpo, False
+
+    def chave(frase):
+        return normalizar_rigorosa(frase) if rigoroso else re.sub(r'\s+', ' ', frase)
+
+    unidades_ref, unidades_novo = unidades(ref_limpo), unidades(novo_limpo)
+    chaves_ref = [chave(f) for f, _ in unidades_ref]
+    chaves_novo = [chave(f) for f, _ in unidades_novo]
+    opcodes = difflib.SequenceMatcher(None, chaves_ref, chaves_novo, autojunk=False).get_opcodes()
+
+    # Deslocamento: frase (com conteúdo) que saiu de um bloco e entrou em outro
+    removidas = {c for tag, i1, i2, _, _ in opcodes if tag != 'equal' for c in chaves_ref[i1:i2]}
+    tamanhos = {c: len(f.split()) for tag, _, _, j1, j2 in opcodes if tag != 'equal'
+                for (f, _), c in zip(unidades_novo[j1:j2], chaves_novo[j1:j2])}
+    deslocadas = {c for c in removidas & tamanhos.keys() if tamanhos[c] >= MIN_PALAVRAS_DESLOCAMENTO}
+
+    partes, eh_divergente = [], False
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == 'equal':
+            partes.append(_juntar(unidades_novo[j1:j2]) + unidades_novo[j2 - 1][1].strip(" "))
+            continue
+        # Frases deslocadas saem do diff de palavras dos dois lados
+        trecho_ref = [u for u, c in zip(unidades_ref[i1:i2], chaves_ref[i1:i2]) if c not in deslocadas]
+        k = j1
+        while k < j2:
+            frase, separador = unidades_novo[k]
+            if chaves_novo[k] in deslocadas:
+                partes.append(f'<span class="highlight-moved" title="Trecho deslocado em relação à referência">{frase}</span>{separador.strip(" ")}')
+                eh_divergente, k = True, k + 1
+                continue
+            # Sequência de frases não deslocadas: diff de palavras contra o que sobrou do bloco da referência
+            fim = next((x for x in range(k, j2) if chaves_novo[x] in deslocadas), j2)
+            html_trecho, divergiu = _diff_palavras(_juntar(trecho_ref), _juntar(unidades_novo[k:fim]), rigoroso)
+            partes.append(html_trecho + unidades_novo[fim - 1][1].strip(" "))
+            eh_divergente, trecho_ref, k = eh_divergente or divergiu, [], fim
+        if trecho_ref:
+            # Sobrou referência sem par no candidato: remoção, que só conta se era visível
+            _, divergiu = _diff_palavras(_juntar(trecho_ref), "", rigoroso)
+            eh_divergente = eh_divergente or divergiu
+
+    return " ".join(p for p in partes if p).replace(" \n", "\n").replace("\n ", "\n"), eh_divergente
+
+
+# ----------------- EXTRAÇÃO DE TEXTO -----------------
+
+def arquivo_em_memoria(nome, dados):
+    """
+    Arquivo 'de upload' a partir de bytes, para rodar fora da sessão do Streamlit.
+    Upload grande guardado em disco (memory.ArquivoGrande) é aberto por mmap, sem cópia.
+    """
+    if isinstance(dados, ArquivoGrande): return dados.abrir(nome)
+    arquivo = io.BytesIO(dados)
+    arquivo.name = nome
+    return arquivo
+
+def interpretar_paginas(texto):
+    """
+    Intervalo de páginas digitado ("1-3, 5") -> tupla ordenada de índices a partir de 0;
+    vazio = None (todas). Sobe ValueError com a mensagem para o usuário.
+    """
+    if not texto or not texto.strip(): return None
+    paginas = set()
+    for parte in re.split(r"[,;]", texto):
+        parte = parte.strip()
+        if not parte: continue
+        achado = re.fullmatch(r"(\d+)\s*(?:-\s*(\d+))?", parte)
+        if not achado: raise ValueError(f"Intervalo de páginas inválido: \"{parte}\" (use, por exemplo, 1-3, 5).")
+        inicio, fim = int(achado.group(1)), int(achado.group(2) or achado.group(1))
+        if inicio < 1 or fim < inicio: raise ValueError(f"Intervalo de páginas inválido: \"{parte}\".")
+        paginas.update(range(inicio - 1, fim))
+    return tuple(sorted(paginas)) or None
+
+def descrever_paginas(paginas):
+    """Inverso de interpretar_paginas, para mostrar no relatório: (0, 1, 2, 4) -> "1-3, 5"."""
+    grupos = []
+    for pagina in paginas:
+        if grupos and pagina == grupos[-1][1] + 1: grupos[-1][1] = pagina
+        else: grupos.append([pagina, pagina])
+    return ", ".join(f"{a + 1}" if a == b else f"{a + 1}-{b + 1}" for a, b in grupos)
+
+def paginas_do_pdf(doc, paginas=None):
+    """Páginas do PyMuPDF a ler: todas, ou só as escolhidas (números fora do documento são ignorados)."""
+    if paginas is None: return list(doc)
+    return [doc[n] for n in paginas if n < doc.page_count]
+
+def registrar_ruido(ruido, lidas):
+    """Linhas de cabeçalho/rodapé descartadas (boilerplate.py) vão para o rastro da conferência."""
+    if ruido:
+        anotar_item("ruido_de_pagina", {"linhas": len(ruido), "caracteres": sum(
+            len(texto_da_linha(lidas[p][1][b]["lines"][l])) for p, b, l in ruido)})
+
+def extract_text_from_file(uploaded_file, paginas=None):
+    """
+    (texto puro, estilos): o negrito/itálico/sobrescrito/sublinhado de cada trecho vai num
+    RLE paralelo (styles.py) em vez de tags <b> no meio das palavras.
+    `paginas` (interpretar_paginas) restringe a leitura de PDFs; DOCX não tem páginas.
+    """
+    import docx  # Para ler DOCX
+    import fitz  # PyMuPDF
+    partes, estilos = [], []
+    try:
+        if uploaded_file.name.lower().endswith('.pdf'):
+            doc = fitz.open(stream=conteudo_pdf(uploaded_file), filetype="pdf")
+            lidas = [(page, page.get_text("dict", flags=11, sort=True)["blocks"]) for page in paginas_do_pdf(doc, paginas)]
+            # Cabeçalhos, rodapés, números de página e marcas de corte não entram no texto (boilerplate.py)
+            ruido = linhas_de_ruido(lidas)
+            registrar_ruido(ruido, lidas)
+            for n_pag, (page, blocks) in enumerate(lidas):
+                for n_bloco, b in enumerate(blocks):
+                    linhas = [l for n_linha, l in enumerate(b.get("lines", [])) if (n_pag, n_bloco, n_linha) not in ruido]
+                    if b.get("lines") and not linhas: continue  # Bloco inteiro era ruído
+                    bloco, estilos_bloco = [], []
+                    for l in linhas:
+                        for s in l.get("spans", []):
+                            font_props = s["font"].lower()
+                            is_bold = (s["flags"] & 16) or "bold" in font_props or "black" in font_props
+                            is_italic = (s["flags"] & 2) or "italic" in font_props or "oblique" in font_props
+                            atributos = ("b" if is_bold else "") + ("i" if is_italic else "") + ("s" if s["flags"] & 1 else "")
+                            acrescentar(bloco, estilos_bloco, sem_pontilhado(s["text"]), atributos)
+                        acrescentar(bloco, estilos_bloco, " ")
+                    texto_bloco = "".join(bloco)
+                    inicio, fim = len(texto_bloco) - len(texto_bloco.lstrip()), len(texto_bloco.rstrip())
+                    anexar(partes, estilos, texto_bloco[inicio:fim], recortar(estilos_bloco, inicio, fim))
+                    acrescentar(partes, estilos, "\n\n")
+
+        elif uploaded_file.name.lower().endswith('.docx'):
+            doc = docx.Document(uploaded_file)
+            for para in doc.paragraphs:
+                for run in para.runs:
+                    atributos = ("b" if run.bold else "") + ("i" if run.italic else "") \
+                        + ("u" if run.underline else "") + ("s" if run.font.superscript else "")
+                    acrescentar(partes, estilos, run.text, atributos)
+                acrescentar(partes, estilos, "\n\n")
+        return "".join(partes), estilos
+    except Exception as e:
+        return "", []
+
+def process_file_content(uploaded_file, paginas=None):
+    """
+    Lógica Híbrida:
+    1. Tenta extrair TEXTO puro do PDF (com ordenação visual para colunas).
+    2. Se não tiver texto (scan), converte para IMAGEM.
+    3. Se for DOCX, extrai texto direto.
+    Com `paginas` (interpretar_paginas), só essas páginas do PDF são lidas ou rasterizadas.
+    """
+    import docx
+    import fitz
+    from PIL import Image
+    try:
+        filename = uploaded_file.name.lower()
+
+        # --- PROCESSAMENTO DE PDF ---
+        if filename.endswith(".pdf"):
+            doc = fitz.open(stream=conteudo_pdf(uploaded_file), filetype="pdf")
+            paginas_lidas = paginas_do_pdf(doc, paginas)
+            # Cabeçalhos, rodapés, números de página e marcas de corte (boilerplate.py)
+            lidas = [(page, page.get_text("dict", flags=fitz.TEXTFLAGS_TEXT)["blocks"]) for page in paginas_lidas]
+            ruido = linhas_de_ruido(lidas)
+
+            # Tenta pegar texto digital primeiro
+            full_text = ""
+            has_digital_text = False
+
+            for n_pag, page in enumerate(paginas_lidas):
+                # O ruído sai da página pela posição antes da leitura (só a cópia em memória)
+                apagar_linhas(page, [lidas[n_pag][1][b]["lines"][l] for (p, b, l) in ruido if p == n_pag])
+                # MUDANÇA CRÍTICA AQUI: sort=True força a leitura por colunas (layout visual)
+                text = page.get_text("text", sort=True)
+                if len(text.strip()) > 50:
+                    has_digital_text = True
+                full_text += sem_pontilhado(text) + "\n"
+
+            # SE TIVER TEXTO DIGITAL
+            if has_digital_text:
+                registrar_ruido(ruido, lidas)
+                return [full_text]
+
+            # SE NÃO TIVER TEXTO (É SCAN/IMAGEM)
+            # O dpi sai do governador de memória (memory.py): menor se faltar memória.
+            # Páginas já rasterizadas (mesma impressão digital, page_cache.py) saem do disco.
+            else:
+                images, em_cache = [], 0
+                with reservar_raster([(page.rect.width, page.rect.height) for page in paginas_lidas]) as reserva:
+                    matriz, dpi = fitz.Matrix(reserva.zoom, reserva.zoom), round(72 * reserva.zoom)
+                    for page in paginas_lidas:
+                        impressao = impressao_pagina(page)
+                        jpeg = obter_raster(impressao, dpi) if impressao else None
+                        if jpeg is None:
+                            pix = page.get_pixmap(matrix=matriz)
+                            jpeg = pix.tobytes("jpeg")
+                            del pix  # Só a imagem fica viva até o fim do job
+                            if impressao: salvar_raster(impressao, dpi, jpeg)
+                        else:
+                            em_cache += 1
+                        imagem = Image.open(io.BytesIO(jpeg))
+                        if impressao: imagem.info["impressao"] = f"{impressao}_{dpi}"
+                        reserva.vincular(imagem, imagem.width * imagem.height * 3)
+                        images.append(imagem)
+                    anotar_item("rasters", dict(reserva.resumo(), paginas=len(images), em_cache=em_cache))
+                return images
+
+        # --- PROCESSAMENTO DE IMAGENS DIRETAS ---
+        elif filename.endswith((".jpg", ".png", ".jpeg")):
+            return [Image.open(uploaded_file)]
+
+        # --- PROCESSAMENTO DE DOCX ---
+        elif filename.endswith(".docx"):
+            doc = docx.Document(uploaded_file)
+            full_text = []
+            for para in doc.paragraphs:
+                full_text.append(para.text)
+            return ["\n".join(full_text)]
+
+    except MemoriaInsuficiente: raise
+    except: return []
+
+
+# ----------------- MODELO (FAILOVER DE CHAVES) -----------------
+
+def keys_do_ambiente():
+    """Chaves para uso fora do Streamlit (lote/API), na mesma ordem dos secrets das páginas."""
+    return [k for k in (os.environ.get("GEMINI_API_KEY"), os.environ.get("GEMINI_API_KEY2"), os.environ.get("GEMINI_API_KEY3")) if k]
+
+def criar_modelo(api_key, modelo=None, conteudo_em_cache=None):
+    """
+    Gemini real por padrão; com VALIDADOR_MODELO=fake usa o substituto local
+    (fake_model.py) para rodar offline e em testes de carga.
+    `modelo` vem do roteamento (routing.py); sem ele, o nível padrão.
+    `conteudo_em_cache` (context_cache.obter_contexto) é o início do prompt já guardado no provedor.
+    """
+    modelo = modelo or MODELOS["padrao"]
+    generation_config = {"response_mime_type": "application/json", "temperature": 0.0}
+    if os.environ.get("VALIDADOR_MODELO", "gemini") == "fake":
+        from fake_model import FakeGenerativeModel
+        return FakeGenerativeModel(modelo, api_key=api_key, generation_config=generation_config,
+                                   conteudo_em_cache=conteudo_em_cache)
+    import google.generativeai as genai
+    genai.configure(api_key=api_key)
+    if conteudo_em_cache is not None:
+        return genai.GenerativeModel.from_cached_content(conteudo_em_cache, generation_config=generation_config)
+    return genai.GenerativeModel(modelo, generation_config=generation_config)
+
+def _abortar_stream(resposta):
+    """Cancela a chamada gRPC por trás de um generate_content(stream=True) ainda aberto."""
+    alvo = getattr(resposta, "_iterator", None) or resposta
+    cancelar = getattr(alvo, "cancel", None)
+    if cancelar is not None: cancelar()
+
+def _gerar_em_stream(model, payload, request_options, limite):
+    """
+    generate_content(stream=True) numa thread auxiliar; a thread do job só espera pelos
+    pedaços, pelo prazo ou pelo cancelamento, o que vier primeiro. Nos dois últimos o
+    stream é abortado (a requisição cai de fato) e sobe ConferenciaInterrompida com o
+    texto recebido até ali. Antes do primeiro pedaço o SDK ainda não expõe a chamada:
+    o worker é liberado na hora e o stream é cortado assim que a thread auxiliar o recebe.
+    """
+    fila = queue.Queue()
+    trava = threading.Lock()
+    estado = {"resposta": None, "abortado": False}
+    opcoes = dict(request_options or {}, timeout=max(1.0, limite - time.monotonic()))
+
+    def abortar():
+        with trava:
+            estado["abortado"] = True
+            resposta = estado["resposta"]
+        if resposta is not None: _abortar_stream(resposta)
+
+    def produzir():
+        try:
+            resposta = model.generate_content(payload, stream=True, request_options=opcoes)
+            with trava:
+                estado["resposta"] = resposta
+                abortado = estado["abortado"]
+            if abortado:
+                _abortar_stream(resposta)
+                return
+            for pedaco in resposta:
+                try: fila.put(("texto", pedaco.text))
+                except ValueError: pass  # Pedaço sem partes (só metadados de término)
+            fila.put(("fim", resposta))
+        except Exception as e:
+            fila.put(("erro", e))
+
+    threading.Thread(target=produzir, name="stream-modelo", daemon=True).start()
+    desfazer = ao_cancelar(lambda: fila.put((MOTIVO_CANCELADO, None)))
+    partes = []
+    try:
+        while True:
+            try:
+                tipo, valor = fila.get(timeout=max(0.0, limite - time.monotonic()))
+            except queue.Empty:
+                tipo, valor = MOTIVO_PRAZO, None
+            if tipo == "texto":
+                partes.append(valor)
+                continue
+            if tipo == "fim":
+                return valor
+            if tipo == "erro":
+                if time.monotonic() < limite: raise valor
+                tipo = MOTIVO_PRAZO  # O timeout da requisição é o próprio prazo da etapa
+            abortar()
+            raise ConferenciaInterrompida(tipo, "modelo", "".join(partes))
+    finally:
+        desfazer()
+
+def chamar_modelo(keys_validas, payload, request_options=None, avisos=None, modelo=None, prazo_s=None, contexto=None):
+    """
+    Tenta cada chave em ordem; a primeira que responder vence.
+    Trocas de chave são registradas em `avisos` (lista) para a página mostrar depois.
+    Se um modelo escolhido pelo roteamento falhar em todas as chaves, repete no nível padrão.
+    Com `prazo_s`, a resposta vem em stream e pode ser interrompida (prazo esgotado ou job
+    cancelado): sobe ConferenciaInterrompida com o texto parcial, sem tentar outra chave.
+    Com `contexto` ({"id", "texto"}), `texto` é o início do prompt e `payload` o resto: o
+    início vai para o cache de contexto do provedor (context_cache.py) e, se não der,
+    volta a ser enviado junto.
+    """
+    modelo = modelo or MODELOS["padrao"]
+    limite = time.monotonic() + prazo_s if prazo_s is not None else None
+    completo = contexto["texto"] + payload if contexto else payload
+    anotar(modelo=modelo)
+
+    def gerar(model, conteudo):
+        if limite is not None:
+            return _gerar_em_stream(model, conteudo, request_options, limite)
+        if request_options is None:
+            return model.generate_content(conteudo)
+        return model.generate_content(conteudo, request_options=request_options)
+
+    ultimo_erro = ""
+    for i, api_key in enumerate(keys_validas):
+        verificar_interrupcao("modelo", limite)
+        anotar(chave_usada=i + 1, tentativas=i + 1)  # Índice da chave, nunca a chave em si
+        try:
+            em_cache = None
+            if contexto:
+                em_cache, situacao = obter_contexto(api_key, modelo, contexto["id"], contexto["texto"])
+                anotar(cache_contexto=situacao)
+            if em_cache is None:
+                response = gerar(criar_modelo(api_key, modelo), completo)
+            else:
+                try:
+                    response = gerar(criar_modelo(api_key, modelo, em_cache), payload)
+                except ConferenciaInterrompida:
+                    raise
+                except Exception as erro:
+                    if getattr(erro, "code", None) != 404: raise  # NotFound (sem importar o google.api_core aqui)
+                    # Expirou no provedor antes do previsto: esta chamada vai inteira
+                    descartar_contexto(api_key, modelo, contexto["id"])
+                    anotar(cache_contexto="expirado")
+                    response = gerar(criar_modelo(api_key, modelo), completo)
+            uso = getattr(response, "usage_metadata", None)
+            if uso is not None:
+                anotar(tokens_entrada=getattr(uso, "prompt_token_count", None),
+                       tokens_saida=getattr(uso, "candidates_token_count", None),
+                       tokens_em_cache=getattr(uso, "cached_content_token_count", None) or 0)
+            return response
+        except ConferenciaInterrompida:
+            raise
+        except Exception as e:
+            ultimo_erro = str(e)
+            anotar(ultimo_erro=type(e).__name__)
+            if i < len(keys_validas) - 1:
+                if avisos is not None: avisos.append(f"⚠️ Chave {i+1} falhou. Trocando para Chave {i+2}...")
+                continue
+    if keys_validas and modelo != MODELOS["padrao"]:
+        if avisos is not None: avisos.append(f"⚠️ {modelo} falhou. Repetindo com {MODELOS['padrao']}...")
+        anotar(rota_escalada=True)
+        return chamar_modelo(keys_validas, payload, request_options, avisos,
+                             prazo_s=limite - time.monotonic() if limite is not None else None, contexto=contexto)
+    raise ErroConferencia(f"Erro Fatal: {ultimo_erro or 'nenhuma chave API disponível.'}")
+
+def ler_json_modelo(texto_bruto):
+    """Remove cercas de markdown e lê o JSON com strict=False (quebras de linha dentro das strings)."""
+    if "```json" in texto_bruto:
+        texto_bruto = texto_bruto.split("```json")[1].split("```")[0]
+    elif "```" in texto_bruto:
+        texto_bruto = texto_bruto.split("```")[1].split("```")[0]
+    return json.loads(texto_bruto.strip(), strict=False)
+
+def secoes_parciais(texto_bruto):
+    """
+    Seções completas de uma resposta cortada no meio (stream interrompido): todo objeto
+    que chegou a fechar dentro da lista "secoes". O que ficou pela metade é descartado.
+    """
+    inicio = re.search(r'"secoes"\s*:\s*\[', texto_bruto)
+    if not inicio: return []
+    decodificador, separador = json.JSONDecoder(strict=False), re.compile(r'[\s,]*')
+    secoes, posicao = [], inicio.end()
+    while True:
+        posicao = separador.match(texto_bruto, posicao).end()
+        try:
+            objeto, posicao = decodificador.raw_decode(texto_bruto, posicao)
+        except ValueError:
+            return secoes
+        if isinstance(objeto, dict): secoes.append(objeto)
+
+
+# ----------------- CONFERÊNCIA DE TEXTO (PÁGINAS 1 E 2) -----------------
+
+def montar_secao(titulo, txt_ref, txt_mkt, rigoroso=False, estilo_ref=None, estilo_mkt=None, estilo_diverge=False):
+    """
+    Aplica as regras da seção (blindada, data em azul ou diff) e devolve o item do relatório.
+    O diff roda só no texto; `estilo_ref`/`estilo_mkt` (RLE do styles.py, ou None se
+    desconhecido) são comparados à parte e reaplicados no HTML no fim.
+    """
+    titulo_upper = titulo.upper()
+    eh_secao_blindada = any(blindada in titulo_upper for blindada in SECOES_SEM_COMPARACAO)
+    diferencas_estilo = {}
+
+    if eh_secao_blindada:
+        status = "CONFORME"
+        if "DIZERES LEGAIS" in titulo_upper:
+            html_ref = destacar_datas(txt_ref)
+            html_mkt = destacar_datas(txt_mkt)
+        else:
+            html_ref = txt_ref
+            html_mkt = txt_mkt
+    else:
+        html_mkt, teve_diff = gerar_diff_html(txt_ref, txt_mkt, rigoroso)
+        diferencas_estilo = comparar(txt_ref, estilo_ref, txt_mkt, estilo_mkt)
+        status = "DIVERGENTE" if teve_diff or (estilo_diverge and diferencas_estilo) else "CONFORME"
+        html_ref = txt_ref
+
+    html_ref = aplicar_estilo(html_ref, txt_ref, estilo_ref)
+    html_mkt = aplicar_estilo(html_mkt, txt_mkt, estilo_mkt, diferencas_estilo)
+    return {
+        "titulo": titulo,
+        "texto_anvisa": html_ref.replace('\n', '<br>'),
+        "texto_mkt": html_mkt.replace('\n', '<br>'),
+        "status": status,
+        "estilo": len(diferencas_estilo),
+    }
+
+def montar_contexto_textos(texto_ref):
+    """Início do prompt das páginas 1 e 2: só depende da referência, então é ele que vai para o cache de contexto."""
+    return f"""
+            Você é um Extrator de Dados Farmacêuticos Rigoroso.
+
+            INPUT TEXTO 1 (REF):
+            {texto_ref[:150000]}
+"""
+
+def montar_prompt_textos(modo, texto_mkt, secoes):
+    """Resto do prompt (candidato, regras do modo e seções pendentes), enviado a cada conferência."""
+    formatacao = "\n".join(f"               - {regra}" for regra in MODOS_TEXTO[modo]["formatacao"])
+    return f"""
+            INPUT TEXTO 2 (MKT):
+            {texto_mkt[:150000]}
+
+            SUA MISSÃO:
+            1. **CONTEÚDO COMPLETO:** - Extraia TODO o texto entre um título e outro.
+               - NÃO PARE no meio. NÃO RESUMA.
+
+            2. **FORMATAÇÃO:**
+{formatacao}
+
+            LISTA DE SEÇÕES ESPERADAS: {secoes}
+
+            SAÍDA JSON:
+            {{
+                "secoes": [
+                    {{
+                        "titulo": "NOME DA SEÇÃO",
+                        "texto_anvisa": "Texto completo com \\n",
+                        "texto_mkt": "Texto completo com \\n"
+                    }}
+                ]
+            }}
+            """
+
+def preparar_referencia(nome_ref, dados_ref, paginas=None):
+    """
+    Metade "referência" da conferência (extração, seções e data Anvisa), feita uma vez
+    e reaproveitada pela biblioteca (library.py) e pelo modo um-contra-muitos.
+    Com `paginas`, só essas páginas do PDF (a biblioteca guarda sempre o arquivo inteiro).
+    """
+    texto, estilos = extract_text_from_file(arquivo_em_memoria(nome_ref, dados_ref), paginas)
+    return {
+        "arquivo": nome_ref,
+        "texto": texto,
+        "estilos": estilos,
+        "segmentos": segmentar_secoes(texto, SECOES_PACIENTE),
+        "data_anvisa": extrair_data_anvisa(texto),
+        "paginas": paginas,
+    }
+
+def descrever_selecao(secoes_escolhidas, paginas_ref, paginas_cand, secoes_no_relatorio, secoes_oficiais):
+    """Campo "selecao" do resultado de uma conferência parcial por escolha do usuário (None se foi completa)."""
+    if not (secoes_escolhidas or paginas_ref or paginas_cand): return None
+    return {
+        "secoes": list(secoes_escolhidas or []),
+        "paginas_ref": descrever_paginas(paginas_ref) if paginas_ref else None,
+        "paginas_cand": descrever_paginas(paginas_cand) if paginas_cand else None,
+        "fora": [t for t in secoes_oficiais if t not in secoes_no_relatorio],
+    }
+
+def descrever_interrupcao(interrupcao, faltando):
+    """Campo "parcial" do resultado: por que parou e quais seções ficaram de fora."""
+    return {"motivo": interrupcao.motivo, "etapa": interrupcao.etapa, "mensagem": str(interrupcao), "faltando": faltando}
+
+def do_historico(rastro, registro):
+    """Resultado guardado (history.py) devolvido como se fosse a conferência de agora."""
+    anotar(historico=registro["id"])
+    tempos = rastro.resumo()
+    exportar(tempos)
+    return dict(registro["resultado"], historico={"id": registro["id"], "conferido_em": registro["conferido_em"]}, tempos=tempos,
+                par=chave_par(registro["modo"], registro["hash_ref"], registro["hash_cand"]))
+
+def conferir_textos(modo, nome_ref, dados_ref, nome_mkt, dados_mkt, keys_validas, referencia=None, usar_historico=True,
+                    secoes_escolhidas=None, paginas_ref=None, paginas_cand=None):
+    """
+    Pipeline completo das páginas 1 e 2: extração, data Anvisa local, reaproveitamento
+    por seção, chamada ao modelo (só se necessário) e diff.
+    Com `referencia` (de preparar_referencia), nome_ref/dados_ref e paginas_ref são ignorados.
+    O mesmo par de arquivos já conferido sai direto do histórico (usar_historico=False refaz).
+    Se o modelo for interrompido (prazo ou cancelamento), as seções já prontas voltam como
+    relatório parcial ("parcial" no resultado), que não vai para o histórico.
+    `secoes_escolhidas` e `paginas_ref`/`paginas_cand` (interpretar_paginas) restringem a
+    conferência: só essas seções vão ao modelo e ao diff, mais as que o cache de seções já
+    tem prontas. O relatório sai com "selecao" e não vai para o histórico nem sai dele.
+    """
+    with iniciar_rastro(modo) as rastro:
+        rigoroso, estilo_diverge = MODOS_TEXTO[modo]["rigoroso"], MODOS_TEXTO[modo]["estilo_diverge"]
+        with etapa("historico") as registro:
+            # Referência da biblioteca não tem bytes: vale o hash do texto extraído
+            hash_ref = hash_arquivo(dados_ref) if dados_ref else f"texto:{hash_texto(referencia['texto'])}"
+            hash_mkt = hash_arquivo(dados_mkt)
+            # Conferência de só uma parte não sai do histórico, que guarda o relatório completo
+            selecionada = bool(secoes_escolhidas or paginas_ref or paginas_cand)
+            anterior = buscar_par(modo, hash_ref, hash_mkt) if usar_historico and not selecionada else None
+            registro["encontrado"] = anterior is not None
+        if anterior: return do_historico(rastro, anterior)
+
+        limite_extracao = time.monotonic() + PRAZOS_S["extracao"]
+        with etapa("extracao", bytes_entrada=len(dados_mkt) + (len(dados_ref) if referencia is None else 0)) as registro:
+            if referencia is None:
+                referencia = preparar_referencia(nome_ref, dados_ref, paginas_ref)
+            else:
+                registro["referencia_preparada"] = True
+            t_anvisa, estilos_ref = referencia["texto"], referencia.get("estilos")  # Biblioteca antiga: sem estilos
+            paginas_ref = referencia.get("paginas")
+            t_mkt, estilos_mkt = extract_text_from_file(arquivo_em_memoria(nome_mkt, dados_mkt), paginas_cand)
+            registro["caracteres"] = len(t_anvisa) + len(t_mkt)
+        verificar_interrupcao("extracao", limite_extracao)
+
+        if len(t_anvisa) < 20 or len(t_mkt) < 20:
+            raise ErroConferencia("Erro: Arquivo vazio ou ilegível." + (" Confira as páginas escolhidas." if paginas_ref or paginas_cand else ""))
+
+        # Data Anvisa localizada no texto extraído (o modelo não precisa procurá-la)
+        data_ref = referencia["data_anvisa"]
+        data_mkt = extrair_data_anvisa(t_mkt)
+
+        # Seções sem alteração desde a última conferência não voltam para o modelo
+        with etapa("planejamento"):
+            plano = planejar_revalidacao(modo, t_anvisa, t_mkt, SECOES_PACIENTE, segmentos_ref=referencia["segmentos"],
+                                         estilos_ref=estilos_ref, estilos_cand=estilos_mkt, selecao=secoes_escolhidas)
+        secoes_por_titulo = dict(plano["reaproveitadas"])
+        secoes_extras = []
+        interrupcao = None
+
+        def secao(titulo, txt_ref, txt_mkt):
+            """montar_secao com o estilo de cada trecho achado no documento de origem."""
+            return montar_secao(titulo, txt_ref, txt_mkt, rigoroso, localizar(t_anvisa, estilos_ref, txt_ref),
+                                localizar(t_mkt, estilos_mkt, txt_mkt), estilo_diverge)
+
+        if plano["identicos"]:
+            # Documentos iguais após normalização: nenhuma chamada ao modelo
+            with etapa("diff"):
+                if plano["segmentos_ref"]:
+                    for titulo, txt in plano["segmentos_ref"].items():
+                        if secoes_escolhidas and titulo not in secoes_escolhidas: continue
+                        secoes_por_titulo[titulo] = secao(titulo, txt, plano["segmentos_cand"].get(titulo, txt))
+                else:
+                    secoes_extras.append(secao("DOCUMENTO COMPLETO", t_anvisa, t_mkt))
+
+        elif plano["pendentes"]:
+            with etapa("prompt") as registro:
+                ref_prompt, mkt_prompt = textos_para_prompt(plano, t_anvisa, t_mkt)
+                # Só a referência inteira se repete entre candidatos: trechos de seções pendentes não vão para o cache
+                identificador = hash_ref + (f":p{descrever_paginas(paginas_ref)}" if paginas_ref else "")
+                contexto = {"id": identificador, "texto": montar_contexto_textos(ref_prompt)}
+                prompt = montar_prompt_textos(modo, mkt_prompt, plano["pendentes"])
+                if ref_prompt != t_anvisa:
+                    prompt, contexto = contexto["texto"] + prompt, None
+                inicio = contexto["texto"] if contexto else ""
+                registro.update(caracteres=len(inicio) + len(prompt), tokens_estimados=estimar_tokens(inicio) + estimar_tokens(prompt),
+                                tokens_contexto=estimar_tokens(inicio))
+                rota = escolher_modelo(fatores_de_conteudo([ref_prompt, mkt_prompt], secoes=len(plano["pendentes"])))
+                anotar(rota=rota)
+            with etapa("modelo", modelo=rota["modelo"]) as registro:
+                try:
+                    response = chamar_modelo(keys_validas, prompt, request_options={'retry': None}, modelo=rota["modelo"],
+                                             prazo_s=PRAZOS_S["modelo"], contexto=contexto)
+                    texto_resposta = response.text
+                except ConferenciaInterrompida as e:
+                    interrupcao, texto_resposta = e, e.texto_parcial
+                    registro["interrompida"] = e.motivo
+                registro["caracteres_resposta"] = len(texto_resposta)
+
+            with etapa("json"):
+                try:
+                    resultado = {"secoes": secoes_parciais(texto_resposta)} if interrupcao else json.loads(texto_resposta)
+                except Exception as e:
+                    raise ErroConferencia(f"Erro ao processar JSON: {e}", resposta_bruta=texto_resposta)
+
+            with etapa("diff"):
+                for item in resultado.get("secoes", []):
+                    titulo = item.get('titulo', '').strip()
+                    montada = secao(titulo, sem_marcacao(item.get('texto_anvisa', '')).strip(), sem_marcacao(item.get('texto_mkt', '')).strip())
+                    oficial = titulo_canonico(titulo, SECOES_PACIENTE)
+                    if secoes_escolhidas and oficial not in secoes_escolhidas:
+                        continue  # O modelo viu o texto inteiro (segmentação incompleta), mas só a escolha entra
+                    if oficial is None:
+                        secoes_extras.append(montada)
+                    elif oficial not in secoes_por_titulo:
+                        secoes_por_titulo[oficial] = montada
+                        registrar_secao(plano, oficial, montada)
+
+        if interrupcao and not secoes_por_titulo and not secoes_extras: raise interrupcao  # Nada pronto para mostrar
+        secoes = [secoes_por_titulo[t] for t in SECOES_PACIENTE if t in secoes_por_titulo] + secoes_extras
+        # Depois do cache de seções: o léxico pode mudar sem invalidar as seções salvas
+        with etapa("ortografia") as registro:
+            registro["marcacoes"] = aplicar_ortografia(secoes, "texto_mkt")
+
+        anotar(identicos=plano["identicos"], reaproveitadas=len(plano["reaproveitadas"]), pendentes=len(plano["pendentes"]))
+        if interrupcao: anotar(interrompida=interrupcao.motivo)
+        tempos = rastro.resumo()
+        exportar(tempos)
+        resultado = {
+            "data_ref": data_ref,
+            "data_mkt": data_mkt,
+            "secoes": secoes,
+            "identicos": plano["identicos"],
+            "reaproveitadas": len(plano["reaproveitadas"]),
+            "tempos": tempos,
+            "par": chave_par(modo, hash_ref, hash_mkt),  # remover_conferencia esquece os jobs com este resultado
+        }
+        selecao = descrever_selecao(secoes_escolhidas, paginas_ref, paginas_cand, secoes_por_titulo, SECOES_PACIENTE)
+        if selecao: resultado["selecao"] = selecao
+        if interrupcao:
+            resultado["parcial"] = descrever_interrupcao(interrupcao, [t for t in plano["pendentes"] if t not in secoes_por_titulo])
+        elif not selecao:  # Conferência de só uma parte não vira a resposta definitiva do par
+            registrar_conferencia(modo, referencia["arquivo"], hash_ref, nome_mkt, hash_mkt, resultado)
+        return resultado
+
+
+# ----------------- GRÁFICA x ARTE (PÁGINA 3) -----------------
+
+def montar_prompt_grafica(secoes=SECOES_COMPLETAS):
+    # PROMPT FORENSE (ANTI-ALUCINAÇÃO)
+    return f"""
+            Você é um EXTRATOR FORENSE DE TEXTO. Sua função NÃO é interpretar, é TRANSCREVER E COMPARAR.
+
+            INPUT: Documentos farmacêuticos (Bulas com múltiplas colunas).
+            TAREFA: Extrair e comparar as seções: {secoes}
+
+            ⚠️ PROTOCOLO DE LEITURA (COLUNAS):
+            1. **FLUXO VERTICAL:** O texto está organizado em colunas. Leia a primeira coluna INTEIRA (do topo até o fim da página), depois vá para a próxima coluna.
+            2. **NÃO MISTURE:** Jamais leia horizontalmente cruzando as colunas (não leia a linha 1 da col 1 junto com a linha 1 da col 2).
+
+            ⚠️ PROTOCOLO DE TOLERÂNCIA ZERO PARA ALUCINAÇÃO:
+            1. **VERBATIM (IPSIS LITTERIS):** Copie as palavras EXATAMENTE como estão.
+                - Se está escrito "fabricação", ESCREVA "fabricação". NÃO troque por "validade".
+                - Mantenha pontuação e negrito (se detectado visualmente, use markdown **bold**).
+
+            2. **PROIBIDO CORRIGIR:** Não corrija gramática, não expanda abreviações.
+
+            3. **IGNORE O QUE NÃO É BULA:** Cabeçalhos e rodapés repetidos em cada página, números de página, marcas de corte e textos fora da área de impressão não entram em nenhuma seção.
+
+            4. **CONTINUIDADE:** Se uma seção começa no fim de uma coluna e continua na próxima (ou na próxima página), una o texto logicamente.
+
+            🚨 REGRAS DE STATUS POR GRUPO:
+
+            >>> GRUPO BLINDADO (SEM DIVERGÊNCIAS):
+            [ "APRESENTAÇÕES", "COMPOSIÇÃO", "DIZERES LEGAIS" ]
+            - Status OBRIGATÓRIO: "CONFORME".
+            - PROIBIDO usar highlight amarelo nestas seções.
+            - Apenas transcreva o texto original limpo.
+
+            >>> GRUPO PADRÃO (TODAS AS OUTRAS SEÇÕES):
+            - Compare palavra por palavra.
+            - Diferença REAL (palavra trocada, número errado)? Marque <span class="highlight-yellow">TEXTO ERRADO</span>.
+            - Se a diferença for apenas layout/quebra de linha, considere IGUAL.
+
+            SAÍDA JSON:
+            {{
+                "secoes": [
+                    {{
+                        "titulo": "NOME DA SEÇÃO",
+                        "texto_arte": "Texto EXATO da arte",
+                        "texto_grafica": "Texto EXATO da gráfica (com highlights APENAS se permitido)",
+                        "status": "CONFORME" or "DIVERGENTE"
+                    }}
+                ]
+            }}
+            """
+
+def preparar_arte(nome_arte, dados_arte, paginas=None):
+    """Conteúdo da arte processado uma vez para vários arquivos da gráfica (modo um-contra-muitos)."""
+    conteudo = process_file_content(arquivo_em_memoria(nome_arte, dados_arte), paginas) or []
+    for item in conteudo:
+        if not isinstance(item, str): item.load()  # Imagens decodificadas antes de irem para threads diferentes
+    return conteudo
+
+def conferir_grafica(nome_arte, dados_arte, nome_grafica, dados_grafica, keys_validas, conteudo_arte=None, usar_historico=True,
+                     secoes_escolhidas=None, paginas_ref=None, paginas_cand=None):
+    """
+    Pipeline da página 3: texto digital ou imagens (curvas/scans) vão direto ao modelo,
+    que transcreve as seções; as divergências saem do alinhamento local (alignment.py),
+    tolerante a ruído de OCR quando algum lado veio de imagem.
+    Com `conteudo_arte` (de preparar_arte), a arte não é processada de novo.
+    O mesmo par de arquivos já conferido sai direto do histórico (usar_historico=False refaz).
+    Modelo interrompido (prazo ou cancelamento): relatório parcial com as seções já transcritas.
+    `secoes_escolhidas` e `paginas_ref`/`paginas_cand` restringem o que é lido, rasterizado e
+    transcrito (com `conteudo_arte`, paginas_ref só é informativo: a arte já veio recortada);
+    com seleção, o histórico não é consultado.
+    """
+    with iniciar_rastro("grafica") as rastro:
+        with etapa("historico") as registro:
+            hash_arte, hash_grafica = hash_arquivo(dados_arte), hash_arquivo(dados_grafica)
+            selecionada = bool(secoes_escolhidas or paginas_ref or paginas_cand)
+            anterior = buscar_par("grafica", hash_arte, hash_grafica) if usar_historico and not selecionada else None
+            registro["encontrado"] = anterior is not None
+        if anterior: return do_historico(rastro, anterior)
+
+        limite_extracao = time.monotonic() + PRAZOS_S["extracao"]
+        with etapa("extracao", bytes_entrada=len(dados_grafica) + (len(dados_arte) if conteudo_arte is None else 0)) as registro:
+            if conteudo_arte is None:
+                conteudo1 = process_file_content(arquivo_em_memoria(nome_arte, dados_arte), paginas_ref) or []
+            else:
+                conteudo1 = conteudo_arte
+                registro["referencia_preparada"] = True
+            conteudo2 = process_file_content(arquivo_em_memoria(nome_grafica, dados_grafica), paginas_cand) or []
+            registro["imagens"] = sum(1 for c in conteudo1 + conteudo2 if not isinstance(c, str))
+        verificar_interrupcao("extracao", limite_extracao)
+        # Se algum lado veio de imagem, o texto dele é transcrição: o alinhamento tolera ruído de OCR
+        via_ocr = registro["imagens"] > 0
+
+        # Data Anvisa local: só é possível quando há texto digital (scans ficam para depois da transcrição)
+        data_ref = extrair_data_anvisa("\n".join(c for c in conteudo1 if isinstance(c, str)))
+        data_graf = extrair_data_anvisa("\n".join(c for c in conteudo2 if isinstance(c, str)))
+
+        lista_secoes = secoes_escolhidas or SECOES_COMPLETAS
+        with etapa("prompt") as registro:
+            prompt = montar_prompt_grafica(lista_secoes)
+            payload = [prompt, "--- ARTE (REFERÊNCIA) ---"] + conteudo1 + ["--- GRÁFICA (VALIDAÇÃO) ---"] + conteudo2
+            texto_payload = "".join(p for p in payload if isinstance(p, str))
+            registro.update(caracteres=len(texto_payload), tokens_estimados=estimar_tokens(texto_payload))
+            rota = escolher_modelo(fatores_de_conteudo(conteudo1 + conteudo2, secoes=len(lista_secoes)))
+            anotar(rota=rota)
+            # Mesmas páginas dos dois lados (por impressão digital) = mesma transcrição, mesmo com outros bytes
+            chave_cache = chave_transcricao([conteudo1, conteudo2], prompt, rota["modelo"])
+            texto_resposta = obter_transcricao(chave_cache) if chave_cache else None
+            registro["transcricao_em_cache"] = em_cache = texto_resposta is not None
+
+        avisos, interrupcao = [], None
+        if em_cache:
+            anotar(transcricao_em_cache=True)
+        else:
+            with etapa("modelo", modelo=rota["modelo"]) as registro:
+                try:
+                    response = chamar_modelo(keys_validas, payload, avisos=avisos, modelo=rota["modelo"], prazo_s=PRAZOS_S["modelo"])
+                    texto_resposta = response.text
+                except ConferenciaInterrompida as e:
+                    interrupcao, texto_resposta = e, e.texto_parcial
+                    registro["interrompida"] = e.motivo
+                registro["caracteres_resposta"] = len(texto_resposta)
+
+        with etapa("json"):
+            try:
+                resultado = {"secoes": secoes_parciais(texto_resposta)} if interrupcao else ler_json_modelo(texto_resposta)
+            except Exception as e:
+                raise ErroConferencia(f"Erro no processamento do JSON: {e}", resposta_bruta=texto_resposta)
+        if chave_cache and not interrupcao and not em_cache:
+            salvar_transcricao(chave_cache, texto_resposta)
+
+        secoes = resultado.get("secoes", [])
+        if secoes_escolhidas:  # O modelo às vezes transcreve além do pedido: só a escolha entra no relatório
+            secoes = [item for item in secoes if titulo_canonico(item.get("titulo", ""), SECOES_COMPLETAS) in secoes_escolhidas]
+        if interrupcao and not secoes: raise interrupcao  # Nada transcrito até o corte
+
+        # Destaque azul local + data a partir da transcrição (casos escaneados)
+        with etapa("pos_processamento"):
+            for item in secoes:
+                item.setdefault('status', 'CONFORME')
+                if "DIZERES LEGAIS" in item.get('titulo', '').upper():
+                    if data_ref == NAO_ENCONTRADA: data_ref = extrair_data_anvisa(item.get("texto_arte", ""))
+                    if data_graf == NAO_ENCONTRADA: data_graf = extrair_data_anvisa(item.get("texto_grafica", ""))
+                    item["texto_arte"] = destacar_datas(item.get("texto_arte", ""))
+                    item["texto_grafica"] = destacar_datas(item.get("texto_grafica", ""))
+
+        # Triagem local: o modelo transcreve, mas quem decide o que é divergência é o alinhamento
+        ruido_ocr = 0
+        with etapa("alinhamento", tolerante=via_ocr) as registro:
+            for item in secoes:
+                if any(b in item.get('titulo', '').upper() for b in SECOES_SEM_COMPARACAO): continue
+                item["texto_grafica"], divergente, item["ruido_ocr"] = alinhar_tolerante(
+                    item.get("texto_arte", ""), item.get("texto_grafica", ""), tolerante=via_ocr)
+                item["status"] = "DIVERGENTE" if divergente else "CONFORME"
+                ruido_ocr += item["ruido_ocr"]
+            registro["ruidos"] = ruido_ocr
+
+        with etapa("ortografia") as registro:
+            registro["marcacoes"] = aplicar_ortografia(secoes, "texto_grafica")
+
+        if interrupcao: anotar(interrompida=interrupcao.motivo)
+        degradados = [r for r in rastro.dados.get("rasters", []) if r["degradado"]]
+        if degradados:
+            avisos.append(f"🧠 Pouca memória no servidor: páginas rasterizadas a {min(r['dpi'] for r in degradados)} dpi "
+                          f"(normal: {round(72 * ZOOMS[0])} dpi). Repita a conferência mais tarde para a leitura completa.")
+        tempos = rastro.resumo()
+        exportar(tempos)
+        resultado = {"data_ref": data_ref, "data_grafica": data_graf, "secoes": secoes, "avisos": avisos,
+                     "via_ocr": via_ocr, "ruido_ocr": ruido_ocr, "tempos": tempos,
+                     "par": chave_par("grafica", hash_arte, hash_grafica)}
+        prontas = {titulo_canonico(item.get("titulo", ""), SECOES_COMPLETAS) for item in secoes}
+        selecao = descrever_selecao(secoes_escolhidas, paginas_ref, paginas_cand, prontas, SECOES_COMPLETAS)
+        if selecao: resultado["selecao"] = selecao
+        if interrupcao:
+            resultado["parcial"] = descrever_interrupcao(interrupcao, [t for t in lista_secoes if t not in prontas])
+        elif not degradados and not selecao:  # Leitura em dpi reduzido (ou de só uma parte) não vira a resposta definitiva do par
+            registrar_conferencia("grafica", nome_arte, hash_arte, nome_grafica, hash_grafica, resultado)
+        return resultado
@@ -0,0 +1,211 @@
+"""
+Substituto local do genai.GenerativeModel, para testes offline e testes de carga.
+
+Ativado com VALIDADOR_MODELO=fake (ver core.criar_modelo). Devolve JSON no mesmo
+formato que as páginas esperam ("secoes"), montado a partir dos próprios textos
+enviados no prompt. Com stream=True a resposta sai em pedaços, com parte da latência
+antes do primeiro e o resto distribuída entre eles (cancel() corta o stream).
+O cache de contexto do provedor (context_cache.py) tem aqui um substituto em memória,
+ConteudoEmCacheFalso. Falhas são injetáveis por variáveis de ambiente:
+
+    VALIDADOR_FAKE_LATENCIA_S        "0.5" ou faixa "0.2-1.5" (uniforme)
+    VALIDADOR_FAKE_TAXA_429          probabilidade de ResourceExhausted (0 a 1)
+    VALIDADOR_FAKE_TAXA_TIMEOUT      probabilidade de DeadlineExceeded
+    VALIDADOR_FAKE_TAXA_TRUNCADO     probabilidade de JSON cortado pela metade
+    VALIDADOR_FAKE_KEYS_ESGOTADAS    chaves que SEMPRE respondem 429 (ex.: "k1,k2")
+    VALIDADOR_FAKE_SEMENTE           semente do sorteio (reprodutibilidade)
+"""
+import ast
+import json
+import os
+import random
+import re
+import threading
+import time
+
+from google.api_core import exceptions as google_exceptions
+
+from sections import segmentar_secoes
+
+_rng = random.Random(os.environ.get("VALIDADOR_FAKE_SEMENTE"))
+_rng_lock = threading.Lock()
+
+MARCA_REF = "INPUT TEXTO 1 (REF):"
+MARCA_MKT = "INPUT TEXTO 2 (MKT):"
+MARCA_ARTE = "--- ARTE (REFERÊNCIA) ---"
+MARCA_GRAFICA = "--- GRÁFICA (VALIDAÇÃO) ---"
+
+PEDACOS_STREAM = 20
+FRACAO_PRIMEIRO_PEDACO = 0.25  # Parte da latência antes do primeiro pedaço do stream
+
+
+def _sortear():
+    with _rng_lock: return _rng.random()
+
+
+def _latencia():
+    valor = os.environ.get("VALIDADOR_FAKE_LATENCIA_S", "0")
+    if "-" in valor:
+        minimo, maximo = (float(v) for v in valor.split("-", 1))
+        with _rng_lock: return _rng.uniform(minimo, maximo)
+    return float(valor)
+
+
+def _taxa(nome):
+    return float(os.environ.get(nome, "0") or 0)
+
+
+def _lista_secoes(prompt, rotulo):
+    """Lê a lista Python impressa no prompt logo após `rotulo`."""
+    achado = re.search(re.escape(rotulo) + r"\s*(\[[^\]]*\])", prompt)
+    return ast.literal_eval(achado.group(1)) if achado else []
+
+
+def _secoes_locais(texto, titulos):
+    segmentos = segmentar_secoes(texto, titulos)
+    if segmentos: return segmentos
+    return {titulos[0] if len(titulos) == 1 else "DOCUMENTO COMPLETO": texto.strip()}
+
+
+class UsoFalso:
+    """usage_metadata estimado (~4 caracteres por token); prompt_token_count inclui o que veio do cache, como no Gemini."""
+
+    def __init__(self, prompt, em_cache, resposta):
+        self.prompt_token_count = len(prompt) // 4
+        self.cached_content_token_count = len(em_cache) // 4
+        self.candidates_token_count = len(resposta) // 4
+
+
+class RespostaFalsa:
+    def __init__(self, text, usage_metadata=None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+
+class RespostaEmStreamFalsa:
+    """generate_content(stream=True): iterar entrega o texto em pedaços; `text` é o texto completo."""
+
+    def __init__(self, text, duracao, usage_metadata=None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+        self._duracao = duracao
+        self._cancelado = threading.Event()
+
+    def __iter__(self):
+        tamanho = max(1, -(-len(self.text) // PEDACOS_STREAM))
+        for inicio in range(0, len(self.text), tamanho):
+            if self._cancelado.wait(self._duracao / PEDACOS_STREAM):
+                raise google_exceptions.Cancelled("499 Stream cancelado pelo cliente (fake).")
+            yield RespostaFalsa(self.text[inicio:inicio + tamanho])
+
+    def cancel(self):
+        self._cancelado.set()
+
+
+class ConteudoEmCacheFalso:
+    """Substituto de genai.caching.CachedContent: o texto fica em memória até expirar."""
+
+    _guardados = {}
+    _lock = threading.Lock()
+
+    def __init__(self, name, model, texto, expira):
+        self.name, self.model, self.texto, self.expira = name, model, texto, expira
+
+    @classmethod
+    def create(cls, model, contents, ttl, display_name=None):
+        with cls._lock:
+            conteudo = cls(f"cachedContents/fake-{len(cls._guardados) + 1}", model, "".join(contents),
+                           time.monotonic() + ttl.total_seconds())
+            cls._guardados[conteudo.name] = conteudo
+        return conteudo
+
+    @classmethod
+    def texto_guardado(cls, conteudo):
+        """Texto de um conteúdo ainda válido; NotFound se expirou ou foi apagado (como o provedor)."""
+        with cls._lock:
+            guardado = cls._guardados.get(conteudo.name)
+            if guardado is None or guardado.expira <= time.monotonic():
+                cls._guardados.pop(conteudo.name, None)
+                raise google_exceptions.NotFound(f"404 {conteudo.name} não encontrado (fake).")
+            return guardado.texto
+
+    def update(self, ttl):
+        self.texto_guardado(self)
+        self.expira = time.monotonic() + ttl.total_seconds()
+
+    def delete(self):
+        with self._lock: self._guardados.pop(self.name, None)
+
+
+class FakeGenerativeModel:
+    """
+    Mesma interface usada em core.chamar_modelo: generate_content(payload, request_options=None, stream=False).
+    Com `conteudo_em_cache` (ConteudoEmCacheFalso), o texto guardado vem antes do payload.
+    """
+
+    def __init__(self, model_name, api_key=None, generation_config=None, conteudo_em_cache=None):
+        self.model_name = model_name
+        self.api_key = api_key
+        self.generation_config = generation_config or {}
+        self.conteudo_em_cache = conteudo_em_cache
+
+    def generate_content(self, payload, request_options=None, stream=False):
+        latencia = _latencia()
+        time.sleep(latencia * FRACAO_PRIMEIRO_PEDACO if stream else latencia)
+
+        esgotadas = [k.strip() for k in os.environ.get("VALIDADOR_FAKE_KEYS_ESGOTADAS", "").split(",") if k.strip()]
+        if self.api_key in esgotadas or _sortear() < _taxa("VALIDADOR_FAKE_TAXA_429"):
+            raise google_exceptions.ResourceExhausted("429 Resource has been exhausted (fake).")
+        if _sortear() < _taxa("VALIDADOR_FAKE_TAXA_TIMEOUT"):
+            raise google_exceptions.DeadlineExceeded("504 Deadline Exceeded (fake).")
+
+        em_cache = ConteudoEmCacheFalso.texto_guardado(self.conteudo_em_cache) if self.conteudo_em_cache else ""
+        if isinstance(payload, str):
+            resultado = self._responder_textos(em_cache + payload)
+        else:
+            resultado = self._responder_grafica(payload)
+
+        texto = json.dumps(resultado, ensure_ascii=False)
+        if _sortear() < _taxa("VALIDADOR_FAKE_TAXA_TRUNCADO"):
+            texto = texto[:len(texto) // 2]  # Simula saída cortada por limite de tokens
+        uso = UsoFalso(em_cache + (payload if isinstance(payload, str) else ""), em_cache, texto)
+        if stream:
+            return RespostaEmStreamFalsa(texto, latencia * (1 - FRACAO_PRIMEIRO_PEDACO), uso)
+        return RespostaFalsa(texto, uso)
+
+    def _responder_textos(self, prompt):
+        """Páginas 1 e 2: os dois textos vêm dentro do próprio prompt."""
+        titulos = _lista_secoes(prompt, "LISTA DE SEÇÕES ESPERADAS:")
+        texto_ref = prompt.split(MARCA_REF, 1)[-1].split(MARCA_MKT, 1)[0]
+        texto_mkt = prompt.split(MARCA_MKT, 1)[-1].split("SUA MISSÃO:", 1)[0]
+        seg_ref, seg_mkt = _secoes_locais(texto_ref, titulos), _secoes_locais(texto_mkt, titulos)
+        return {"secoes": [
+            {"titulo": titulo, "texto_anvisa": seg_ref.get(titulo, ""), "texto_mkt": seg_mkt.get(titulo, "")}
+            for titulo in dict.fromkeys(list(seg_ref) + list(seg_mkt))
+        ]}
+
+    def _responder_grafica(self, payload):
+        """Página 3: prompt + marcador + conteúdo da arte + marcador + conteúdo da gráfica."""
+        from core import gerar_diff_html  # Import tardio: core importa este módulo sob demanda
+
+        prompt = payload[0]
+        titulos = _lista_secoes(prompt, "TAREFA: Extrair e comparar as seções:")
+        partes = {MARCA_ARTE: [], MARCA_GRAFICA: []}
+        atual = None
+        for item in payload[1:]:
+            if isinstance(item, str) and item in partes: atual = item
+            elif atual: partes[atual].append(item if isinstance(item, str) else "[imagem]")
+
+        seg_arte = _secoes_locais("\n".join(partes[MARCA_ARTE]), titulos)
+        seg_graf = _secoes_locais("\n".join(partes[MARCA_GRAFICA]), titulos)
+        secoes = []
+        for titulo in dict.fromkeys(list(seg_arte) + list(seg_graf)):
+            html_graf, divergente = gerar_diff_html(seg_arte.get(titulo, ""), seg_graf.get(titulo, ""), rigoroso=True)
+            blindada = any(b in titulo.upper() for b in ("APRESENTAÇÕES", "COMPOSIÇÃO", "DIZERES LEGAIS"))
+            secoes.append({
+                "titulo": titulo,
+                "texto_arte": seg_arte.get(titulo, ""),
+                "texto_grafica": seg_graf.get(titulo, "") if blindada else html_graf,
+                "status": "DIVERGENTE" if divergente and not blindada else "CONFORME",
+            })
+        return {"secoes": secoes}
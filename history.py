@@ -0,0 +1,188 @@
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+# ----------------- HISTÓRICO DE CONFERÊNCIAS (SQLITE) -----------------
+# Toda conferência concluída (páginas, lote, API) fica registrada: hashes dos arquivos,
+# produto, datas Anvisa, status por seção e o resultado completo (o mesmo JSON que a
+# página renderiza, comprimido). Serve para responder "essa arte já foi conferida?"
+# sem refazer nada, e para curto-circuitar o reenvio do mesmo par de arquivos.
+#
+# A chave do par leva VERSAO: quando o pipeline mudar o formato ou o critério do
+# resultado, aumentar a versão faz os pares antigos serem conferidos de novo.
+
+ARQUIVO_HISTORICO = os.environ.get("VALIDADOR_HISTORICO", "historico_conferencias.sqlite3")
+VERSAO = 4  # 2: cabeçalhos/rodapés removidos antes do diff; 3: palavra só parecida deixou de ser ruído de OCR;
+            # 4: número na margem só sai se repetir como numeração de página
+LIMITE_LISTAGEM = 200
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS conferencias (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chave TEXT NOT NULL UNIQUE,
+    modo TEXT NOT NULL,
+    produto TEXT NOT NULL,
+    arquivo_ref TEXT NOT NULL,
+    arquivo_cand TEXT NOT NULL,
+    hash_ref TEXT NOT NULL,
+    hash_cand TEXT NOT NULL,
+    data_ref TEXT,
+    data_cand TEXT,
+    secoes INTEGER NOT NULL,
+    divergentes INTEGER NOT NULL,
+    conferido_em TEXT NOT NULL,
+    resultado BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_conferencias_produto ON conferencias (produto, conferido_em);
+CREATE INDEX IF NOT EXISTS idx_conferencias_data ON conferencias (conferido_em);
+CREATE INDEX IF NOT EXISTS idx_conferencias_hash_ref ON conferencias (hash_ref);
+CREATE INDEX IF NOT EXISTS idx_conferencias_hash_cand ON conferencias (hash_cand);
+CREATE TABLE IF NOT EXISTS secoes (
+    conferencia_id INTEGER NOT NULL REFERENCES conferencias (id) ON DELETE CASCADE,
+    ordem INTEGER NOT NULL,
+    titulo TEXT NOT NULL,
+    status TEXT NOT NULL,
+    PRIMARY KEY (conferencia_id, ordem)
+);
+"""
+
+COLUNAS_LISTAGEM = ("id", "modo", "produto", "arquivo_ref", "arquivo_cand", "hash_ref", "hash_cand",
+                    "data_ref", "data_cand", "secoes", "divergentes", "conferido_em")
+
+_lock = threading.Lock()
+_esquema_criado = set()
+
+
+# ----------------- CONEXÃO -----------------
+
+def _conectar():
+    """Uma conexão por chamada (as conferências rodam em threads do pool de jobs)."""
+    conexao = sqlite3.connect(ARQUIVO_HISTORICO, timeout=10)
+    conexao.row_factory = sqlite3.Row
+    conexao.execute("PRAGMA foreign_keys = ON")
+    if ARQUIVO_HISTORICO not in _esquema_criado:
+        with _lock:
+            conexao.execute("PRAGMA journal_mode = WAL")  # Leitores não esperam a gravação
+            conexao.executescript(ESQUEMA)
+            _esquema_criado.add(ARQUIVO_HISTORICO)
+    return conexao
+
+def hash_arquivo(dados):
+    """sha256 do conteúdo; upload em disco (memory.ArquivoGrande) já traz o hash calculado."""
+    return getattr(dados, "sha256", None) or hashlib.sha256(dados).hexdigest()
+
+def chave_par(modo, hash_ref, hash_cand):
+    return f"v{VERSAO}|{modo}|{hash_ref}|{hash_cand}"
+
+
+# ----------------- GRAVAÇÃO E CONSULTA -----------------
+
+def registrar_conferencia(modo, arquivo_ref, hash_ref, arquivo_cand, hash_cand, resultado, produto=None):
+    """Grava (ou substitui) a conferência do par e devolve o id; falhas de disco são ignoradas (None)."""
+    if produto is None:
+        from library import produto_do_arquivo  # Import tardio: library importa core, que importa este módulo
+        produto = produto_do_arquivo(arquivo_ref)
+    secoes = resultado.get("secoes", [])
+    data_cand = resultado.get("data_mkt", resultado.get("data_grafica"))
+    compactado = zlib.compress(json.dumps(resultado, ensure_ascii=False).encode("utf-8"))
+    try:
+        conexao = _conectar()
+    except sqlite3.Error:
+        return None
+    try:
+        with conexao:
+            conexao.execute("DELETE FROM conferencias WHERE chave = ?", (chave_par(modo, hash_ref, hash_cand),))
+            cursor = conexao.execute(
+                "INSERT INTO conferencias (chave, modo, produto, arquivo_ref, arquivo_cand, hash_ref, hash_cand, data_ref,"
+                " data_cand, secoes, divergentes, conferido_em, resultado) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (chave_par(modo, hash_ref, hash_cand), modo, produto, arquivo_ref, arquivo_cand, hash_ref, hash_cand,
+                 resultado.get("data_ref"), data_cand, len(secoes),
+                 sum(1 for s in secoes if s.get("status", "CONFORME") != "CONFORME"),
+                 time.strftime("%Y-%m-%d %H:%M:%S"), compactado))
+            conexao.executemany(
+                "INSERT INTO secoes (conferencia_id, ordem, titulo, status) VALUES (?, ?, ?, ?)",
+                [(cursor.lastrowid, i, s.get("titulo", ""), s.get("status", "CONFORME")) for i, s in enumerate(secoes)])
+        return cursor.lastrowid
+    except sqlite3.Error:
+        return None
+    finally:
+        conexao.close()
+
+def buscar_par(modo, hash_ref, hash_cand):
+    """Registro completo (carregar_conferencia) de uma conferência já feita com exatamente esses arquivos, ou None."""
+    try:
+        conexao = _conectar()
+        try:
+            linha = conexao.execute("SELECT id FROM conferencias WHERE chave = ?", (chave_par(modo, hash_ref, hash_cand),)).fetchone()
+        finally:
+            conexao.close()
+        return carregar_conferencia(linha["id"]) if linha else None
+    except sqlite3.Error:
+        return None
+
+def listar_conferencias(busca="", modo=None, hash_arquivo_busca=None, limite=LIMITE_LISTAGEM):
+    """Conferências mais recentes primeiro, filtradas por produto/arquivo, modo ou hash de um dos arquivos."""
+    condicoes, parametros = [], []
+    if busca.strip():
+        termo = f"%{busca.strip()}%"
+        condicoes.append("(produto LIKE ? OR arquivo_ref LIKE ? OR arquivo_cand LIKE ?)")
+        parametros += [termo, termo, termo]
+    if modo:
+        condicoes.append("modo = ?")
+        parametros.append(modo)
+    if hash_arquivo_busca:
+        condicoes.append("(hash_ref = ? OR hash_cand = ?)")
+        parametros += [hash_arquivo_busca, hash_arquivo_busca]
+    sql = f"SELECT {', '.join(COLUNAS_LISTAGEM)} FROM conferencias"
+    if condicoes: sql += " WHERE " + " AND ".join(condicoes)
+    sql += " ORDER BY conferido_em DESC, id DESC LIMIT ?"
+    conexao = _conectar()
+    try:
+        return [dict(linha) for linha in conexao.execute(sql, parametros + [limite])]
+    finally:
+        conexao.close()
+
+@functools.lru_cache(maxsize=16)
+def carregar_conferencia(conferencia_id):
+    """Registro completo, com o resultado descomprimido. Registros não mudam depois de gravados."""
+    conexao = _conectar()
+    try:
+        linha = conexao.execute("SELECT * FROM conferencias WHERE id = ?", (conferencia_id,)).fetchone()
+    finally:
+        conexao.close()
+    if linha is None: return None
+    registro = {c: linha[c] for c in COLUNAS_LISTAGEM}
+    registro["resultado"] = json.loads(zlib.decompress(linha["resultado"]).decode("utf-8"))
+    return registro
+
+def secoes_da_conferencia(conferencia_id):
+    conexao = _conectar()
+    try:
+        return [dict(l) for l in conexao.execute(
+            "SELECT titulo, status FROM secoes WHERE conferencia_id = ? ORDER BY ordem", (conferencia_id,))]
+    finally:
+        conexao.close()
+
+def remover_conferencia(conferencia_id):
+    """
+    Apaga o registro: o próximo envio do mesmo par é conferido de novo. Os jobs já
+    concluídos do par (jobs.py) também deixam de ser reabertos pela chave do envio.
+    """
+    from jobs import esquecer_resultados  # Import tardio, como o de library
+    with _conectar() as conexao:
+        linha = conexao.execute("SELECT chave FROM conferencias WHERE id = ?", (conferencia_id,)).fetchone()
+        removidas = conexao.execute("DELETE FROM conferencias WHERE id = ?", (conferencia_id,)).rowcount
+    conexao.close()
+    carregar_conferencia.cache_clear()
+    if linha is not None:
+        esquecer_resultados(lambda resultado: resultado.get("par") == linha["chave"])
+    return bool(removidas)
+
+def descrever_conferencia(registro):
+    status = f"⚠️ {registro['divergentes']} divergente(s)" if registro["divergentes"] else "✅ conforme"
+    return f"{registro['conferido_em']} • {registro['produto']} • {registro['arquivo_cand']} • {status}"
@@ -0,0 +1,204 @@
+import contextvars
+import hashlib
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from memory import sessao_atual, usar_sessao
+
+# ----------------- FILA DE JOBS EM SEGUNDO PLANO -----------------
+# O Streamlit reexecuta o script a cada clique/reconexão. Se a chamada ao modelo
+# rodar dentro do `if st.button(...)`, o resultado se perde no próximo rerun.
+# Aqui o trabalho roda num pool do PROCESSO (compartilhado por todas as sessões);
+# a página guarda só o id do job em st.session_state e renderiza o que estiver pronto.
+#
+# Cancelamento é cooperativo: cancelar_job marca o job e chama os callbacks que a
+# função registrou com ao_cancelar (ex.: abortar o stream do modelo em andamento);
+# a função confere cancelamento_solicitado() entre etapas e devolve o que tiver.
+
+MAX_WORKERS = int(os.environ.get("VALIDADOR_WORKERS", "4"))
+MAX_JOBS_GUARDADOS = int(os.environ.get("VALIDADOR_MAX_JOBS", "200"))
+
+ESTADO_FILA = "fila"
+ESTADO_EXECUTANDO = "executando"
+ESTADO_CONCLUIDO = "concluido"
+ESTADO_ERRO = "erro"
+ESTADO_CANCELADO = "cancelado"
+ESTADOS_ATIVOS = (ESTADO_FILA, ESTADO_EXECUTANDO)
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="conferencia")
+_jobs = {}          # job_id -> estado/resultado
+_por_chave = {}     # chave do conteúdo -> job_id (reabre conferências já feitas)
+_eventos = {}       # job_id -> threading.Event disparado ao terminar
+_cancelamentos = {} # job_id -> [threading.Event do pedido de cancelamento, callbacks]
+_lock = threading.Lock()
+_job_atual = contextvars.ContextVar("job_atual", default=None)  # job_id rodando nesta thread
+
+
+def chave_job(*partes):
+    """Hash estável das entradas de um job (bytes dos arquivos, nomes, modo...)."""
+    h = hashlib.sha256()
+    for parte in partes:
+        if hasattr(parte, "sha256"): parte = parte.sha256  # Upload em disco (memory.ArquivoGrande)
+        h.update(parte if isinstance(parte, bytes) else str(parte).encode('utf-8'))
+        h.update(b'\x00')
+    return h.hexdigest()
+
+
+def submeter_job(funcao, *args, chave=None, **kwargs):
+    """
+    Enfileira `funcao(*args, **kwargs)` e devolve o id do job.
+    Com `chave`, um job igual em andamento ou concluído é reaproveitado (jobs com erro,
+    cancelados ou com resultado parcial são refeitos).
+    """
+    with _lock:
+        existente = _por_chave.get(chave) if chave else None
+        if existente in _jobs and _jobs[existente]["estado"] not in (ESTADO_ERRO, ESTADO_CANCELADO) \
+                and not _jobs[existente]["parcial"]:
+            return existente
+
+        job_id = uuid.uuid4().hex
+        _jobs[job_id] = {
+            "id": job_id,
+            "estado": ESTADO_FILA,
+            "criado_em": time.time(),
+            "inicio": None,
+            "fim": None,
+            "resultado": None,
+            "parcial": False,
+            "erro": None,
+            "excecao": None,
+            "sessao": sessao_atual(),  # A memória que o job usar conta para a sessão que o submeteu
+        }
+        _eventos[job_id] = threading.Event()
+        _cancelamentos[job_id] = [threading.Event(), []]
+        if chave: _por_chave[chave] = job_id
+        _podar()
+
+    _executor.submit(_executar, job_id, funcao, args, kwargs)
+    return job_id
+
+
+def esquecer_resultados(condicao):
+    """
+    Tira da reabertura por chave os jobs terminados cujo resultado satisfaz `condicao`
+    (ex.: par removido do histórico): o próximo envio igual roda a conferência de novo.
+    """
+    with _lock:
+        for chave, job_id in list(_por_chave.items()):
+            job = _jobs.get(job_id)
+            if job is None or job["estado"] in ESTADOS_ATIVOS: continue
+            if isinstance(job["resultado"], dict) and condicao(job["resultado"]):
+                del _por_chave[chave]
+
+
+def obter_job(job_id):
+    """Cópia rasa do estado do job (ou None se ele não existe mais)."""
+    with _lock:
+        job = _jobs.get(job_id)
+        return dict(job) if job else None
+
+
+def aguardar_job(job_id, timeout=None):
+    """Bloqueia até o job terminar ou o timeout vencer; devolve o estado atual (ou None)."""
+    with _lock:
+        evento = _eventos.get(job_id)
+    if evento is not None:
+        evento.wait(timeout)
+    return obter_job(job_id)
+
+
+def cancelar_job(job_id):
+    """
+    Pede o cancelamento: job na fila nem começa; job rodando tem os callbacks de
+    ao_cancelar chamados agora (nesta thread) e termina com o que já tiver pronto.
+    """
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None or job["estado"] not in ESTADOS_ATIVOS: return False
+        pedido, callbacks = _cancelamentos[job_id]
+        pedido.set()
+        callbacks = list(callbacks)
+        if job["estado"] == ESTADO_FILA:
+            job.update(estado=ESTADO_CANCELADO, erro="Conferência cancelada.", fim=time.time())
+            _eventos[job_id].set()
+    for callback in callbacks:
+        try: callback()
+        except Exception: traceback.print_exc()
+    return True
+
+
+def cancelamento_solicitado():
+    """True se o job que roda nesta thread teve o cancelamento pedido (False fora de jobs)."""
+    job_id = _job_atual.get()
+    with _lock:
+        cancelamento = _cancelamentos.get(job_id)
+    return bool(cancelamento and cancelamento[0].is_set())
+
+
+def ao_cancelar(callback):
+    """
+    Registra `callback` para o cancelamento do job desta thread (já cancelado: chama na hora).
+    Devolve a função que desfaz o registro — chamar quando o recurso não estiver mais em uso.
+    """
+    job_id = _job_atual.get()
+    with _lock:
+        cancelamento = _cancelamentos.get(job_id)
+        if cancelamento is not None and not cancelamento[0].is_set():
+            cancelamento[1].append(callback)
+            return lambda: _desregistrar(job_id, callback)
+    if cancelamento is not None: callback()
+    return lambda: None
+
+
+def _desregistrar(job_id, callback):
+    with _lock:
+        cancelamento = _cancelamentos.get(job_id)
+        if cancelamento is not None and callback in cancelamento[1]: cancelamento[1].remove(callback)
+
+
+def _executar(job_id, funcao, args, kwargs):
+    with _lock:
+        if _jobs.get(job_id, {}).get("estado") != ESTADO_FILA: return  # Cancelado (ou podado) ainda na fila
+        _jobs[job_id].update(estado=ESTADO_EXECUTANDO, inicio=time.time())
+        sessao = _jobs[job_id]["sessao"]
+    token = _job_atual.set(job_id)
+    try:
+        with usar_sessao(sessao):
+            resultado = funcao(*args, **kwargs)
+    except Exception as e:
+        estado = ESTADO_CANCELADO if cancelamento_solicitado() else ESTADO_ERRO
+        if estado == ESTADO_ERRO: traceback.print_exc()
+        _atualizar(job_id, estado=estado, erro=str(e), excecao=e, fim=time.time())
+    else:
+        # Cancelado no meio, mas com o que ficou pronto: o resultado (parcial) é mantido
+        estado = ESTADO_CANCELADO if cancelamento_solicitado() else ESTADO_CONCLUIDO
+        parcial = isinstance(resultado, dict) and bool(resultado.get("parcial"))
+        _atualizar(job_id, estado=estado, resultado=resultado, parcial=parcial, fim=time.time())
+    finally:
+        _job_atual.reset(token)
+        with _lock:
+            evento = _eventos.get(job_id)
+            if job_id in _cancelamentos: _cancelamentos[job_id][1].clear()
+        if evento is not None: evento.set()
+
+
+def _atualizar(job_id, **campos):
+    with _lock:
+        if job_id in _jobs: _jobs[job_id].update(campos)
+
+
+def _podar():
+    """Descarta os jobs finalizados mais antigos acima do limite (chamar com _lock)."""
+    excedente = len(_jobs) - MAX_JOBS_GUARDADOS
+    if excedente <= 0: return
+    finalizados = sorted((j for j in _jobs.values() if j["estado"] not in ESTADOS_ATIVOS), key=lambda j: j["criado_em"])
+    for job in finalizados[:excedente]:
+        del _jobs[job["id"]]
+        _eventos.pop(job["id"], None)
+        _cancelamentos.pop(job["id"], None)
+    for chave, job_id in list(_por_chave.items()):
+        if job_id not in _jobs: del _por_chave[chave]
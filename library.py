@@ -0,0 +1,218 @@
+"""
+Biblioteca local de bulas de referência.
+
+As referências (Med. Referência / Arquivo Anvisa) são quase sempre as mesmas poucas
+centenas de documentos. Cada uma é ingerida uma única vez (extração, seções e data
+Anvisa via core.preparar_referencia) e fica numa pasta com um índice por produto e
+data de aprovação; as páginas 1 e 2 escolhem dali em vez de fazer upload.
+
+    python -m library --ingerir bulas/*.pdf            # produto deduzido do nome do arquivo
+    python -m library --ingerir dipirona.docx --produto "DIPIRONA 500 MG"
+    python -m library --listar [busca]
+
+Cada referência guarda a VERSAO da extração que a produziu e o arquivo original. Quando a
+extração muda (e a versão aumenta), a referência antiga é extraída de novo a partir do
+original na primeira vez que for usada; as gravadas antes de o original ser guardado são
+recusadas (ReferenciaDesatualizada) até o arquivo ser ingerido de novo.
+"""
+import argparse
+import functools
+import glob
+import json
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+import unicodedata
+
+from core import preparar_referencia
+from memory import ArquivoGrande
+from sections import hash_texto
+
+PASTA_BIBLIOTECA = os.environ.get("VALIDADOR_BIBLIOTECA", "biblioteca_referencias")
+ARQUIVO_INDICE = "indice.json"
+EXTENSOES = (".pdf", ".docx")
+VERSAO = 3  # Da extração guardada (sem o campo = 1). 2: estilos em RLE (styles.py), sem <b> no texto;
+            # 3: cabeçalhos/rodapés removidos (boilerplate.py)
+
+# Palavras de nome de arquivo que não fazem parte do nome do produto
+RUIDO_NOME = {"bula", "bulas", "referencia", "ref", "paciente", "anvisa", "final", "versao", "v", "pdf", "docx"}
+
+_lock = threading.Lock()
+
+
+class ReferenciaDesatualizada(ValueError):
+    """Referência de uma extração antiga sem o arquivo original para extrair de novo."""
+
+
+# ----------------- ÍNDICE -----------------
+
+def _caminho(nome):
+    return os.path.join(PASTA_BIBLIOTECA, nome)
+
+def _ler_indice():
+    try:
+        with open(_caminho(ARQUIVO_INDICE), "r", encoding="utf-8") as f: return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _gravar_json(nome, dados):
+    os.makedirs(PASTA_BIBLIOTECA, exist_ok=True)
+    temporario = f"{_caminho(nome)}.{os.getpid()}.tmp"
+    with open(temporario, "w", encoding="utf-8") as f: json.dump(dados, f, ensure_ascii=False)
+    os.replace(temporario, _caminho(nome))  # Escrita atômica, como no cache de seções
+
+def _gravar_original(nome, dados):
+    os.makedirs(PASTA_BIBLIOTECA, exist_ok=True)
+    temporario = f"{_caminho(nome)}.{os.getpid()}.tmp"
+    if isinstance(dados, ArquivoGrande): shutil.copyfile(dados.caminho, temporario)
+    else:
+        with open(temporario, "wb") as f: f.write(dados)
+    os.replace(temporario, _caminho(nome))
+
+def _nome_original(ref_id, nome_arquivo):
+    return f"{ref_id}.original{os.path.splitext(nome_arquivo)[1].lower()}"
+
+def _sem_acentos(texto):
+    return "".join(c for c in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(c)).lower()
+
+def _ordem_data(data_anvisa):
+    """dd/mm/aaaa -> aaaammdd para ordenar (mais recente primeiro); sem data vai para o fim."""
+    partes = re.findall(r'\d+', data_anvisa or "")
+    if len(partes) != 3: return ""
+    dia, mes, ano = partes
+    if len(ano) == 2: ano = "20" + ano
+    return f"{ano}{mes.zfill(2)}{dia.zfill(2)}"
+
+
+# ----------------- API -----------------
+
+def produto_do_arquivo(nome_arquivo):
+    """'Bula_Paciente_DIPIRONA-500mg_ref.pdf' -> 'DIPIRONA 500MG'."""
+    base = os.path.splitext(os.path.basename(nome_arquivo))[0]
+    palavras = [p for p in re.split(r'[\s_\-\.]+', base) if p and _sem_acentos(p) not in RUIDO_NOME]
+    return " ".join(palavras).upper() or base.upper()
+
+def ingerir_referencia(nome_arquivo, dados, produto=None):
+    """
+    Prepara e guarda uma referência. O id é o hash do texto normalizado: reenviar o mesmo
+    conteúdo (mesmo com outro nome de arquivo) devolve o registro já existente.
+    """
+    referencia = preparar_referencia(nome_arquivo, dados)
+    if len(referencia["texto"]) < 20:
+        raise ValueError(f"{nome_arquivo}: arquivo vazio ou ilegível.")
+    ref_id = hash_texto(referencia["texto"])[:16]
+
+    with _lock:
+        indice = _ler_indice()
+        if indice.get(ref_id, {}).get("versao", 1) == VERSAO: return indice[ref_id]
+        registro = {
+            "id": ref_id,
+            "produto": produto or produto_do_arquivo(nome_arquivo),
+            "data_anvisa": referencia["data_anvisa"],
+            "arquivo": nome_arquivo,
+            "secoes": len(referencia["segmentos"]),
+            "ingerido_em": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "versao": VERSAO,
+            "original": _nome_original(ref_id, nome_arquivo),
+        }
+        _gravar_original(registro["original"], dados)
+        _gravar_json(f"{ref_id}.json", dict(referencia, id=ref_id, versao=VERSAO))
+        indice[ref_id] = registro
+        _gravar_json(ARQUIVO_INDICE, indice)
+    carregar_referencia.cache_clear()
+    return registro
+
+def listar_referencias(busca=""):
+    """Registros do índice por produto (A-Z) e data Anvisa (mais recente primeiro), filtrados por `busca`."""
+    termo = _sem_acentos(busca.strip())
+    registros = [r for r in _ler_indice().values()
+                 if not termo or termo in _sem_acentos(f"{r['produto']} {r['arquivo']} {r['data_anvisa']}")]
+    registros.sort(key=lambda r: _ordem_data(r["data_anvisa"]), reverse=True)
+    return sorted(registros, key=lambda r: r["produto"])
+
+@functools.lru_cache(maxsize=64)
+def carregar_referencia(ref_id):
+    """
+    Referência preparada (mesmo formato de core.preparar_referencia). Registros não mudam
+    depois de gravados, a não ser na atualização para a VERSAO atual (_atualizar).
+    """
+    with open(_caminho(f"{ref_id}.json"), "r", encoding="utf-8") as f: referencia = json.load(f)
+    if referencia.get("versao", 1) != VERSAO: referencia = _atualizar(ref_id, referencia)
+    return referencia
+
+def _atualizar(ref_id, referencia):
+    """Extrai de novo, do original guardado, uma referência de extração antiga (mesmo id)."""
+    registro = _ler_indice().get(ref_id, {})
+    original = registro.get("original")
+    if not original or not os.path.exists(_caminho(original)):
+        raise ReferenciaDesatualizada(
+            f"{referencia['arquivo']}: referência guardada com uma extração antiga. Envie o arquivo de novo "
+            "com \"Guardar na biblioteca\" (ou python -m library --ingerir) e remova esta.")
+    with open(_caminho(original), "rb") as f: dados = f.read()
+    atualizada = dict(preparar_referencia(referencia["arquivo"], dados), id=ref_id, versao=VERSAO)
+    with _lock:
+        indice = _ler_indice()
+        _gravar_json(f"{ref_id}.json", atualizada)
+        if ref_id in indice:
+            indice[ref_id].update(data_anvisa=atualizada["data_anvisa"], secoes=len(atualizada["segmentos"]), versao=VERSAO)
+            _gravar_json(ARQUIVO_INDICE, indice)
+    return atualizada
+
+def remover_referencia(ref_id):
+    with _lock:
+        indice = _ler_indice()
+        registro = indice.pop(ref_id, None)
+        if registro is None: return False
+        _gravar_json(ARQUIVO_INDICE, indice)
+        for nome in (f"{ref_id}.json", registro.get("original")):
+            if not nome: continue
+            try: os.remove(_caminho(nome))
+            except OSError: pass
+    carregar_referencia.cache_clear()
+    return True
+
+def descrever_referencia(registro):
+    desatualizada = registro.get("versao", 1) != VERSAO and not registro.get("original")
+    return f"{registro['produto']} • Anvisa {registro['data_anvisa']} • {registro['arquivo']}" + (
+        " • ⚠️ extração antiga, envie de novo" if desatualizada else "")
+
+
+# ----------------- CLI -----------------
+
+def _arquivos(caminhos):
+    for caminho in caminhos:
+        if os.path.isdir(caminho):
+            yield from sorted(c for c in glob.glob(os.path.join(caminho, "**", "*"), recursive=True) if c.lower().endswith(EXTENSOES))
+        else:
+            yield caminho
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Biblioteca local de bulas de referência.")
+    parser.add_argument("--ingerir", nargs="+", metavar="ARQUIVO", help="Arquivos ou pastas (.pdf/.docx)")
+    parser.add_argument("--produto", help="Nome do produto (padrão: deduzido do nome do arquivo)")
+    parser.add_argument("--listar", nargs="?", const="", metavar="BUSCA")
+    parser.add_argument("--remover", metavar="ID")
+    args = parser.parse_args(argv)
+
+    falhas = 0
+    for caminho in _arquivos(args.ingerir or []):
+        try:
+            with open(caminho, "rb") as f:
+                registro = ingerir_referencia(os.path.basename(caminho), f.read(), args.produto)
+            print(f"✅ {registro['id']}  {descrever_referencia(registro)}  ({registro['secoes']} seções)")
+        except (OSError, ValueError) as e:
+            falhas += 1
+            print(f"❌ {caminho}: {e}")
+    if args.remover:
+        print("Removida." if remover_referencia(args.remover) else "Id não encontrado.")
+    if args.listar is not None:
+        for registro in listar_referencias(args.listar):
+            print(f"{registro['id']}  {descrever_referencia(registro)}")
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,270 @@
+import contextvars
+import hashlib
+import mmap
+import os
+import tempfile
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+# ----------------- GOVERNADOR DE MEMÓRIA -----------------
+# Um único worker atende todas as sessões, e a página 3 é a que mais pesa: PDF em curvas
+# vira uma imagem por página (~13 MB decodificada a 216 dpi), viva até o fim do job.
+#
+# - Uploads grandes vão para um arquivo temporário e são lidos por mmap: o conteúdo fica
+#   no cache de páginas do sistema (descartável) em vez de cópias no heap do processo.
+# - Antes de rasterizar, o job reserva o custo das páginas no orçamento da SESSÃO e do
+#   PROCESSO. Se não couber, espera outro job liberar (menos páginas ao mesmo tempo),
+#   depois tenta um dpi menor, e só então recusa (MemoriaInsuficiente). Cada página
+#   devolve a sua parte quando a imagem é coletada.
+# - A memória residente é amostrada no fim de cada etapa (tracing.etapa): vai para o
+#   rastro da execução e para o pico da sessão (memoria_da_sessao).
+#
+#   VALIDADOR_SPOOL_MB=5                  uploads a partir daqui vão para disco
+#   VALIDADOR_SPOOL_DIR=<tmp do sistema>  pasta deles (em tmpfs não economiza nada)
+#   VALIDADOR_MEMORIA_SESSAO_MB=1024      rasters vivos de uma sessão
+#   VALIDADOR_MEMORIA_PROCESSO_MB=        teto de memória residente; padrão: 80% do limite do cgroup
+#   VALIDADOR_MEMORIA_ESPERA_S=20         espera por memória antes de degradar o dpi
+
+LIMIAR_SPOOL = int(float(os.environ.get("VALIDADOR_SPOOL_MB", "5")) * 2**20)
+PASTA_SPOOL = os.environ.get("VALIDADOR_SPOOL_DIR") or None
+ORCAMENTO_SESSAO = int(float(os.environ.get("VALIDADOR_MEMORIA_SESSAO_MB", "1024")) * 2**20)
+ESPERA_S = float(os.environ.get("VALIDADOR_MEMORIA_ESPERA_S", "20"))
+ZOOMS = (3.0, 2.0, 1.5)  # Rasterização normal e degradada: 216, 144 e 108 dpi
+MAX_SESSOES = 500        # Picos guardados (as mais antigas saem primeiro)
+
+
+def _teto_processo():
+    """Teto de memória residente: o configurado, ou 80% do limite do cgroup (0 = sem teto)."""
+    configurado = os.environ.get("VALIDADOR_MEMORIA_PROCESSO_MB")
+    if configurado: return int(float(configurado) * 2**20)
+    for caminho in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            with open(caminho) as f: limite = f.read().strip()
+        except OSError:
+            continue
+        if limite.isdigit() and int(limite) < 2**60: return int(int(limite) * 0.8)
+    return 0
+
+TETO_PROCESSO = _teto_processo()
+
+_sessao = contextvars.ContextVar("sessao_memoria", default=None)
+_condicao = threading.Condition()
+_reservado = {}   # sessão -> bytes de rasters vivos ou prestes a nascer
+_por_thread = {}  # thread que reservou -> bytes (esperar só faz sentido pelo que OUTRO job vai liberar)
+_pendente = 0     # bytes reservados e ainda não materializados (fora da memória residente)
+_picos = {}       # sessão -> {"residente": bytes, "rasters": bytes}
+
+
+class MemoriaInsuficiente(Exception):
+    """Nem o menor dpi cabe no orçamento: o job é recusado em vez de derrubar o worker."""
+
+
+# ----------------- UPLOADS EM DISCO -----------------
+
+class ArquivoGrande:
+    """
+    Upload guardado em disco. Faz as vezes dos bytes no pipeline: len(), `sha256` (hash do
+    conteúdo, usado por history.hash_arquivo e jobs.chave_job) e abrir() para ler por mmap.
+    O arquivo temporário é apagado quando o objeto é coletado.
+    """
+
+    def __init__(self, nome, caminho, tamanho, sha256):
+        self.nome, self.caminho, self.tamanho, self.sha256 = nome, caminho, tamanho, sha256
+        weakref.finalize(self, _apagar, caminho)
+
+    def __len__(self):
+        return self.tamanho
+
+    def abrir(self, nome=None):
+        with open(self.caminho, "rb") as f:
+            return ArquivoMapeado(nome or self.nome, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+class ArquivoMapeado:
+    """Arquivo aberto por mmap com o `name` do upload; read/seek/tell vêm do próprio mmap."""
+
+    def __init__(self, name, mapa):
+        self.name = name
+        self._mapa = mapa
+
+    def __getattr__(self, atributo):
+        return getattr(self._mapa, atributo)
+
+    def seekable(self):
+        return True
+
+    def visao(self):
+        """memoryview do arquivo inteiro, sem cópia (o PyMuPDF abre direto dela)."""
+        return memoryview(self._mapa)
+
+
+def _apagar(caminho):
+    try: os.remove(caminho)
+    except OSError: pass
+
+def guardar_upload(arquivo, nome=None):
+    """
+    Conteúdo de um upload (Streamlit/Flask) para o pipeline: bytes se for pequeno,
+    ArquivoGrande (em disco, com hash calculado na cópia) a partir de VALIDADOR_SPOOL_MB.
+    """
+    nome = nome or getattr(arquivo, "name", None) or getattr(arquivo, "filename", "")
+    arquivo.seek(0, os.SEEK_END)
+    tamanho = arquivo.tell()
+    arquivo.seek(0)
+    if tamanho < LIMIAR_SPOOL: return arquivo.read()
+    h = hashlib.sha256()
+    with tempfile.NamedTemporaryFile(prefix="upload_", suffix=os.path.splitext(nome)[1], dir=PASTA_SPOOL,
+                                     delete=False) as destino:
+        while True:
+            bloco = arquivo.read(1 << 20)
+            if not bloco: break
+            h.update(bloco)
+            destino.write(bloco)
+    arquivo.seek(0)
+    return ArquivoGrande(nome, destino.name, tamanho, h.hexdigest())
+
+def conteudo_pdf(arquivo):
+    """O que passar para fitz.open(stream=...): memoryview do mmap sem copiar, ou os bytes lidos."""
+    return arquivo.visao() if isinstance(arquivo, ArquivoMapeado) else arquivo.read()
+
+
+# ----------------- SESSÃO E MEDIÇÃO -----------------
+
+def sessao_atual():
+    """Sessão do Streamlit desta thread (ou a herdada pelo job); "processo" para lote/API."""
+    sessao = _sessao.get()
+    if sessao is not None: return sessao
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        contexto = get_script_run_ctx(suppress_warning=True)
+    except ImportError:
+        contexto = None
+    return contexto.session_id if contexto is not None else "processo"
+
+@contextmanager
+def usar_sessao(sessao):
+    """Atribui a memória usada no bloco a `sessao` (jobs._executar, com a sessão de quem submeteu)."""
+    token = _sessao.set(sessao)
+    try:
+        yield
+    finally:
+        _sessao.reset(token)
+
+def memoria_residente():
+    """Bytes residentes do processo agora (Linux: /proc/self/statm), ou None."""
+    try:
+        with open("/proc/self/statm") as f: return int(f.read().split()[1]) * mmap.PAGESIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+def amostrar():
+    """Memória residente em MB, registrada no pico da sessão atual (chamado no fim de cada etapa)."""
+    residente = memoria_residente()
+    if residente is None: return None
+    with _condicao:
+        pico = _pico(sessao_atual())
+        pico["residente"] = max(pico["residente"], residente)
+    return round(residente / 2**20, 1)
+
+def memoria_da_sessao(sessao=None):
+    """{"pico_residente_mb", "pico_rasters_mb", "rasters_mb"} da sessão (a atual, por padrão)."""
+    sessao = sessao or sessao_atual()
+    with _condicao:
+        pico = _picos.get(sessao, {"residente": 0, "rasters": 0})
+        return {"pico_residente_mb": round(pico["residente"] / 2**20, 1),
+                "pico_rasters_mb": round(pico["rasters"] / 2**20, 1),
+                "rasters_mb": round(_reservado.get(sessao, 0) / 2**20, 1)}
+
+def _pico(sessao):
+    """Registro de pico da sessão (chamar com _condicao)."""
+    if sessao not in _picos:
+        if len(_picos) >= MAX_SESSOES: del _picos[next(iter(_picos))]
+        _picos[sessao] = {"residente": 0, "rasters": 0}
+    return _picos[sessao]
+
+
+# ----------------- ORÇAMENTO DOS RASTERS -----------------
+
+def custo_raster(paginas, zoom):
+    """Bytes das imagens RGB decodificadas de `paginas` ([(largura, altura)] em pontos) no zoom."""
+    return sum(int(largura * zoom) * int(altura * zoom) * 3 for largura, altura in paginas)
+
+class Reserva:
+    """
+    Orçamento reservado para os rasters de um documento. vincular(imagem, bytes) passa a
+    parte da página para a vida da imagem; o que não for vinculado volta no fim do `with`.
+    """
+
+    def __init__(self, sessao, dono, total, zoom, espera_ms):
+        self.sessao, self.dono, self.restante, self.zoom, self.espera_ms = sessao, dono, total, zoom, espera_ms
+        self.total = total
+
+    @property
+    def degradada(self):
+        return self.zoom < ZOOMS[0]
+
+    def resumo(self):
+        return {"dpi": round(72 * self.zoom), "degradado": self.degradada, "reservado_mb": round(self.total / 2**20, 1),
+                "espera_ms": self.espera_ms}
+
+    def vincular(self, objeto, tamanho):
+        global _pendente
+        tamanho = min(tamanho, self.restante)
+        self.restante -= tamanho
+        with _condicao: _pendente -= tamanho  # Agora está na memória residente
+        weakref.finalize(objeto, _liberar, self.sessao, self.dono, tamanho)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *erro):
+        global _pendente
+        with _condicao: _pendente -= self.restante
+        _liberar(self.sessao, self.dono, self.restante)
+        self.restante = 0
+
+def _cabe(sessao, custo):
+    """Cabe no orçamento da sessão e no teto do processo? (chamar com _condicao)"""
+    if _reservado.get(sessao, 0) + custo > ORCAMENTO_SESSAO: return False
+    if not TETO_PROCESSO: return True
+    return (memoria_residente() or 0) + _pendente + custo <= TETO_PROCESSO
+
+def reservar_raster(paginas, espera_s=None):
+    """
+    Reserva para rasterizar `paginas` ([(largura, altura)] em pontos) no maior zoom possível:
+    o normal se couber (esperando até `espera_s` outros jobs liberarem memória), senão o
+    maior zoom degradado que couber agora. Sobe MemoriaInsuficiente se nenhum couber.
+    """
+    global _pendente
+    sessao, dono = sessao_atual(), threading.get_ident()
+    espera_s = ESPERA_S if espera_s is None else espera_s
+    inicio = time.monotonic()
+    with _condicao:
+        custo = custo_raster(paginas, ZOOMS[0])
+        # Só vale esperar se há rasters de outros jobs que vão ser liberados
+        _condicao.wait_for(lambda: _cabe(sessao, custo) or not any(b for t, b in _por_thread.items() if t != dono),
+                           timeout=espera_s)
+        for zoom in ZOOMS:
+            custo = custo_raster(paginas, zoom)
+            if _cabe(sessao, custo): break
+        else:
+            raise MemoriaInsuficiente(
+                f"Memória insuficiente para rasterizar {len(paginas)} página(s) nem a {round(72 * ZOOMS[-1])} dpi "
+                f"({custo / 2**20:.0f} MB). Aguarde as outras conferências terminarem ou envie menos arquivos por vez.")
+        _reservado[sessao] = _reservado.get(sessao, 0) + custo
+        _por_thread[dono] = _por_thread.get(dono, 0) + custo
+        _pendente += custo
+        pico = _pico(sessao)
+        pico["rasters"] = max(pico["rasters"], _reservado[sessao])
+    return Reserva(sessao, dono, custo, zoom, round((time.monotonic() - inicio) * 1000))
+
+def _liberar(sessao, dono, tamanho):
+    if not tamanho: return
+    with _condicao:
+        for contas, chave in ((_reservado, sessao), (_por_thread, dono)):
+            restante = contas.get(chave, 0) - tamanho
+            if restante > 0: contas[chave] = restante
+            else: contas.pop(chave, None)
+        _condicao.notify_all()
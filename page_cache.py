@@ -0,0 +1,144 @@
+import hashlib
+import os
+import re
+import threading
+
+# ----------------- CACHE POR PÁGINA (IMPRESSÃO DIGITAL) -----------------
+# Provas de apresentações diferentes do mesmo produto compartilham quase todas as
+# páginas, e uma revisão nova costuma mudar uma ou duas. Cada página de PDF ganha uma
+# impressão digital: hash do content stream e de tudo que os recursos dela referenciam
+# (imagens, formulários, fontes), com os números de objeto trocados pela ordem em que
+# aparecem. O mesmo conteúdo em outro PDF (reexportado, outra apresentação) dá a mesma
+# impressão; qualquer traço ou letra diferente dá outra.
+#
+# - Raster: o JPEG de cada página fica guardado por impressão + dpi. Só páginas novas ou
+#   alteradas passam pelo get_pixmap (a parte cara da página 3 com PDF em curvas).
+# - Transcrição: a resposta do modelo na página 3 fica guardada pelas impressões de todas
+#   as páginas dos dois lados + prompt + modelo. A transcrição é por seção, atravessando
+#   páginas, então só o conjunto inteiro igual evita a chamada.
+#
+#   VALIDADOR_CACHE_PAGINAS=cache_paginas    pasta dos arquivos
+#   VALIDADOR_CACHE_PAGINAS_MB=1024          acima disso os menos usados saem primeiro (0 = desligado)
+
+PASTA_CACHE_PAGINAS = os.environ.get("VALIDADOR_CACHE_PAGINAS", "cache_paginas")
+LIMITE_CACHE = int(float(os.environ.get("VALIDADOR_CACHE_PAGINAS_MB", "1024")) * 2**20)
+ATIVO = LIMITE_CACHE > 0
+PODAR_A_CADA = 50  # Gravações entre uma conferência de tamanho e a próxima
+
+_REFERENCIA = re.compile(r"(\d+) \d+ R")
+_PARENT = re.compile(r"/Parent\s*\d+ \d+ R")  # Subir para a árvore de páginas puxaria o documento inteiro
+_lock = threading.Lock()
+_gravacoes = 0
+
+
+# ----------------- IMPRESSÃO DIGITAL -----------------
+
+def impressao_pagina(page):
+    """
+    sha256 do que desenha a página do PyMuPDF, ou None se os recursos forem herdados
+    da árvore de páginas (raro; a página fica sem cache).
+    """
+    doc = page.parent
+    tipo, recursos = doc.xref_get_key(page.xref, "Resources")
+    if tipo not in ("dict", "xref"): return None
+    h = hashlib.sha256(f"{page.rect}|{page.rotation}|".encode())
+    h.update(page.read_contents())
+    numeros, fila = {}, []
+
+    def canonico(texto):
+        # Referências viram a ordem de aparição: o mesmo conteúdo em outro PDF tem outros xrefs
+        def trocar(achado):
+            xref = int(achado.group(1))
+            if xref not in numeros:
+                numeros[xref] = len(numeros)
+                fila.append(xref)
+            return f"@{numeros[xref]}"
+        return _REFERENCIA.sub(trocar, _PARENT.sub("", texto))
+
+    h.update(canonico(recursos).encode())
+    tipo, anotacoes = doc.xref_get_key(page.xref, "Annots")  # Carimbos e comentários também saem no raster
+    if tipo != "null": h.update(canonico(anotacoes).encode())
+    while fila:
+        xref = fila.pop(0)
+        h.update(canonico(doc.xref_object(xref, compressed=True)).encode())
+        if doc.xref_is_stream(xref): h.update(doc.xref_stream_raw(xref) or b"")
+    return h.hexdigest()
+
+def chave_transcricao(conteudos, prompt, modelo):
+    """
+    Chave da transcrição para os conteúdos de process_file_content dos dois lados (listas),
+    ou None se alguma imagem não tiver impressão (JPG/PNG enviados direto).
+    """
+    h = hashlib.sha256(f"{modelo}|{prompt}".encode("utf-8"))
+    for conteudo in conteudos:
+        h.update(b"\x00lado")
+        for item in conteudo:
+            if isinstance(item, str):
+                h.update(b"\x00texto" + hashlib.sha256(item.encode("utf-8")).digest())
+                continue
+            impressao = item.info.get("impressao")
+            if impressao is None: return None
+            h.update(f"\x00pagina{impressao}".encode())
+    return h.hexdigest()
+
+
+# ----------------- ARQUIVOS -----------------
+
+def _caminho(nome):
+    return os.path.join(PASTA_CACHE_PAGINAS, nome)
+
+def _ler(nome):
+    if not ATIVO: return None
+    try:
+        with open(_caminho(nome), "rb") as f: conteudo = f.read()
+        os.utime(_caminho(nome))  # Usado agora: é dos últimos a sair na poda
+        return conteudo
+    except OSError:
+        return None
+
+def _gravar(nome, conteudo):
+    """Escrita atômica; falha de disco é ignorada (cache é só otimização)."""
+    global _gravacoes
+    if not ATIVO: return
+    try:
+        os.makedirs(PASTA_CACHE_PAGINAS, exist_ok=True)
+        temporario = f"{_caminho(nome)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporario, "wb") as f: f.write(conteudo)
+        os.replace(temporario, _caminho(nome))
+    except OSError:
+        return
+    with _lock:
+        _gravacoes += 1
+        podar = _gravacoes % PODAR_A_CADA == 1
+    if podar: _podar()
+
+def _podar():
+    """Apaga os arquivos menos usados até o cache caber em VALIDADOR_CACHE_PAGINAS_MB."""
+    arquivos = []
+    try:
+        for entrada in os.scandir(PASTA_CACHE_PAGINAS):
+            if entrada.is_file():
+                estado = entrada.stat()
+                arquivos.append((estado.st_mtime, estado.st_size, entrada.path))
+    except OSError:
+        return
+    excesso = sum(tamanho for _, tamanho, _ in arquivos) - LIMITE_CACHE
+    for _, tamanho, caminho in sorted(arquivos):
+        if excesso <= 0: break
+        try: os.remove(caminho)
+        except OSError: continue
+        excesso -= tamanho
+
+def obter_raster(impressao, dpi):
+    """JPEG guardado da página com essa impressão nesse dpi, ou None."""
+    return _ler(f"{impressao}_{dpi}.jpg")
+
+def salvar_raster(impressao, dpi, jpeg):
+    _gravar(f"{impressao}_{dpi}.jpg", jpeg)
+
+def obter_transcricao(chave):
+    conteudo = _ler(f"{chave}.transcricao.json")
+    return conteudo.decode("utf-8") if conteudo is not None else None
+
+def salvar_transcricao(chave, texto):
+    _gravar(f"{chave}.transcricao.json", texto.encode("utf-8"))
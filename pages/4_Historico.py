@@ -0,0 +1,64 @@
+import streamlit as st
+from history import (carregar_conferencia, descrever_conferencia, hash_arquivo, listar_conferencias, remover_conferencia,
+                     secoes_da_conferencia)
+from ui import aplicar_css, renderizar_conferencia_grafica, renderizar_conferencia_textos
+
+# ----------------- 1. VISUAL & CSS -----------------
+st.set_page_config(page_title="Histórico de Conferências", page_icon="🗄️", layout="wide")
+aplicar_css()
+
+# ----------------- 2. CONFIGURAÇÃO -----------------
+MODOS = {"Todas": None, "Med. Referência x BELFAR": "referencia", "Conferência MKT": "mkt", "Gráfica x Arte": "grafica"}
+NOMES_MODO = {modo: nome for nome, modo in MODOS.items() if modo}
+
+# ----------------- 3. UI PRINCIPAL -----------------
+st.title("🗄️ Histórico de Conferências")
+st.caption("Toda conferência concluída fica guardada aqui. Reenviar o mesmo par de arquivos reabre o resultado sem chamar o modelo.")
+
+c1, c2, c3 = st.columns([2, 1, 2])
+busca = c1.text_input("🔎 Produto ou nome de arquivo", key="hist_busca")
+modo = MODOS[c2.selectbox("Página", list(MODOS), key="hist_modo")]
+arquivo = c3.file_uploader("📎 Ou procure por um arquivo (mesmo conteúdo)", type=["pdf", "docx", "jpg", "png"], key="hist_arquivo")
+
+registros = listar_conferencias(busca, modo, hash_arquivo(arquivo.getvalue()) if arquivo else None)
+if not registros:
+    st.info("Nenhuma conferência encontrada." if busca or modo or arquivo else "Nenhuma conferência registrada ainda.")
+    st.stop()
+
+st.dataframe(
+    {
+        "Conferido em": [r["conferido_em"] for r in registros],
+        "Página": [NOMES_MODO.get(r["modo"], r["modo"]) for r in registros],
+        "Produto": [r["produto"] for r in registros],
+        "Referência": [r["arquivo_ref"] for r in registros],
+        "Candidato": [r["arquivo_cand"] for r in registros],
+        "Data Anvisa (Ref / Cand)": [f"{r['data_ref']} / {r['data_cand']}" for r in registros],
+        "Divergentes": [f"⚠️ {r['divergentes']}/{r['secoes']}" if r["divergentes"] else f"✅ 0/{r['secoes']}" for r in registros],
+    },
+    hide_index=True,
+)
+
+escolhido = st.selectbox("📂 Reabrir conferência", registros, index=None, format_func=descrever_conferencia,
+                         placeholder="Escolha uma conferência para ver o relatório...", key="hist_escolhido")
+if escolhido is None:
+    st.stop()
+
+registro = carregar_conferencia(escolhido["id"])
+if registro is None:
+    st.warning("Conferência removida.")
+    st.stop()
+
+divergentes = [s["titulo"] for s in secoes_da_conferencia(registro["id"]) if s["status"] != "CONFORME"]
+st.caption(f"🔑 Referência {registro['hash_ref'][:12]}… • Candidato {registro['hash_cand'][:12]}…"
+           + (f" • Seções divergentes: {', '.join(divergentes)}" if divergentes else ""))
+if st.button("🗑️ Remover do histórico (o próximo envio deste par será conferido de novo)", key=f"hist_remover_{registro['id']}"):
+    remover_conferencia(registro["id"])
+    st.rerun()
+
+st.divider()
+# O id do registro faz o papel do id do job: cache do relatório e chaves dos widgets
+resultado = dict(registro["resultado"], historico=None)
+if registro["modo"] == "grafica":
+    renderizar_conferencia_grafica(resultado, f"historico_{registro['id']}")
+else:
+    renderizar_conferencia_textos(resultado, f"historico_{registro['id']}")
@@ -0,0 +1,232 @@
+import difflib
+import html
+import json
+import re
+
+from core import SECOES_SEM_COMPARACAO
+
+# ----------------- RELATÓRIO PRÉ-CALCULADO -----------------
+# O resultado de uma conferência vira, uma única vez, um relatório compacto: cada seção
+# guarda as linhas já balanceadas (tags abertas numa linha são fechadas no fim dela e
+# reabertas na seguinte), os trechos com divergência + contexto e o mapa linha a linha
+# entre os dois lados. A página só fatia esse relatório; o download usa o mesmo objeto.
+
+CLASSES_DIVERGENCIA = ("highlight-yellow", "highlight-moved")
+# Ortografia e estilo também abrem trecho, mas não entram na contagem de divergências
+CLASSES_TRECHOS = CLASSES_DIVERGENCIA + ("highlight-pink", "highlight-style")
+LINHAS_CONTEXTO = 1           # Linhas de contexto antes/depois de cada divergência
+CARACTERES_POR_PAGINA = 6000  # Seções maiores que isso são paginadas na visão completa
+
+TIPOS = {
+    "textos": {
+        "campos": ("texto_anvisa", "texto_mkt"), "data_cand": "data_mkt",
+        "rotulos": ("📜 Referência", "🎨 Validado"), "rotulo_data_cand": "Data Anvisa (MKT)",
+    },
+    "grafica": {
+        "campos": ("texto_arte", "texto_grafica"), "data_cand": "data_grafica",
+        "rotulos": ("Referência (Arte)", "Validação (Gráfica)"), "rotulo_data_cand": "Data Anvisa (Gráfica)",
+    },
+}
+
+CSS_RELATORIO = """
+    .texto-box {
+        font-family: 'Segoe UI', sans-serif;
+        font-size: 0.95rem;
+        line-height: 1.6;
+        color: #212529;
+        background-color: #ffffff;
+        padding: 20px;
+        border-radius: 8px;
+        border: 1px solid #ced4da;
+        box-shadow: 0 2px 4px rgba(0,0,0,0.05);
+        white-space: pre-wrap;
+        text-align: left;
+    }
+
+    /* Highlight Amarelo (Erros de conteúdo) */
+    .highlight-yellow {
+        background-color: #fff3cd; color: #856404;
+        padding: 2px 4px; border-radius: 4px; border: 1px solid #ffeeba; font-weight: bold;
+    }
+
+    /* Tracejado laranja (Trecho deslocado em relação à referência) */
+    .highlight-moved {
+        background-color: #ffe8cc; color: #8a4b08;
+        padding: 2px 4px; border-radius: 4px; border: 1px dashed #f0a04b;
+    }
+
+    /* Highlight Rosa (Possíveis erros de português) */
+    .highlight-pink {
+        background-color: #f8d7e8; color: #8a1c4a;
+        padding: 2px 4px; border-radius: 4px; border: 1px solid #f1b6cf;
+    }
+
+    /* Contorno roxo (Mesmo texto, negrito/itálico diferente da referência) */
+    .highlight-style { outline: 2px dashed #9b6bcc; outline-offset: 1px; border-radius: 3px; cursor: help; }
+
+    /* Pontilhado (Provável ruído de OCR na página 3; não é divergência) */
+    .highlight-ocr { border-bottom: 2px dotted #adb5bd; cursor: help; }
+
+    /* Highlight Azul (Datas da Anvisa) */
+    .highlight-blue {
+        background-color: #d1ecf1; color: #0c5460;
+        padding: 2px 4px; border-radius: 4px; border: 1px solid #bee5eb; font-weight: bold;
+    }
+
+    /* Bordas */
+    .border-ok { border-left: 6px solid #28a745 !important; }
+    .border-warn { border-left: 6px solid #ffc107 !important; }
+    .border-info { border-left: 6px solid #17a2b8 !important; }
+"""
+
+TAG_RE = re.compile(r'<(/?)(b|span)\b([^>]*)>', re.IGNORECASE)
+TAGS_HTML_RE = re.compile(r'<[^>]+>')
+QUEBRA_RE = re.compile(r'\n|<br\s*/?>', re.IGNORECASE)  # Páginas 1 e 2 guardam as quebras como <br>
+
+
+# ----------------- LINHAS E TRECHOS -----------------
+
+def dividir_linhas(texto_html):
+    """Quebra o HTML (quebras de linha ou <br>) em linhas não vazias, cada uma com as suas tags <b>/<span> balanceadas."""
+    linhas, abertas = [], []
+    for linha in QUEBRA_RE.split(texto_html or ""):
+        completa = "".join(abertura for _, abertura in abertas) + linha
+        abertas = _tags_abertas(completa)
+        if linha.strip():
+            linhas.append(completa + "".join(f"</{nome}>" for nome, _ in reversed(abertas)))
+    return linhas
+
+def _tags_abertas(trecho):
+    """Pilha (nome, tag de abertura com atributos) das tags que o trecho deixa abertas."""
+    pilha = []
+    for m in TAG_RE.finditer(trecho):
+        nome = m.group(2).lower()
+        if not m.group(1):
+            pilha.append((nome, m.group(0)))
+        elif any(n == nome for n, _ in pilha):
+            del pilha[max(i for i, (n, _) in enumerate(pilha) if n == nome)]
+    return pilha
+
+def texto_puro(linha):
+    return html.unescape(TAGS_HTML_RE.sub("", linha)).strip()
+
+def mapear_linhas(linhas_ref, linhas_cand):
+    """Para cada linha do candidato, o intervalo [ini, fim) de linhas da referência correspondente."""
+    matcher = difflib.SequenceMatcher(None, [texto_puro(l) for l in linhas_ref], [texto_puro(l) for l in linhas_cand], autojunk=False)
+    mapa = [(0, 0)] * len(linhas_cand)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        for j in range(j1, j2):
+            mapa[j] = (i1 + (j - j1), i1 + (j - j1) + 1) if tag == "equal" else (i1, i2)
+    return mapa
+
+def localizar_trechos(linhas, contexto=LINHAS_CONTEXTO):
+    """Intervalos [ini, fim) das linhas com divergência, com contexto e já unidos."""
+    trechos = []
+    for i, linha in enumerate(linhas):
+        if not any(classe in linha for classe in CLASSES_TRECHOS): continue
+        ini, fim = max(0, i - contexto), min(len(linhas), i + contexto + 1)
+        if trechos and ini <= trechos[-1][1]:
+            trechos[-1] = (trechos[-1][0], fim)
+        else:
+            trechos.append((ini, fim))
+    return trechos
+
+def paginar(linhas, limite=CARACTERES_POR_PAGINA):
+    """Intervalos [ini, fim) de linhas com até `limite` caracteres cada (pelo menos uma linha)."""
+    paginas, ini, tamanho = [], 0, 0
+    for i, linha in enumerate(linhas):
+        if tamanho and tamanho + len(linha) > limite:
+            paginas.append((ini, i))
+            ini, tamanho = i, 0
+        tamanho += len(linha)
+    if ini < len(linhas) or not paginas:
+        paginas.append((ini, len(linhas)))
+    return paginas
+
+def linhas_ref_de(secao, ini, fim):
+    """Linhas da referência que correspondem às linhas [ini, fim) do candidato."""
+    intervalos = secao["mapa"][ini:fim]
+    if not intervalos: return []
+    return secao["linhas_ref"][min(i for i, _ in intervalos):max(f for _, f in intervalos)]
+
+
+# ----------------- MONTAGEM -----------------
+
+def _apresentacao(tipo, titulo, status):
+    """(ícone, classe da borda, aberta por padrão) — as mesmas regras visuais das páginas."""
+    titulo_upper = titulo.upper()
+    if "DIZERES LEGAIS" in titulo_upper:
+        return ("⚖️" if tipo == "textos" else "📅"), "border-info", True
+    if tipo == "textos" and any(b in titulo_upper for b in SECOES_SEM_COMPARACAO):
+        return "🔒", "border-ok", False
+    if status == "CONFORME":
+        return "✅", "border-ok", False
+    return "⚠️", "border-warn", True
+
+def montar_relatorio(resultado, tipo):
+    """Relatório compacto a partir do resultado de core.conferir_textos / conferir_grafica."""
+    config = TIPOS[tipo]
+    campo_ref, campo_cand = config["campos"]
+    secoes = []
+    for item in resultado["secoes"]:
+        titulo = item.get("titulo", "Seção")
+        status = item.get("status", "CONFORME")
+        icone, css, aberta = _apresentacao(tipo, titulo, status)
+        linhas_ref = dividir_linhas(item.get(campo_ref, ""))
+        linhas_cand = dividir_linhas(item.get(campo_cand, ""))
+        texto_cand = item.get(campo_cand, "")
+        secoes.append({
+            "titulo": titulo, "status": status, "icone": icone, "css": css, "aberta": aberta,
+            "linhas_ref": linhas_ref, "linhas_cand": linhas_cand,
+            "mapa": mapear_linhas(linhas_ref, linhas_cand),
+            "trechos": localizar_trechos(linhas_cand),
+            "paginas": paginar(linhas_cand),
+            "divergencias": sum(texto_cand.count(f'class="{c}"') for c in CLASSES_DIVERGENCIA),
+            "ortografia": item.get("ortografia", 0),
+            "estilo": item.get("estilo", 0),
+        })
+    return {
+        "tipo": tipo,
+        "rotulos": config["rotulos"],
+        "rotulo_data_cand": config["rotulo_data_cand"],
+        "data_ref": resultado["data_ref"],
+        "data_cand": resultado[config["data_cand"]],
+        "secoes": secoes,
+        "parcial": resultado.get("parcial"),
+    }
+
+
+# ----------------- DOWNLOAD (HTML / JSON) -----------------
+
+def exportar_json(resultado):
+    return json.dumps(resultado, ensure_ascii=False, indent=2)
+
+def exportar_html(relatorio, titulo="Relatório de Conferência"):
+    """Arquivo único, sem dependências externas, com as duas colunas de cada seção."""
+    rotulo_ref, rotulo_cand = relatorio["rotulos"]
+    divergentes = sum(1 for s in relatorio["secoes"] if s["status"] != "CONFORME")
+    partes = [
+        f"<!DOCTYPE html><html lang='pt-BR'><head><meta charset='utf-8'><title>{html.escape(titulo)}</title>",
+        "<style>body { font-family: 'Segoe UI', sans-serif; margin: 24px; background: #f8f9fa; }"
+        " .colunas { display: grid; grid-template-columns: 1fr 1fr; gap: 16px; }"
+        " details { margin: 12px 0; } summary { font-weight: 600; cursor: pointer; }"
+        + CSS_RELATORIO + "</style></head><body>",
+        f"<h1>{html.escape(titulo)}</h1>",
+        f"<p><b>Data Anvisa (Ref):</b> {html.escape(str(relatorio['data_ref']))} &nbsp; "
+        f"<b>{html.escape(relatorio['rotulo_data_cand'])}:</b> {html.escape(str(relatorio['data_cand']))}</p>",
+        f"<p>✅ Conformes: {len(relatorio['secoes']) - divergentes} &nbsp; ⚠️ Divergentes: {divergentes}</p>",
+    ]
+    if relatorio.get("parcial"):
+        faltando = ", ".join(relatorio["parcial"]["faltando"]) or "—"
+        partes.append(f"<p><b>⏱️ Relatório parcial:</b> {html.escape(relatorio['parcial']['mensagem'])}"
+                      f" Seções que ficaram de fora: {html.escape(faltando)}</p>")
+    for secao in relatorio["secoes"]:
+        partes.append(
+            f"<details{' open' if secao['aberta'] else ''}><summary>{secao['icone']} {html.escape(secao['titulo'])}</summary>"
+            f"<div class='colunas'><div><small>{rotulo_ref}</small>"
+            f"<div class='texto-box {secao['css']}'>{chr(10).join(secao['linhas_ref'])}</div></div>"
+            f"<div><small>{rotulo_cand}</small>"
+            f"<div class='texto-box {secao['css']}'>{chr(10).join(secao['linhas_cand'])}</div></div></div></details>"
+        )
+    partes.append("</body></html>")
+    return "\n".join(partes)
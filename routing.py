@@ -0,0 +1,149 @@
+"""
+Roteamento de modelo pela complexidade da entrada.
+
+Cada conferência é pontuada localmente, antes do prompt, por quatro fatores: páginas,
+fração de páginas que são imagem (scan/curvas), qualidade da camada de texto e
+quantidade de seções enviadas. A pontuação escolhe o nível do modelo:
+
+    leve    < LIMIAR_LEVE <= padrao < LIMIAR_PESADO <= pesado
+
+A decisão (nível, modelo, pontuação e fatores) vai para o rastro da execução
+(tracing.anotar) e, com ela, para metricas.jsonl junto da duração da etapa "modelo".
+Para calibrar os limiares com o histórico:
+
+    python -m routing --relatorio [metricas.jsonl]
+
+Configuração por ambiente:
+    VALIDADOR_ROTEAMENTO=0                    desliga (sempre o nível padrão)
+    VALIDADOR_ROTEAMENTO_LIMIARES=3,6         limiares leve/pesado
+    VALIDADOR_MODELO_LEVE / _PADRAO / _PESADO nomes dos modelos de cada nível
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+
+MODELOS = {
+    "leve": os.environ.get("VALIDADOR_MODELO_LEVE", "models/gemini-flash-lite-latest"),
+    "padrao": os.environ.get("VALIDADOR_MODELO_PADRAO", "models/gemini-flash-latest"),
+    "pesado": os.environ.get("VALIDADOR_MODELO_PESADO", "models/gemini-pro-latest"),
+}
+NIVEIS = ("leve", "padrao", "pesado")
+
+ATIVO = os.environ.get("VALIDADOR_ROTEAMENTO", "1") != "0"
+LIMIAR_LEVE, LIMIAR_PESADO = (float(x) for x in os.environ.get("VALIDADOR_ROTEAMENTO_LIMIARES", "3,6").split(","))
+
+# Peso de cada fator, já normalizado para 0..1
+PESOS = {"paginas": 3.0, "raster": 4.0, "texto_ruim": 3.0, "secoes": 1.0}
+PAGINAS_REFERENCIA = 40        # Somando os dois documentos; a partir daqui o fator "paginas" satura
+SECOES_REFERENCIA = 12         # Bula do paciente completa
+CARACTERES_POR_PAGINA = 3500   # Estimativa de páginas quando só há texto
+MAX_TEXTO_RUIM = 0.05          # 5% de caracteres suspeitos já é camada de texto ruim
+
+
+# ----------------- FATORES -----------------
+
+def _caractere_suspeito(c):
+    """Glifo sem mapeamento (U+FFFD, área de uso privado) ou caractere de controle."""
+    codigo = ord(c)
+    return c == "�" or 0xE000 <= codigo <= 0xF8FF or (codigo < 32 and c not in "\n\t\r")
+
+def qualidade_texto(texto):
+    """Fração de caracteres 'bons' na camada de texto (1.0 = limpa)."""
+    if not texto: return 1.0
+    amostra = texto[:20000]
+    suspeitos = sum(1 for c in amostra if _caractere_suspeito(c)) + 8 * amostra.count("(cid:")
+    return max(0.0, 1.0 - suspeitos / len(amostra))
+
+def fatores_de_conteudo(conteudos, secoes=SECOES_REFERENCIA):
+    """
+    Fatores a partir das listas de core.process_file_content (texto ou imagens por lado)
+    ou de textos extraídos (strings).
+    """
+    textos = [c for c in conteudos if isinstance(c, str)]
+    imagens = len(conteudos) - len(textos)
+    paginas_texto = sum(max(1, round(len(t) / CARACTERES_POR_PAGINA)) for t in textos)
+    paginas = paginas_texto + imagens
+    return {
+        "paginas": paginas,
+        "raster": round(imagens / paginas, 3) if paginas else 0.0,
+        "qualidade_texto": round(min((qualidade_texto(t) for t in textos), default=1.0), 4),
+        "secoes": secoes,
+    }
+
+
+# ----------------- DECISÃO -----------------
+
+def pontuar(fatores):
+    texto_ruim = min(1.0, (1.0 - fatores["qualidade_texto"]) / MAX_TEXTO_RUIM)
+    return round(
+        PESOS["paginas"] * min(1.0, fatores["paginas"] / PAGINAS_REFERENCIA)
+        + PESOS["raster"] * fatores["raster"]
+        + PESOS["texto_ruim"] * texto_ruim
+        + PESOS["secoes"] * min(1.0, fatores["secoes"] / SECOES_REFERENCIA), 3)
+
+def escolher_modelo(fatores):
+    """{"nivel", "modelo", "pontuacao", "fatores"} para os fatores de uma conferência."""
+    pontuacao = pontuar(fatores)
+    if not ATIVO:
+        nivel = "padrao"
+    elif pontuacao < LIMIAR_LEVE:
+        nivel = "leve"
+    elif pontuacao < LIMIAR_PESADO:
+        nivel = "padrao"
+    else:
+        nivel = "pesado"
+    return {"nivel": nivel, "modelo": MODELOS[nivel], "pontuacao": pontuacao, "fatores": fatores}
+
+
+# ----------------- RELATÓRIO (CALIBRAÇÃO) -----------------
+
+def _ler_registros(caminho):
+    with open(caminho, "r", encoding="utf-8") as f:
+        for linha in f:
+            try: registro = json.loads(linha)
+            except ValueError: continue
+            rota = registro.get("dados", {}).get("rota")
+            modelo = next((e for e in registro.get("etapas", []) if e["etapa"] == "modelo"), None)
+            if rota and modelo: yield registro, rota, modelo
+
+def relatorio(caminho):
+    """Linhas de texto com latência da etapa "modelo" por nível e por faixa de pontuação."""
+    por_nivel, por_faixa = {}, {}
+    for registro, rota, modelo in _ler_registros(caminho):
+        amostra = (modelo["duracao_ms"], bool(registro.get("dados", {}).get("ultimo_erro")))
+        por_nivel.setdefault(rota["nivel"], []).append(amostra)
+        por_faixa.setdefault(int(rota["pontuacao"]), []).append(amostra)
+
+    def linha(rotulo, amostras):
+        tempos = sorted(ms for ms, _ in amostras)
+        p90 = tempos[min(len(tempos) - 1, int(len(tempos) * 0.9))]
+        falhas = sum(1 for _, erro in amostras if erro)
+        return f"{rotulo:<14}{len(amostras):>6}{statistics.median(tempos) / 1000:>10.2f} s{p90 / 1000:>9.2f} s{falhas:>8}"
+
+    cabecalho = f"{'':<14}{'jobs':>6}{'mediana':>12}{'p90':>11}{'falhas':>8}"
+    linhas = [f"Limiares atuais: leve < {LIMIAR_LEVE} <= padrao < {LIMIAR_PESADO} <= pesado", "", cabecalho]
+    linhas += [linha(nivel, por_nivel[nivel]) for nivel in NIVEIS if nivel in por_nivel]
+    linhas += ["", cabecalho]
+    linhas += [linha(f"pontos {faixa}-{faixa + 1}", por_faixa[faixa]) for faixa in sorted(por_faixa)]
+    return linhas
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Roteamento de modelo por complexidade da entrada.")
+    parser.add_argument("--relatorio", nargs="?", const="metricas.jsonl", metavar="JSONL",
+                        help="Latência da etapa 'modelo' por nível e faixa de pontuação")
+    args = parser.parse_args(argv)
+    if args.relatorio is None:
+        parser.print_help()
+        return 0
+    try:
+        print("\n".join(relatorio(args.relatorio)))
+    except OSError as e:
+        print(f"❌ {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
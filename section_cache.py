@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+
+from sections import hash_texto, normalizar_texto, segmentar_secoes
+from styles import localizar
+
+# ----------------- CACHE DE RESULTADOS POR SEÇÃO -----------------
+# Um arquivo JSON por seção já conferida, com nome = hash(modo, título, ref, candidato).
+# Se o MKT reenviar a arte corrigindo só uma seção, as outras vêm daqui e apenas
+# a seção alterada volta para o modelo. O estilo (negrito etc.) de cada segmento entra
+# na chave: mudar só o negrito de uma seção também a tira do cache.
+#
+# A chave também leva VERSAO: o arquivo guarda a seção já com o diff renderizado, então
+# toda mudança no diff, na extração ou no formato do resultado precisa aumentar a versão
+# (senão as seções antigas voltam com a marcação antiga).
+
+PASTA_CACHE_SECOES = os.environ.get("VALIDADOR_CACHE_SECOES", "cache_secoes")
+VERSAO = 4  # 2: diff ancorado em frases, blocos movidos; 3: estilos em RLE (styles.py);
+            # 4: cabeçalhos/rodapés removidos antes do diff
+
+
+def chave_secao(modo, titulo, texto_ref, texto_cand, estilo_ref=None, estilo_cand=None):
+    base = f"v{VERSAO}|{modo}|{titulo}|{hash_texto(texto_ref)}|{hash_texto(texto_cand)}|{json.dumps(estilo_ref)}|{json.dumps(estilo_cand)}"
+    return hashlib.sha256(base.encode('utf-8')).hexdigest()
+
+
+def obter_secao(chave):
+    caminho = os.path.join(PASTA_CACHE_SECOES, f"{chave}.json")
+    if not os.path.exists(caminho): return None
+    try:
+        with open(caminho, "r", encoding="utf-8") as f: return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def salvar_secao(chave, resultado):
+    os.makedirs(PASTA_CACHE_SECOES, exist_ok=True)
+    caminho = os.path.join(PASTA_CACHE_SECOES, f"{chave}.json")
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, "w", encoding="utf-8") as f: json.dump(resultado, f, ensure_ascii=False)
+    os.replace(temporario, caminho)  # Escrita atômica: leitores nunca veem arquivo pela metade
+
+
+def planejar_revalidacao(modo, texto_ref, texto_cand, titulos, segmentos_ref=None, estilos_ref=None, estilos_cand=None,
+                         selecao=None):
+    """
+    Decide, antes de chamar o modelo, o que pode ser reaproveitado:
+    - "identicos": documentos iguais após normalização (nenhuma chamada é necessária);
+    - "reaproveitadas": {titulo: resultado salvo} para seções sem alteração;
+    - "pendentes": títulos que precisam ir para o modelo.
+    `segmentos_ref` evita segmentar de novo uma referência já preparada (biblioteca).
+    `estilos_ref`/`estilos_cand` são os RLE de estilo dos documentos (styles.py).
+    Com `selecao` (conferência de só algumas seções), só elas podem ficar pendentes; as
+    outras entram apenas se já estiverem salvas. A segmentação usa sempre todos os títulos.
+    """
+    plano = {
+        "modo": modo,
+        "identicos": normalizar_texto(texto_ref) == normalizar_texto(texto_cand),
+        "segmentos_ref": segmentar_secoes(texto_ref, titulos) if segmentos_ref is None else segmentos_ref,
+        "segmentos_cand": segmentar_secoes(texto_cand, titulos),
+        "estilos_segmentos": {},
+        "reaproveitadas": {},
+        "pendentes": [],
+        "selecao": selecao,
+    }
+    if plano["identicos"]: return plano
+
+    for titulo in titulos:
+        seg_ref = plano["segmentos_ref"].get(titulo)
+        seg_cand = plano["segmentos_cand"].get(titulo)
+        salvo = None
+        if seg_ref is not None and seg_cand is not None:
+            estilos = (localizar(texto_ref, estilos_ref, seg_ref), localizar(texto_cand, estilos_cand, seg_cand))
+            plano["estilos_segmentos"][titulo] = estilos
+            salvo = obter_secao(chave_secao(modo, titulo, seg_ref, seg_cand, *estilos))
+        if salvo: plano["reaproveitadas"][titulo] = salvo
+        elif selecao is None or titulo in selecao: plano["pendentes"].append(titulo)
+    return plano
+
+
+def textos_para_prompt(plano, texto_ref, texto_cand):
+    """
+    Só os trechos das seções pendentes, quando a segmentação local achou todas elas
+    nos dois arquivos. Caso contrário, devolve os textos completos (comportamento antigo).
+    """
+    pendentes = plano["pendentes"]
+    if (plano["reaproveitadas"] or plano.get("selecao")) and all(t in plano["segmentos_ref"] and t in plano["segmentos_cand"] for t in pendentes):
+        return ("\n\n".join(plano["segmentos_ref"][t] for t in pendentes),
+                "\n\n".join(plano["segmentos_cand"][t] for t in pendentes))
+    return texto_ref, texto_cand
+
+
+def registrar_secao(plano, titulo, resultado):
+    """Guarda o resultado de uma seção conferida pelo modelo (se ela foi segmentada nos dois lados)."""
+    seg_ref = plano["segmentos_ref"].get(titulo)
+    seg_cand = plano["segmentos_cand"].get(titulo)
+    if seg_ref is None or seg_cand is None: return
+    try:
+        salvar_secao(chave_secao(plano["modo"], titulo, seg_ref, seg_cand, *plano["estilos_segmentos"].get(titulo, (None, None))), resultado)
+    except OSError:
+        pass  # Cache é só otimização: falha de disco não pode derrubar a conferência
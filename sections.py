@@ -0,0 +1,88 @@
+import hashlib
+import re
+import unicodedata
+
+# ----------------- SEGMENTAÇÃO LOCAL DE SEÇÕES -----------------
+# Segmentação "barata" feita antes do modelo: serve para calcular hashes por seção
+# e decidir o que realmente precisa ser reenviado. O modelo continua sendo quem
+# extrai o texto final de cada seção.
+
+TAG_RE = re.compile(r'<[^<>\n]{0,40}>')
+NUMERACAO_RE = re.compile(r'^\s*\d{1,2}\s*[\.\)\-–]?\s*')
+
+# Fração mínima de títulos encontrados para confiar na segmentação
+MIN_TITULOS_ENCONTRADOS = 0.5
+
+
+def normalizar_texto(texto):
+    """
+    Normalização CONSERVADORA usada nos hashes: só remove o que é invisível
+    (espaços, quebras, pontilhados, caracteres de controle, negrito fatiado).
+    Acentos, maiúsculas e pontuação continuam contando como diferença.
+    """
+    if not texto: return ""
+    txt = unicodedata.normalize('NFC', texto)
+    txt = txt.replace(u'\xa0', u' ').replace(u'\u200b', u'').replace(u'\xad', u'')
+    txt = txt.replace('</b><b>', '').replace('</b> <b>', ' ')
+    txt = re.sub(r'[\._]{3,}', ' ', txt)
+    txt = re.sub(r'\s+', ' ', txt)
+    return txt.strip()
+
+
+def hash_texto(texto):
+    return hashlib.sha256(normalizar_texto(texto).encode('utf-8')).hexdigest()
+
+
+def _chave_titulo(texto):
+    """Forma solta para comparar títulos: sem tags, numeração, acentos e pontuação."""
+    txt = NUMERACAO_RE.sub('', TAG_RE.sub('', texto))
+    txt = unicodedata.normalize('NFKD', txt)
+    txt = "".join(c for c in txt if not unicodedata.combining(c)).lower()
+    return " ".join(re.sub(r'[^\w\s]', ' ', txt).split())
+
+
+def titulo_canonico(titulo, titulos):
+    """Mapeia o título devolvido pelo modelo para o título oficial da lista (ou None)."""
+    chave = _chave_titulo(titulo or "")
+    if not chave: return None
+    for oficial in titulos:
+        oficial_chave = _chave_titulo(oficial)
+        if chave == oficial_chave or chave.startswith(oficial_chave) or oficial_chave.startswith(chave):
+            return oficial
+    return None
+
+
+def segmentar_secoes(texto, titulos):
+    """
+    Divide o texto extraído pelos títulos oficiais (linhas que COMEÇAM com o título,
+    em maiúsculas, com ou sem numeração). Cada segmento inclui a linha do título,
+    pois no PDF o título pode vir colado ao primeiro parágrafo.
+    Retorna {titulo: texto} na ordem do documento, ou {} se poucos títulos forem encontrados.
+    """
+    if not texto: return {}
+    chaves = [(t, _chave_titulo(t)) for t in titulos]
+    inicios = []  # (posição da linha do título, titulo)
+    encontrados = set()
+
+    pos = 0
+    for linha in texto.split('\n'):
+        limpa = NUMERACAO_RE.sub('', TAG_RE.sub('', linha)).strip()
+        if limpa:
+            chave_linha = _chave_titulo(limpa)
+            for titulo, chave in chaves:
+                if titulo in encontrados or not chave_linha.startswith(chave): continue
+                cabeca = " ".join(limpa.split()[:len(titulo.split())])
+                if cabeca != cabeca.upper(): continue
+                inicios.append((pos, titulo))
+                encontrados.add(titulo)
+                break
+        pos += len(linha) + 1
+
+    if len(encontrados) < max(1, len(titulos) * MIN_TITULOS_ENCONTRADOS):
+        return {}
+
+    segmentos = {}
+    for i, (inicio, titulo) in enumerate(inicios):
+        fim = inicios[i + 1][0] if i + 1 < len(inicios) else len(texto)
+        segmentos[titulo] = texto[inicio:fim].strip()
+    return segmentos
@@ -0,0 +1,47 @@
+import functools
+import os
+import re
+
+# ----------------- SEGMENTAÇÃO EM FRASES -----------------
+# Base do diff hierárquico (core.gerar_diff_html): cada parágrafo vira uma lista de
+# frases, que servem de âncora antes do diff palavra a palavra.
+#
+# Com spaCy e o modelo português instalados (pt_core_news_sm), o segmentador dele é
+# usado — carregado uma única vez por processo. Sem eles, uma regra por pontuação
+# final + maiúscula cobre o texto de bula. O resultado por parágrafo é memoizado:
+# a mesma referência é conferida contra muitos candidatos.
+
+MODELO_SPACY = os.environ.get("VALIDADOR_SPACY_MODELO", "pt_core_news_sm")
+
+# Fim de frase: . ! ? ; seguidos de espaço e de maiúscula, número, marcador ou negrito
+FIM_FRASE_RE = re.compile(r'(?<=[.!?;])\s+(?=(?:<b>)?[A-ZÀ-Ý0-9•\-–(])')
+
+
+@functools.lru_cache(maxsize=1)
+def _nlp():
+    """Pipeline do spaCy só com o que separa frases; None se spaCy ou o modelo não estiverem instalados."""
+    try:
+        import spacy
+        return spacy.load(MODELO_SPACY, exclude=["ner", "lemmatizer", "attribute_ruler", "tagger", "morphologizer"])
+    except (ImportError, OSError):
+        return None
+
+@functools.lru_cache(maxsize=65536)
+def dividir_frases(paragrafo):
+    """Frases de um parágrafo (sem quebras de linha), na ordem, sem espaços nas pontas."""
+    if not paragrafo.strip(): return ()
+    nlp = _nlp()
+    if nlp is not None:
+        return tuple(f.text.strip() for f in nlp(paragrafo).sents if f.text.strip())
+    return tuple(f for f in FIM_FRASE_RE.split(paragrafo.strip()) if f)
+
+def unidades(texto):
+    """[(frase, separador_depois)] do texto inteiro: ' ' entre frases, '\\n' (um por quebra) entre parágrafos."""
+    resultado = []
+    for i, paragrafo in enumerate(texto.split("\n")):
+        if i and resultado:
+            frase, separador = resultado[-1]
+            resultado[-1] = (frase, separador.strip(" ") + "\n")
+        resultado.extend((frase, " ") for frase in dividir_frases(paragrafo))
+    if resultado: resultado[-1] = (resultado[-1][0], resultado[-1][1].strip(" "))
+    return resultado
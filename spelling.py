@@ -0,0 +1,107 @@
+import functools
+import os
+import re
+import threading
+
+# ----------------- ORTOGRAFIA (DESTAQUE ROSA) -----------------
+# Corretor local, sem chamada ao modelo: o léxico português do pyspellchecker somado
+# a lexico_farmaceutico.txt (princípios ativos, excipientes, unidades) vira um frozenset
+# carregado uma vez por processo; a consulta de cada palavra é memoizada.
+# Cada seção é conferida em lote: palavras únicas primeiro, depois um único re.sub.
+#
+# O léxico do pyspellchecker segue a grafia de Portugal; formas do Brasil são aceitas
+# quando uma variante (ô/ê -> ó/é, consoante muda c/p) existe nele.
+#
+# Para não pintar nomes próprios, palavras Capitalizadas desconhecidas são ignoradas;
+# siglas curtas em MAIÚSCULAS também.
+
+ARQUIVO_LEXICO_FARMA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lexico_farmaceutico.txt")
+TAMANHO_MINIMO = 3
+TAMANHO_MAXIMO_SIGLA = 5
+
+CLASSE_ORTOGRAFIA = "highlight-pink"
+PALAVRA_RE = re.compile(r"[^\W\d_]+(?:[-'][^\W\d_]+)*")
+TAG_RE = re.compile(r'(<[^>]+>)')
+
+_lexico = None
+_lock = threading.Lock()
+
+
+# ----------------- LÉXICO -----------------
+
+def _ler_lexico_farma():
+    try:
+        with open(ARQUIVO_LEXICO_FARMA, "r", encoding="utf-8") as f:
+            return {linha.strip().lower() for linha in f if linha.strip() and not linha.startswith("#")}
+    except OSError:
+        return set()
+
+def carregar_lexico():
+    """frozenset com o português + termos farmacêuticos; vazio se o pyspellchecker não estiver instalado."""
+    global _lexico
+    if _lexico is not None: return _lexico
+    with _lock:
+        if _lexico is None:
+            try:
+                from spellchecker import SpellChecker
+                palavras = set(SpellChecker(language="pt").word_frequency.dictionary)
+            except ImportError:
+                palavras = set()
+            if palavras: palavras |= _ler_lexico_farma()
+            _lexico = frozenset(palavras)
+    return _lexico
+
+def pre_carregar():
+    """Carrega o léxico numa thread de fundo (~1 s) para a primeira conferência não pagar por isso."""
+    if _lexico is None:
+        threading.Thread(target=carregar_lexico, name="lexico-ortografia", daemon=True).start()
+
+
+# ----------------- CONSULTA -----------------
+
+def _variantes_br(palavra):
+    """econômico -> económico, detecção -> deteção, contato -> contacto."""
+    base = palavra.replace("ô", "ó").replace("ê", "é")
+    variantes = {base, re.sub(r'[cp](?=[çt])', '', base)}
+    for i, letra in enumerate(base):
+        if letra == "t" and i and base[i - 1] in "aeiouáéíóú":
+            variantes.update({base[:i] + "c" + base[i:], base[:i] + "p" + base[i:]})
+    variantes.discard(palavra)
+    return variantes
+
+@functools.lru_cache(maxsize=65536)
+def palavra_conhecida(palavra):
+    if len(palavra) < TAMANHO_MINIMO: return True
+    if palavra.isupper() and len(palavra) <= TAMANHO_MAXIMO_SIGLA: return True  # Sigla
+    lexico = carregar_lexico()
+    minuscula = palavra.lower()
+    if minuscula in lexico: return True
+    if any(v in lexico for v in _variantes_br(minuscula)): return True
+    if "-" in minuscula and all(p in lexico or len(p) < TAMANHO_MINIMO for p in minuscula.split("-")): return True
+    if palavra[0].isupper() and not palavra.isupper(): return True  # Provável nome próprio
+    return False
+
+def marcar_ortografia(texto_html):
+    """Envolve as palavras desconhecidas (fora das tags) em highlight-pink. Devolve (html, quantidade)."""
+    if not texto_html or not carregar_lexico(): return texto_html, 0
+    partes = TAG_RE.split(texto_html)
+    textos = partes[::2]  # Posições pares = texto; ímpares = tags
+    desconhecidas = {p for trecho in textos for p in set(PALAVRA_RE.findall(trecho)) if not palavra_conhecida(p)}
+    if not desconhecidas: return texto_html, 0
+
+    total = 0
+    def marcar(m):
+        nonlocal total
+        if m.group(0) not in desconhecidas: return m.group(0)
+        total += 1
+        return f'<span class="{CLASSE_ORTOGRAFIA}">{m.group(0)}</span>'
+    partes[::2] = [PALAVRA_RE.sub(marcar, trecho) for trecho in textos]
+    return "".join(partes), total
+
+def aplicar_ortografia(secoes, campo):
+    """Marca `campo` (lado do candidato) em cada seção do relatório e grava a contagem em secao["ortografia"]."""
+    total = 0
+    for secao in secoes:
+        secao[campo], secao["ortografia"] = marcar_ortografia(secao.get(campo, ""))
+        total += secao["ortografia"]
+    return total
@@ -0,0 +1,276 @@
+import bisect
+import difflib
+import functools
+import html
+import re
+
+# ----------------- CANAL DE ESTILO -----------------
+# A extração devolve texto PURO e, em paralelo, o estilo de cada caractere codificado
+# por corridas (RLE): [[comprimento, atributos], ...], com atributos em letras ("b" =
+# negrito, "bi" = negrito + itálico, "" = normal). Assim "<b>Atenção:</b>" e "Atenção:"
+# são o mesmo token para o prompt e para o diff de palavras; o estilo é conferido à
+# parte, palavra a palavra, só onde o texto bateu, e reaplicado no HTML no fim.
+
+ATRIBUTOS = {"b": "negrito", "i": "itálico", "s": "sobrescrito", "u": "sublinhado"}
+TAGS = {"b": "b", "i": "i", "s": "sup", "u": "u"}
+CLASSE_ESTILO = "highlight-style"
+
+# Removidos pela limpeza do texto (core.limpar_ruido_visual); o resto muda 1 por 1 ou some como espaço
+DESCARTAVEIS = "\xad\u200b._"
+
+TAG_OU_TEXTO_RE = re.compile(r'(<[^>]*>)|([^<]+)')
+PALAVRA_RE = re.compile(r'\S+')
+MARCACAO_RE = re.compile(r'</?(?:b|i|u|sup)>', re.IGNORECASE)
+
+
+# ----------------- CONSTRUÇÃO -----------------
+
+def acrescentar(partes, estilos, texto, atributos=""):
+    """Acrescenta `texto` ao texto em construção (lista `partes`) e ao RLE `estilos`."""
+    if not texto: return
+    partes.append(texto)
+    atributos = "".join(sorted(set(atributos)))
+    if estilos and estilos[-1][1] == atributos:
+        estilos[-1][0] += len(texto)
+    else:
+        estilos.append([len(texto), atributos])
+
+def anexar(partes, estilos, texto, estilos_texto):
+    """Acrescenta um trecho que já tem o próprio RLE."""
+    posicao = 0
+    for comprimento, atributos in estilos_texto:
+        acrescentar(partes, estilos, texto[posicao:posicao + comprimento], atributos)
+        posicao += comprimento
+
+def recortar(estilos, inicio, fim):
+    """RLE do intervalo [inicio, fim) do texto."""
+    resultado, posicao = [], 0
+    for comprimento, atributos in estilos:
+        proxima = posicao + comprimento
+        if proxima > inicio:
+            tamanho = min(fim, proxima) - max(inicio, posicao)
+            if resultado and resultado[-1][1] == atributos: resultado[-1][0] += tamanho
+            elif tamanho > 0: resultado.append([tamanho, atributos])
+            if proxima >= fim: break
+        posicao = proxima
+    return resultado
+
+def sem_marcacao(texto):
+    """Remove tags de estilo que o modelo ainda devolva (o estilo vem da extração, não dele)."""
+    return MARCACAO_RE.sub("", texto or "")
+
+def por_caractere(estilos):
+    """Atributos de cada caractere (lista do tamanho do texto)."""
+    resultado = []
+    for comprimento, atributos in estilos:
+        resultado.extend([atributos] * comprimento)
+    return resultado
+
+def comprimir(atributos_por_caractere):
+    estilos = []
+    for atributos in atributos_por_caractere:
+        if estilos and estilos[-1][1] == atributos: estilos[-1][0] += 1
+        else: estilos.append([1, atributos])
+    return estilos
+
+
+# ----------------- LOCALIZAÇÃO -----------------
+
+def _compacto(texto):
+    """Texto sem espaços e, para cada caractere dele, a posição no original."""
+    posicoes = [i for i, c in enumerate(texto) if not c.isspace()]
+    return "".join(texto[i] for i in posicoes), posicoes
+
+# localizar procura cada seção no documento inteiro: o compacto dele é guardado, mas só o
+# dos últimos poucos documentos (uma lista de posições por caractere: ~7 MB por bula de
+# 200 mil caracteres, fora da conta do governador de memória)
+_compacto_documento = functools.lru_cache(maxsize=8)(_compacto)
+
+def transferir(origem, estilos, destino):
+    """
+    Estilos de `origem` levados para `destino`, o mesmo texto com outra limpeza
+    (espaços colapsados, caracteres invisíveis removidos, trocas 1 por 1).
+    """
+    atributos, resultado, p = por_caractere(estilos), [], 0
+    for c in destino:
+        if c.isspace():
+            resultado.append(resultado[-1] if resultado else "")
+            continue
+        while p < len(origem) and (origem[p].isspace() or (origem[p] != c and origem[p] in DESCARTAVEIS)):
+            p += 1
+        resultado.append(atributos[p] if p < len(atributos) else "")
+        p += 1
+    return comprimir(resultado)
+
+def localizar(texto, estilos, trecho):
+    """
+    Estilos de `trecho` (seção segmentada localmente ou devolvida pelo modelo) achando-o
+    dentro do documento `texto`, sem contar espaços. None se não houver estilo ou o
+    trecho não estiver lá literalmente (o modelo mexeu no texto).
+    """
+    if estilos is None or not trecho: return None
+    inicio = texto.find(trecho)
+    if inicio >= 0:
+        return recortar(estilos, inicio, inicio + len(trecho))
+    compacto, posicoes = _compacto_documento(texto)
+    alvo = "".join(trecho.split())
+    achado = compacto.find(alvo) if alvo else -1
+    if achado < 0: return None
+    ini, fim = posicoes[achado], posicoes[achado + len(alvo) - 1] + 1
+    return transferir(texto[ini:fim], recortar(estilos, ini, fim), trecho)
+
+
+# ----------------- COMPARAÇÃO -----------------
+
+def _palavras(texto, estilos):
+    """[(palavra, atributos)]: vale o atributo da maioria das letras/números da palavra."""
+    resultado, r, inicio_corrida = [], 0, 0
+    for m in PALAVRA_RE.finditer(texto):
+        inicio, fim = m.start(), m.end()
+        while r < len(estilos) and inicio_corrida + estilos[r][0] <= inicio:
+            inicio_corrida += estilos[r][0]
+            r += 1
+        if r < len(estilos) and inicio_corrida + estilos[r][0] >= fim:  # Palavra inteira numa corrida
+            resultado.append((m.group(), estilos[r][1] if any(map(str.isalnum, m.group())) else None))
+            continue
+        contagem, k, posicao = {}, r, inicio_corrida
+        while k < len(estilos) and posicao < fim:  # Corridas que cobrem a palavra (quase sempre uma)
+            trecho = texto[max(inicio, posicao):min(fim, posicao + estilos[k][0])]
+            letras = sum(1 for c in trecho if c.isalnum())
+            if letras: contagem[estilos[k][1]] = contagem.get(estilos[k][1], 0) + letras
+            posicao += estilos[k][0]
+            k += 1
+        # Só pontuação: estilo não conta
+        resultado.append((m.group(), max(contagem, key=contagem.get) if contagem else None))
+    return resultado
+
+def comparar(texto_ref, estilos_ref, texto_cand, estilos_cand):
+    """
+    {índice da palavra no candidato: (atributos na referência, no candidato)} para as
+    palavras de mesmo texto e estilo diferente. Textos iguais (caso comum) comparam
+    posição a posição, sem alinhamento; texto e estilo idênticos nem isso.
+    """
+    if estilos_ref is None or estilos_cand is None: return {}
+    if texto_ref == texto_cand and estilos_ref == estilos_cand: return {}
+    ref, cand = _palavras(texto_ref, estilos_ref), _palavras(texto_cand, estilos_cand)
+    if [p for p, _ in ref] == [p for p, _ in cand]:
+        pares = zip(range(len(cand)), ref, cand)
+    else:
+        blocos = difflib.SequenceMatcher(None, [p for p, _ in ref], [p for p, _ in cand], autojunk=False).get_matching_blocks()
+        pares = ((j + k, ref[i + k], cand[j + k]) for i, j, n in blocos for k in range(n))
+    return {j: (a_ref, a_cand) for j, (_, a_ref), (_, a_cand) in pares
+            if a_ref is not None and a_cand is not None and a_ref != a_cand}
+
+def descrever(atributos_ref, atributos_cand):
+    """Texto do title do destaque: o que a referência tem e o candidato não (e vice-versa)."""
+    faltam = [ATRIBUTOS[a] for a in atributos_ref if a not in atributos_cand]
+    sobram = [ATRIBUTOS[a] for a in atributos_cand if a not in atributos_ref]
+    partes = ([f"sem {', '.join(faltam)} (na referência tem)"] if faltam else []) \
+        + ([f"com {', '.join(sobram)} (na referência não tem)"] if sobram else [])
+    return "Estilo diferente da referência: " + "; ".join(partes)
+
+
+# ----------------- HTML -----------------
+
+def _abrir(atributos, titulo):
+    tags = "".join(f"<{TAGS[a]}>" for a in atributos)
+    return f'<span class="{CLASSE_ESTILO}" title="{html.escape(titulo, quote=True)}">{tags}' if titulo else tags
+
+def _fechar(atributos, titulo):
+    tags = "".join(f"</{TAGS[a]}>" for a in reversed(atributos))
+    return tags + "</span>" if titulo else tags
+
+def _estados(origem, estilos, diferencas):
+    """
+    (fronteiras, estados): a partir de fronteiras[n] da origem vale estados[n] =
+    (atributos, title do destaque ou None). Só muda nas bordas das corridas do RLE
+    e das palavras marcadas, então o HTML é cortado nesses pontos e não caractere a caractere.
+    """
+    inicios, posicao = [], 0
+    for comprimento, atributos in estilos:
+        inicios.append((posicao, atributos))
+        posicao += comprimento
+    marcadas = [(m.start(), m.end(), descrever(*diferencas[w]))
+                for w, m in enumerate(PALAVRA_RE.finditer(origem)) if w in diferencas]
+    pontos = sorted({p for p, _ in inicios} | {p for ini, fim, _ in marcadas for p in (ini, fim)})
+    fronteiras, estados, r, m = [], [], 0, 0
+    for ponto in pontos:
+        while r + 1 < len(inicios) and inicios[r + 1][0] <= ponto: r += 1
+        while m < len(marcadas) and marcadas[m][1] <= ponto: m += 1
+        titulo = marcadas[m][2] if m < len(marcadas) and marcadas[m][0] <= ponto else None
+        estado = (inicios[r][1] if inicios and ponto < posicao else "", titulo)
+        if not estados or estados[-1] != estado:
+            fronteiras.append(ponto)
+            estados.append(estado)
+    return fronteiras, estados
+
+def aplicar(texto_html, origem, estilos, diferencas=None):
+    """
+    Reaplica o estilo de `origem` no HTML gerado a partir dela (diff, datas em azul):
+    os caracteres visíveis do HTML são casados com os da origem na ordem. As tags de
+    estilo fecham antes de qualquer outra tag e de cada quebra de linha, para o HTML
+    continuar balanceado linha a linha (report.dividir_linhas). `diferencas` (de comparar)
+    envolve as palavras com estilo diferente da referência em CLASSE_ESTILO.
+    """
+    if estilos is None or not texto_html: return texto_html
+    diferencas = diferencas or {}
+    if not diferencas and not any(atributos for _, atributos in estilos): return texto_html
+    fronteiras, estados = _estados(origem, estilos, diferencas)
+    compacto, posicoes = _compacto(origem)
+    neutro = ("", None)
+    saida, aberto, k = [], neutro, 0  # k: próximo caractere visível da origem
+
+    def fechar():
+        nonlocal aberto
+        if aberto != neutro: saida.append(_fechar(*aberto))
+        aberto = neutro
+
+    def casar(visiveis):
+        """Posições na origem dos caracteres visíveis de um trecho do HTML."""
+        nonlocal k
+        if compacto.startswith(visiveis, k):
+            k += len(visiveis)
+            return posicoes[k - len(visiveis):k]
+        # Limpeza mexeu no texto (pontilhado, hífen invisível): casa caractere a caractere
+        resultado, p = [], posicoes[k] if k < len(posicoes) else len(origem)
+        for c in visiveis:
+            while p < len(origem) and (origem[p].isspace() or (origem[p] != c and origem[p] in DESCARTAVEIS)):
+                p += 1
+            resultado.append(p)
+            p += 1
+        k = bisect.bisect_left(posicoes, p)
+        return resultado
+
+    for tag, trecho in TAG_OU_TEXTO_RE.findall(texto_html):
+        if tag:
+            fechar()
+            saida.append(tag)
+            continue
+        for n, linha in enumerate(trecho.split("\n")):
+            if n: fechar(); saida.append("\n")
+            visiveis, indices = _compacto(linha)
+            if not indices:
+                saida.append(linha)
+                continue
+            na_origem = casar(visiveis)
+            # Cortes da linha: primeiro caractere visível e cada fronteira de estado no meio dela
+            cortes = [(0, bisect.bisect_right(fronteiras, na_origem[0]) - 1)]
+            for f in range(cortes[0][1] + 1, bisect.bisect_right(fronteiras, na_origem[-1])):
+                visivel = bisect.bisect_left(na_origem, fronteiras[f])
+                if visivel == cortes[-1][0]: cortes[-1] = (visivel, f)  # Fronteiras no mesmo espaço: vale a última
+                else: cortes.append((visivel, f))
+            espaco = linha[:indices[0]]  # Espaço entre cortes fica fora da tag que fecha
+            for c, (visivel, f) in enumerate(cortes):
+                estado = estados[f] if f >= 0 else neutro
+                if estado != aberto: fechar()
+                saida.append(espaco)
+                if estado != aberto:
+                    if estado != neutro: saida.append(_abrir(*estado))
+                    aberto = estado
+                fim = indices[cortes[c + 1][0] - 1] + 1 if c + 1 < len(cortes) else indices[-1] + 1
+                saida.append(linha[indices[visivel]:fim])
+                espaco = linha[fim:indices[cortes[c + 1][0]]] if c + 1 < len(cortes) else ""
+            fechar()
+            saida.append(linha[indices[-1] + 1:])
+    fechar()
+    return "".join(saida)
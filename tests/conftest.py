@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+# Os módulos do validador ficam na raiz do repositório (sem pacote)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def ambiente(tmp_path, monkeypatch):
+    """Modelo falso e histórico, caches e biblioteca em pastas temporárias."""
+    import history
+    import library
+    import page_cache
+    import section_cache
+    import tracing
+    monkeypatch.setenv("VALIDADOR_MODELO", "fake")
+    monkeypatch.setenv("VALIDADOR_FAKE_LATENCIA_S", "0")
+    monkeypatch.setattr(history, "ARQUIVO_HISTORICO", str(tmp_path / "historico.sqlite3"))
+    monkeypatch.setattr(section_cache, "PASTA_CACHE_SECOES", str(tmp_path / "cache_secoes"))
+    monkeypatch.setattr(page_cache, "PASTA_CACHE_PAGINAS", str(tmp_path / "cache_paginas"))
+    monkeypatch.setattr(library, "PASTA_BIBLIOTECA", str(tmp_path / "biblioteca"))
+    monkeypatch.setattr(tracing, "ARQUIVO_JSONL", "")
+    history.carregar_conferencia.cache_clear()
+    return tmp_path
@@ -0,0 +1,49 @@
+import pytest
+
+from alignment import RUIDO, TROCA, alinhar_tolerante, classificar
+
+# Palavras parecidas que mudam o sentido da bula: nunca podem passar como ruído de OCR
+TROCAS_DE_SENTIDO = [
+    ("hipertensão", "hipotensão"),
+    ("hiperglicemia", "hipoglicemia"),
+    ("adulto", "adultos"),
+    ("deve", "devem"),
+    ("diária", "diárias"),
+    ("revestido", "revestida"),
+]
+
+# Diferenças que o OCR explica
+RUIDOS_DE_OCR = [
+    ("medicamento", "rnedicamento"),  # rn -> m
+    ("incluem", "inc1uem"),           # 1 -> l
+    ("não", "nao"),                   # acento perdido
+    ("uso,", "uso."),                 # pontuação na ponta
+    ("mcg", "rncg"),
+]
+
+
+@pytest.mark.parametrize("ref, cand", TROCAS_DE_SENTIDO)
+def test_palavra_parecida_e_troca(ref, cand):
+    assert classificar(ref, cand) == TROCA
+
+
+@pytest.mark.parametrize("ref, cand", TROCAS_DE_SENTIDO)
+def test_palavra_parecida_torna_secao_divergente(ref, cand):
+    html, divergente, ruidos = alinhar_tolerante(f"em caso de {ref} procure o médico", f"em caso de {cand} procure o médico")
+    assert divergente
+    assert 'class="highlight-yellow"' in html
+
+
+@pytest.mark.parametrize("ref, cand", RUIDOS_DE_OCR)
+def test_confusao_de_ocr_e_ruido(ref, cand):
+    assert classificar(ref, cand) == RUIDO
+
+
+def test_palavra_partida_e_ruido():
+    _, divergente, ruidos = alinhar_tolerante("o medicamento deve ser usado", "o medica mento deve ser usado")
+    assert not divergente
+    assert ruidos
+
+
+def test_sem_tolerancia_so_identico_e_igual():
+    assert classificar("não", "nao", tolerante=False) == TROCA
@@ -0,0 +1,36 @@
+import json
+
+import batch
+from bench.corpus import gerar_arquivos
+
+
+def _manifesto(pasta, linhas):
+    ref, cand = gerar_arquivos(divergencias=1)["docx"]
+    (pasta / "ref.docx").write_bytes(ref)
+    (pasta / "cand.docx").write_bytes(cand)
+    manifesto = pasta / "pares.csv"
+    manifesto.write_text("id,referencia,candidato\n" + "".join(f"{l}\n" for l in linhas), encoding="utf-8")
+    return manifesto
+
+
+def test_arquivo_faltando_e_erro_do_par_e_o_lote_segue(ambiente, monkeypatch, capsys):
+    monkeypatch.setenv("GEMINI_API_KEY", "k1")
+    manifesto = _manifesto(ambiente, ["bom,ref.docx,cand.docx", "ruim,ref.docx,nao_existe.docx"])
+    saida = ambiente / "saida"
+    assert batch.main(["--manifesto", str(manifesto), "--saida", str(saida)]) == 1
+    assert "ruim: arquivo não encontrado" in capsys.readouterr().err  # Avisado antes de começar
+    resumo = {p["id"]: p for p in json.loads((saida / "resumo.json").read_text(encoding="utf-8"))["pares"]}
+    assert resumo["bom"]["estado"] == "concluido"
+    assert resumo["ruim"]["estado"] == "erro" and "nao_existe.docx" in resumo["ruim"]["erro"]
+
+
+def test_par_do_historico_nao_gasta_cota(ambiente, monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "k1")
+    manifesto = _manifesto(ambiente, ["a,ref.docx,cand.docx"])
+    assert batch.main(["--manifesto", str(manifesto), "--saida", str(ambiente / "primeira")]) == 0
+    # Mesmo par em outros ids: sai do histórico, então a cota de 1 par não acaba
+    manifesto.write_text("id,referencia,candidato\nb,ref.docx,cand.docx\nc,ref.docx,cand.docx\n", encoding="utf-8")
+    assert batch.main(["--manifesto", str(manifesto), "--saida", str(ambiente / "segunda"), "--cota", "1",
+                       "--workers", "1"]) == 0
+    resumo = json.loads((ambiente / "segunda" / "resumo.json").read_text(encoding="utf-8"))
+    assert resumo["totais"] == {"concluido": 2}
@@ -0,0 +1,50 @@
+import io
+
+import fitz
+import pytest
+
+from core import extract_text_from_file, process_file_content
+
+CORPO = "Tome o medicamento com água, de preferência no mesmo horário todos os dias."
+
+
+def _pdf(paginas):
+    """paginas = [[(y, texto)]] numa folha A4; devolve o upload como o Streamlit entrega."""
+    doc = fitz.open()
+    for linhas in paginas:
+        page = doc.new_page(width=595, height=842)
+        page.insert_text((50, 300), CORPO, fontsize=10)
+        for y, texto in linhas:
+            page.insert_text((50, y), texto, fontsize=10)
+    arquivo = io.BytesIO(doc.tobytes())
+    arquivo.name = "bula.pdf"
+    return arquivo
+
+
+def _textos(paginas):
+    return [extract_text_from_file(_pdf(paginas))[0], process_file_content(_pdf(paginas))[0]]
+
+
+@pytest.mark.parametrize("texto", ["Peso 20 kg - comprimidos por dia:", "2", "3"])
+def test_pdf_de_uma_pagina_nao_perde_nada_na_margem(texto):
+    # Sem outra página para comparar, número no pé pode ser célula de tabela
+    for lido in _textos([[(760, "Peso 20 kg - comprimidos por dia:"), (775, "2"), (828, "3")]]):
+        assert texto in lido
+
+
+def test_celula_de_tabela_perto_da_margem_de_baixo_fica():
+    paginas = [
+        [(760, "Peso 20 kg - comprimidos por dia:"), (775, "2")],
+        [(760, "Peso 30 kg - comprimidos por dia:"), (775, "3")],
+    ]
+    for lido in _textos(paginas):
+        assert "Peso 20 kg" in lido and "Peso 30 kg" in lido
+        assert "2" in lido.replace("20", "") and "3" in lido.replace("30", "")
+
+
+def test_rodape_repetido_sai():
+    paginas = [[(20, "Bula do paciente"), (820, f"Pág. {n} de 3"), (832, str(n))] for n in (1, 2, 3)]
+    for lido in _textos(paginas):
+        assert "Bula do paciente" not in lido and "Pág." not in lido
+        assert not any(c.isdigit() for c in lido)
+        assert lido.count("Tome o medicamento") == 3
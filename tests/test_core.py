@@ -0,0 +1,14 @@
+from bench.corpus import gerar_arquivos
+from core import SECOES_PACIENTE, conferir_textos
+
+
+def test_selecao_nao_reabre_o_relatorio_completo_do_historico(ambiente):
+    ref, cand = gerar_arquivos(divergencias=1)["docx"]
+    completo = conferir_textos("mkt", "ref.docx", ref, "cand.docx", cand, ["k1"])
+    assert "selecao" not in completo
+    assert conferir_textos("mkt", "ref.docx", ref, "cand.docx", cand, ["k1"])["historico"]
+
+    escolhidas = SECOES_PACIENTE[:2]
+    parcial = conferir_textos("mkt", "ref.docx", ref, "cand.docx", cand, ["k1"], secoes_escolhidas=escolhidas)
+    assert not parcial.get("historico")
+    assert parcial["selecao"]["secoes"] == escolhidas
@@ -0,0 +1,26 @@
+from bench.corpus import gerar_arquivos
+from core import conferir_textos
+from history import buscar_par, hash_arquivo, remover_conferencia
+from jobs import aguardar_job, chave_job, submeter_job
+
+
+def test_par_removido_do_historico_e_conferido_de_novo(ambiente):
+    ref, cand = gerar_arquivos(divergencias=1)["docx"]
+    execucoes = []
+
+    def conferir(*args):
+        execucoes.append(args)
+        return conferir_textos(*args)
+
+    args = ("mkt", "ref.docx", ref, "cand.docx", cand, ["k1"])
+    chave = chave_job("teste_historico", *args[:5])
+    primeiro = aguardar_job(submeter_job(conferir, *args, chave=chave), timeout=60)
+    assert primeiro["estado"] == "concluido" and len(execucoes) == 1
+    assert submeter_job(conferir, *args, chave=chave) == primeiro["id"]  # Mesmo envio: reaberto
+
+    registro = buscar_par("mkt", hash_arquivo(ref), hash_arquivo(cand))
+    remover_conferencia(registro["id"])  # Botão da página Histórico
+
+    segundo = aguardar_job(submeter_job(conferir, *args, chave=chave), timeout=60)
+    assert segundo["id"] != primeiro["id"] and len(execucoes) == 2
+    assert not segundo["resultado"].get("historico")
@@ -0,0 +1,47 @@
+import json
+import os
+
+import pytest
+
+import library
+from bench.corpus import gerar_arquivos
+
+
+def _ingerir():
+    ref, _ = gerar_arquivos()["docx"]
+    library.carregar_referencia.cache_clear()
+    return library.ingerir_referencia("Bula_DIPIRONA_ref.docx", ref)
+
+
+def _rebaixar(registro, com_original=True):
+    """Deixa a referência como se tivesse sido gravada por uma extração antiga (sem o campo versao)."""
+    caminho = os.path.join(library.PASTA_BIBLIOTECA, f"{registro['id']}.json")
+    with open(caminho, encoding="utf-8") as f: referencia = json.load(f)
+    referencia.pop("versao")
+    referencia["texto"] = "<b>texto antigo</b> " + referencia["texto"]
+    library._gravar_json(f"{registro['id']}.json", referencia)
+    indice = library._ler_indice()
+    indice[registro["id"]].pop("versao")
+    if not com_original:
+        os.remove(os.path.join(library.PASTA_BIBLIOTECA, indice[registro["id"]].pop("original")))
+    library._gravar_json(library.ARQUIVO_INDICE, indice)
+    library.carregar_referencia.cache_clear()
+
+
+def test_referencia_antiga_e_extraida_de_novo_do_original(ambiente):
+    registro = _ingerir()
+    atual = library.carregar_referencia(registro["id"])
+    _rebaixar(registro)
+    atualizada = library.carregar_referencia(registro["id"])
+    assert atualizada["versao"] == library.VERSAO and atualizada["texto"] == atual["texto"]
+    assert library._ler_indice()[registro["id"]]["versao"] == library.VERSAO
+
+
+def test_referencia_antiga_sem_original_e_recusada(ambiente):
+    registro = _ingerir()
+    _rebaixar(registro, com_original=False)
+    with pytest.raises(library.ReferenciaDesatualizada):
+        library.carregar_referencia(registro["id"])
+    assert "extração antiga" in library.descrever_referencia(library._ler_indice()[registro["id"]])
+    assert library.ingerir_referencia("Bula_DIPIRONA_ref.docx", gerar_arquivos()["docx"][0])["versao"] == library.VERSAO
+    assert library.carregar_referencia(registro["id"])["versao"] == library.VERSAO  # Mesmo conteúdo: mesmo id
@@ -0,0 +1,8 @@
+import section_cache
+from section_cache import chave_secao
+
+
+def test_versao_entra_na_chave(monkeypatch):
+    antes = chave_secao("mkt", "COMO DEVO USAR", "Tome 1 comprimido.", "Tome 2 comprimidos.")
+    monkeypatch.setattr(section_cache, "VERSAO", section_cache.VERSAO + 1)
+    assert chave_secao("mkt", "COMO DEVO USAR", "Tome 1 comprimido.", "Tome 2 comprimidos.") != antes
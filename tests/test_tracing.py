@@ -0,0 +1,31 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import tracing
+from tracing import anotar, etapa, exportar, iniciar_rastro, rastro_atual
+
+
+def test_rastro_nao_vaza_para_o_proximo_job_da_thread():
+    def job(modo):
+        anterior = rastro_atual()
+        with iniciar_rastro(modo) as rastro:
+            with etapa("extracao"): anotar(modo=modo)
+        return anterior, rastro, rastro_atual()
+
+    with ThreadPoolExecutor(max_workers=1) as pool:  # Mesma thread para os dois jobs
+        primeiro = pool.submit(job, "mkt").result()
+        segundo = pool.submit(job, "grafica").result()
+    assert primeiro[0] is None and primeiro[2] is None
+    assert segundo[0] is None and segundo[2] is None
+    assert [e["etapa"] for e in primeiro[1].etapas] == ["extracao"]
+    assert segundo[1].dados == {"modo": "grafica"}
+
+
+def test_prometheus_grava_um_arquivo_por_processo(tmp_path, monkeypatch):
+    monkeypatch.setattr(tracing, "ARQUIVO_JSONL", "")
+    monkeypatch.setattr(tracing, "ARQUIVO_PROMETHEUS", str(tmp_path / "validador.prom"))
+    monkeypatch.setattr(tracing, "_acumulado", {})
+    exportar({"modo": "mkt", "etapas": [{"etapa": "modelo", "duracao_ms": 1500}]})
+    conteudo = (tmp_path / f"validador.{os.getpid()}.prom").read_text()
+    assert f'validador_etapa_execucoes_total{{modo="mkt",etapa="modelo",pid="{os.getpid()}"}} 1' in conteudo
+    assert not (tmp_path / "validador.prom").exists()
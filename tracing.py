@@ -0,0 +1,142 @@
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from memory import amostrar
+
+# ----------------- INSTRUMENTAÇÃO POR ETAPA -----------------
+# Cada conferência roda dentro de um "rastro" (`with iniciar_rastro(modo)`) e cada etapa do pipeline é medida
+# com `with etapa("modelo", ...)`. O rastro corrente vive num ContextVar, então funções
+# internas (ex.: chamar_modelo) registram dados sem receber parâmetros extras; fora de
+# um rastro, `etapa` não faz nada.
+#
+# Exportação: uma linha JSON por execução em VALIDADOR_METRICAS_JSONL (padrão
+# metricas.jsonl; vazio desliga) e, se VALIDADOR_METRICAS_PROM estiver definido,
+# um arquivo no formato texto do Prometheus (para o node_exporter/textfile collector).
+# Os contadores são do processo: cada um grava o seu arquivo, com o pid no nome e num
+# rótulo (VALIDADOR_METRICAS_PROM=/textfile/validador.prom -> validador.<pid>.prom);
+# o total sai de `sum without (pid) (...)` na consulta.
+
+ARQUIVO_JSONL = os.environ.get("VALIDADOR_METRICAS_JSONL", "metricas.jsonl")
+ARQUIVO_PROMETHEUS = os.environ.get("VALIDADOR_METRICAS_PROM", "")
+
+_rastro_atual = contextvars.ContextVar("rastro_atual", default=None)
+_lock_exportacao = threading.Lock()
+_acumulado = {}  # (modo, etapa) -> [execuções, segundos] para o Prometheus
+
+
+class Rastro:
+    def __init__(self, modo):
+        self.id = uuid.uuid4().hex[:12]
+        self.modo = modo
+        self.inicio = time.time()
+        self.etapas = []
+        self.dados = {}  # dados da execução inteira (chave usada, tentativas, tokens...)
+
+    def resumo(self):
+        """Dicionário serializável: vai junto do resultado da conferência."""
+        return {
+            "id": self.id,
+            "modo": self.modo,
+            "inicio": self.inicio,
+            "total_ms": round(sum(e["duracao_ms"] for e in self.etapas), 1),
+            "memoria_pico_mb": max((e["memoria_mb"] for e in self.etapas if e.get("memoria_mb")), default=None),
+            "etapas": list(self.etapas),
+            "dados": dict(self.dados),
+        }
+
+
+@contextmanager
+def iniciar_rastro(modo):
+    """Rastro corrente durante o bloco; na saída volta o anterior (threads do pool são reaproveitadas)."""
+    rastro = Rastro(modo)
+    token = _rastro_atual.set(rastro)
+    try:
+        yield rastro
+    finally:
+        _rastro_atual.reset(token)
+
+
+def rastro_atual():
+    return _rastro_atual.get()
+
+
+def anotar(**dados):
+    """Anota dados no rastro corrente (no-op fora de um rastro)."""
+    rastro = _rastro_atual.get()
+    if rastro is not None: rastro.dados.update(dados)
+
+
+def anotar_item(chave, item):
+    """Acrescenta `item` à lista `chave` do rastro corrente (ex.: um registro por documento rasterizado)."""
+    rastro = _rastro_atual.get()
+    if rastro is not None: rastro.dados.setdefault(chave, []).append(item)
+
+
+@contextmanager
+def etapa(nome, **extras):
+    """
+    Mede a duração do bloco e a memória residente no fim dele (memory.amostrar, que também
+    atualiza o pico da sessão); o dicionário devolvido aceita extras (tamanhos, tokens...).
+    """
+    registro = {"etapa": nome, **extras}
+    inicio = time.perf_counter()
+    try:
+        yield registro
+    finally:
+        registro["duracao_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+        rastro = _rastro_atual.get()
+        if rastro is not None:
+            registro["memoria_mb"] = amostrar()
+            rastro.etapas.append(registro)
+
+
+def estimar_tokens(texto):
+    """~4 caracteres por token em português; usado quando a API não informa o uso."""
+    return len(texto) // 4 if texto else 0
+
+
+def exportar(resumo, **extras):
+    """Grava o resumo de um rastro nos exportadores configurados. Falhas de disco são ignoradas."""
+    registro = dict(resumo, **extras)
+    with _lock_exportacao:
+        try:
+            if ARQUIVO_JSONL:
+                with open(ARQUIVO_JSONL, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+            if ARQUIVO_PROMETHEUS:
+                for e in registro.get("etapas", []):
+                    chave = (registro.get("modo", ""), e["etapa"])
+                    execucoes, segundos = _acumulado.get(chave, (0, 0.0))
+                    _acumulado[chave] = (execucoes + 1, segundos + e["duracao_ms"] / 1000)
+                _escrever_prometheus()
+        except OSError:
+            pass
+
+
+def _arquivo_prometheus():
+    """Arquivo deste processo: o pid entra antes da extensão."""
+    raiz, extensao = os.path.splitext(ARQUIVO_PROMETHEUS)
+    return f"{raiz}.{os.getpid()}{extensao}"
+
+
+def _escrever_prometheus():
+    pid = os.getpid()
+    linhas = [
+        "# HELP validador_etapa_segundos_total Tempo acumulado por etapa da conferência.",
+        "# TYPE validador_etapa_segundos_total counter",
+    ]
+    linhas += [f'validador_etapa_segundos_total{{modo="{m}",etapa="{e}",pid="{pid}"}} {s:.3f}' for (m, e), (_, s) in sorted(_acumulado.items())]
+    linhas += [
+        "# HELP validador_etapa_execucoes_total Quantidade de execuções por etapa.",
+        "# TYPE validador_etapa_execucoes_total counter",
+    ]
+    linhas += [f'validador_etapa_execucoes_total{{modo="{m}",etapa="{e}",pid="{pid}"}} {n}' for (m, e), (n, _) in sorted(_acumulado.items())]
+    arquivo = _arquivo_prometheus()
+    temporario = f"{arquivo}.tmp"
+    with open(temporario, "w", encoding="utf-8") as f: f.write("\n".join(linhas) + "\n")
+    os.replace(temporario, arquivo)
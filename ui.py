@@ -0,0 +1,354 @@
+import functools
+import time
+
+import streamlit as st
+
+from anvisa import NAO_ENCONTRADA
+from core import interpretar_paginas
+from jobs import ESTADO_CANCELADO, ESTADO_ERRO, ESTADOS_ATIVOS, cancelar_job, obter_job
+from library import ReferenciaDesatualizada, carregar_referencia, descrever_referencia, ingerir_referencia, listar_referencias
+from memory import guardar_upload
+from report import CSS_RELATORIO, exportar_html, exportar_json, linhas_ref_de, montar_relatorio
+from spelling import pre_carregar
+from utils import mostrar_tempos_sidebar
+
+pre_carregar()  # Léxico de ortografia em segundo plano, antes do primeiro clique
+
+# ----------------- PEÇAS COMUNS DAS PÁGINAS -----------------
+# CSS, chaves, renderização do relatório de texto e acompanhamento do job,
+# que antes eram copiados em cada arquivo de pages/.
+
+CSS_CONFERENCIA = f"""
+<style>
+    [data-testid="stHeader"] {{ visibility: hidden; }}
+{CSS_RELATORIO}
+    div[data-testid="stMetric"] {{
+        background-color: #f8f9fa; border: 1px solid #dee2e6; padding: 10px; border-radius: 5px; text-align: center;
+    }}
+</style>
+"""
+
+def aplicar_css(css=CSS_CONFERENCIA):
+    st.markdown(css, unsafe_allow_html=True)
+
+def keys_dos_secrets():
+    """Chaves configuradas nos secrets, na ordem de failover."""
+    keys_disponiveis = [st.secrets.get("GEMINI_API_KEY"), st.secrets.get("GEMINI_API_KEY2"), st.secrets.get("GEMINI_API_KEY3")]
+    return [k for k in keys_disponiveis if k]
+
+
+# ----------------- REFERÊNCIA: UPLOAD OU BIBLIOTECA (PÁGINAS 1 E 2) -----------------
+
+def entrada_referencia(coluna, rotulo_upload):
+    """Widgets da referência. Devolve a escolha (ou None enquanto não há referência)."""
+    origem = coluna.radio("Origem da referência", ["📤 Upload", "📚 Biblioteca"], horizontal=True,
+                          label_visibility="collapsed", key="origem_ref")
+    if origem == "📚 Biblioteca":
+        registros = listar_referencias()
+        if not registros:
+            coluna.info("Biblioteca vazia: envie uma referência com \"Guardar na biblioteca\" marcado.")
+            return None
+        registro = coluna.selectbox("📚 Referência da biblioteca", registros, index=None, format_func=descrever_referencia,
+                                    placeholder="Digite o produto para buscar...", key="ref_biblioteca")
+        return {"biblioteca": registro["id"]} if registro else None
+
+    arquivo = coluna.file_uploader(rotulo_upload, type=["pdf", "docx"], key="f1")
+    guardar = coluna.checkbox("📚 Guardar na biblioteca", key="guardar_ref")
+    return {"arquivo": arquivo, "guardar": guardar} if arquivo else None
+
+def resolver_referencia(entrada):
+    """
+    No clique do botão: (nome, dados, referência preparada ou None, identidade para a chave do job).
+    Com a biblioteca, a referência chega pronta e o job só extrai o candidato.
+    """
+    if "biblioteca" in entrada:
+        try:
+            referencia = carregar_referencia(entrada["biblioteca"])
+        except ReferenciaDesatualizada as e:
+            st.error(str(e))
+            st.stop()
+        return referencia["arquivo"], None, referencia, referencia["id"]
+    arquivo = entrada["arquivo"]
+    dados = guardar_upload(arquivo)
+    if entrada["guardar"]:
+        try:
+            registro = ingerir_referencia(arquivo.name, dados)
+            st.toast(f"📚 Guardada na biblioteca: {descrever_referencia(registro)}")
+            referencia = carregar_referencia(registro["id"])
+            return arquivo.name, dados, referencia, referencia["id"]
+        except ValueError as e:
+            st.warning(f"Não foi possível guardar na biblioteca: {e}")
+    return arquivo.name, dados, None, dados
+
+
+# ----------------- CONFERIR SÓ PARTE (PÁGINAS 1, 2 E 3) -----------------
+
+def entrada_selecao(secoes, rotulos, paginas_ref=True):
+    """
+    Seções e intervalos de páginas a conferir, como kwargs de conferir_textos/conferir_grafica
+    ({} = tudo). None se algum intervalo for inválido (o erro já aparece na tela).
+    `paginas_ref=False` quando a referência vem pronta da biblioteca (sempre inteira).
+    """
+    with st.expander("🎯 Conferir só parte (seções ou páginas)"):
+        escolhidas = st.multiselect("Seções", secoes, placeholder="Todas", key="selecao_secoes")
+        c1, c2 = st.columns(2)
+        textos = (c1.text_input(f"Páginas — {rotulos[0]}", placeholder="Todas (ex.: 1-3, 5)", key="selecao_paginas_ref",
+                                disabled=not paginas_ref, help=None if paginas_ref else "A referência da biblioteca é sempre inteira."),
+                  c2.text_input(f"Páginas — {rotulos[1]}", placeholder="Todas (ex.: 1-3, 5)", key="selecao_paginas_cand"))
+        try:
+            paginas = [interpretar_paginas(texto) for texto in textos]
+        except ValueError as e:
+            st.error(str(e))
+            return None
+    if not paginas_ref: paginas[0] = None
+    selecao = {"secoes_escolhidas": escolhidas, "paginas_ref": paginas[0], "paginas_cand": paginas[1]}
+    return {chave: valor for chave, valor in selecao.items() if valor}
+
+def aviso_selecao(resultado):
+    """Conferência restrita pelo usuário: o que foi pedido e o que ficou de fora do relatório."""
+    selecao = resultado.get("selecao")
+    if not selecao: return
+    partes = []
+    if selecao["secoes"]: partes.append(f"seções {', '.join(selecao['secoes'])}")
+    if selecao["paginas_ref"]: partes.append(f"páginas {selecao['paginas_ref']} da referência")
+    if selecao["paginas_cand"]: partes.append(f"páginas {selecao['paginas_cand']} do candidato")
+    st.info(f"🎯 **Conferência parcial** — só {'; '.join(partes)}. "
+            + (f"Fora do relatório: {', '.join(selecao['fora'])}. " if selecao["fora"] else "")
+            + "Este resultado não vai para o histórico.")
+
+
+# ----------------- RESUMO DAS CONFERÊNCIAS (PÁGINAS 1, 2 E 3) -----------------
+
+def renderizar_conferencia_textos(resultado, job_id):
+    data_ref = resultado["data_ref"]
+    data_mkt = resultado["data_mkt"]
+    secoes_finais = resultado["secoes"]
+    divergentes_count = sum(1 for s in secoes_finais if s["status"] == "DIVERGENTE")
+
+    st.markdown("### 📊 Resumo da Conferência")
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Data Anvisa (Ref)", data_ref)
+    c2.metric("Data Anvisa (MKT)", data_mkt, delta="Igual" if data_ref == data_mkt else "Diferente")
+    c3.metric("Seções", len(secoes_finais))
+
+    sub1, sub2 = st.columns(2)
+    sub1.info(f"✅ **Conformes:** {len(secoes_finais) - divergentes_count}")
+    if divergentes_count > 0: sub2.warning(f"⚠️ **Divergentes:** {divergentes_count}")
+    else: sub2.success("✨ **Divergências:** 0")
+
+    aviso_parcial(resultado)
+    aviso_selecao(resultado)
+    aviso_historico(resultado)
+    if resultado["identicos"]:
+        st.caption("♻️ Documentos idênticos após normalização: conferência feita sem chamar o modelo.")
+    elif resultado["reaproveitadas"]:
+        st.caption(f"♻️ {resultado['reaproveitadas']} seção(ões) sem alteração reaproveitada(s) da última conferência.")
+
+    st.divider()
+    renderizar_secoes(relatorio_do_job(job_id, "textos", resultado), job_id, resultado)
+
+def renderizar_conferencia_grafica(resultado, job_id):
+    for aviso in resultado.get("avisos", []):
+        st.warning(aviso)
+
+    data_ref = resultado["data_ref"]
+    data_graf = resultado["data_grafica"]
+    secoes = resultado["secoes"]
+
+    st.markdown("### 📊 Resumo da Conferência")
+
+    k1, k2, k3 = st.columns(3)
+    k1.metric("Data Anvisa (Ref)", data_ref)
+
+    cor_delta = "normal" if data_ref == data_graf and data_ref != NAO_ENCONTRADA else "inverse"
+    msg_delta = "Vigência" if data_ref == data_graf else "Diferente"
+    if data_graf == NAO_ENCONTRADA: msg_delta = ""
+
+    k2.metric("Data Anvisa (Gráfica)", data_graf, delta=msg_delta, delta_color=cor_delta)
+    k3.metric("Seções Analisadas", len(secoes))
+
+    div_count = sum(1 for s in secoes if s['status'] != 'CONFORME')
+    ok_count = len(secoes) - div_count
+
+    b1, b2 = st.columns(2)
+    b1.success(f"✅ **Conformes: {ok_count}**")
+    if div_count > 0:
+        b2.warning(f"⚠️ **Divergentes: {div_count}**")
+    else:
+        b2.success("✨ **Divergentes: 0**")
+
+    aviso_parcial(resultado)
+    aviso_selecao(resultado)
+    aviso_historico(resultado)
+    if resultado.get("ruido_ocr"):
+        st.caption(f"🔡 {resultado['ruido_ocr']} diferença(s) atribuída(s) a ruído de leitura (OCR) ficaram pontilhadas "
+                   "e não contam como divergência. Passe o mouse para ver o texto da arte.")
+
+    st.divider()
+    renderizar_secoes(relatorio_do_job(job_id, "grafica", resultado), job_id, resultado)
+
+def aviso_parcial(resultado):
+    """Relatório de uma conferência interrompida (prazo ou cancelamento): só as seções que ficaram prontas."""
+    parcial = resultado.get("parcial")
+    if not parcial: return
+    faltando = ", ".join(parcial["faltando"]) or "nenhuma da lista oficial"
+    st.warning(f"⏱️ **Relatório parcial** — {parcial['mensagem']} Seções que ficaram de fora: {faltando}. "
+               "Processe de novo para completar (as seções prontas são reaproveitadas).")
+
+def aviso_historico(resultado):
+    """Resultado reaberto do histórico (mesmo par de arquivos já conferido)."""
+    if resultado.get("historico"):
+        st.caption(f"🗄️ Este par de arquivos já foi conferido em {resultado['historico']['conferido_em']}: "
+                   "resultado reaberto do histórico, sem nova chamada ao modelo. Para refazer, remova-o na página Histórico.")
+
+
+# ----------------- SEÇÕES (RELATÓRIO PRÉ-CALCULADO) -----------------
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def relatorio_do_job(job_id, tipo, _resultado):
+    """Montado uma vez por job (report.py); os reruns só fatiam o relatório em cache."""
+    return montar_relatorio(_resultado, tipo)
+
+def _caixas(secao, linhas_cand, linhas_ref, rotulos):
+    col_esq, col_dir = st.columns(2)
+    with col_esq:
+        st.caption(rotulos[0])
+        st.markdown(f'<div class="texto-box {secao["css"]}">{chr(10).join(linhas_ref)}</div>', unsafe_allow_html=True)
+    with col_dir:
+        st.caption(rotulos[1])
+        st.markdown(f'<div class="texto-box {secao["css"]}">{chr(10).join(linhas_cand)}</div>', unsafe_allow_html=True)
+
+def renderizar_secoes(relatorio, job_id, resultado):
+    """
+    Cada seção só vai para o navegador quando aberta. Com divergências, o padrão é
+    mostrar apenas os trechos divergentes (com contexto); a seção completa é paginada.
+    """
+    d1, d2, _ = st.columns([1, 1, 3])
+    d1.download_button("⬇️ Relatório (HTML)", functools.partial(exportar_html, relatorio), file_name="relatorio_conferencia.html",
+                       mime="text/html", on_click="ignore", key=f"{job_id}_html")
+    d2.download_button("⬇️ Resultado (JSON)", functools.partial(exportar_json, resultado), file_name="relatorio_conferencia.json",
+                       mime="application/json", on_click="ignore", key=f"{job_id}_json")
+
+    for n, secao in enumerate(relatorio["secoes"]):
+        rotulo = f"{secao['icone']} {secao['titulo']}"
+        if secao["divergencias"]: rotulo += f" — {secao['divergencias']} divergência(s)"
+        if secao["ortografia"]: rotulo += f" • ✏️ {secao['ortografia']} possível(is) erro(s) de português"
+        if secao["estilo"]: rotulo += f" • 🅱️ {secao['estilo']} palavra(s) com estilo diferente"
+        if not st.toggle(rotulo, value=secao["aberta"], key=f"{job_id}_secao_{n}"):
+            continue
+
+        with st.container(border=True):
+            so_trechos = bool(secao["trechos"]) and st.radio(
+                "Exibição", ["Só divergências", "Seção completa"], horizontal=True,
+                label_visibility="collapsed", key=f"{job_id}_exibicao_{n}") == "Só divergências"
+
+            if so_trechos:
+                for ini, fim in secao["trechos"]:
+                    _caixas(secao, secao["linhas_cand"][ini:fim], linhas_ref_de(secao, ini, fim), relatorio["rotulos"])
+                continue
+
+            paginas = secao["paginas"]
+            pagina = 1
+            if len(paginas) > 1:
+                pagina = st.number_input(f"Página (de {len(paginas)})", 1, len(paginas), 1, key=f"{job_id}_pagina_{n}")
+            ini, fim = paginas[pagina - 1]
+            if len(paginas) > 1:
+                _caixas(secao, secao["linhas_cand"][ini:fim], linhas_ref_de(secao, ini, fim), relatorio["rotulos"])
+            else:
+                _caixas(secao, secao["linhas_cand"], secao["linhas_ref"], relatorio["rotulos"])
+
+
+# ----------------- ACOMPANHAMENTO DO JOB -----------------
+
+def acompanhar_job(chave_sessao, mensagem_espera, renderizar, mostrar_resposta_bruta=False):
+    """
+    O resultado vive no pool de jobs: sobrevive a reruns, cliques e reconexões.
+    Enquanto o job roda, a página faz polling (sleep + rerun) com um botão que cancela o
+    job de fato; no fim chama `renderizar` (também com o resultado parcial de um cancelado).
+    """
+    job = obter_job(st.session_state[chave_sessao]) if chave_sessao in st.session_state else None
+    if job and job["estado"] in ESTADOS_ATIVOS:
+        if st.button("⛔ Cancelar conferência", key=f"cancelar_{job['id']}"):
+            cancelar_job(job["id"])
+        with st.spinner(mensagem_espera):
+            time.sleep(1)
+        st.rerun()
+    elif job and job["estado"] == ESTADO_CANCELADO and job["resultado"] is None:
+        st.warning("⛔ Conferência cancelada antes de ter alguma seção pronta.")
+    elif job and job["estado"] == ESTADO_ERRO:
+        if not mostrar_resposta_bruta:
+            st.error(job["erro"])
+            return
+        st.error(f"❌ {job['erro']}")
+        resposta_bruta = getattr(job["excecao"], "resposta_bruta", None)
+        if resposta_bruta:
+            st.text("Resposta bruta do modelo:")
+            st.code(resposta_bruta)
+    elif job:
+        inicio_render = time.perf_counter()
+        renderizar(job["resultado"], job["id"])
+        mostrar_tempos_sidebar(job["resultado"].get("tempos"), (time.perf_counter() - inicio_render) * 1000)
+
+
+# ----------------- UM CONTRA MUITOS -----------------
+
+def entrada_candidatos(coluna, rotulo, tipos, varios):
+    """Um arquivo, ou vários no modo lote; sempre devolve uma lista."""
+    if varios:
+        return coluna.file_uploader(f"{rotulo} (vários)", type=tipos, accept_multiple_files=True, key="f2_lote") or []
+    arquivo = coluna.file_uploader(rotulo, type=tipos, key="f2")
+    return [arquivo] if arquivo else []
+
+def nomes_unicos(arquivos):
+    """Nomes para as colunas da matriz (arquivos com o mesmo nome ganham sufixo)."""
+    nomes, vistos = [], {}
+    for arquivo in arquivos:
+        vistos[arquivo.name] = vistos.get(arquivo.name, 0) + 1
+        nomes.append(arquivo.name if vistos[arquivo.name] == 1 else f"{arquivo.name} ({vistos[arquivo.name]})")
+    return nomes
+
+def acompanhar_lote(chave_sessao, mensagem_espera, tipo, renderizar):
+    """
+    Lote = [(nome do candidato, job_id)], todos contra a mesma referência já preparada.
+    Os jobs rodam em paralelo no pool; no fim, matriz seção x candidato e detalhe sob demanda.
+    """
+    lote = st.session_state.get(chave_sessao)
+    if not lote: return
+    jobs = [(nome, obter_job(job_id)) for nome, job_id in lote]
+    ativos = sum(1 for _, job in jobs if job and job["estado"] in ESTADOS_ATIVOS)
+    if ativos:
+        if st.button("⛔ Cancelar os candidatos pendentes", key=f"{chave_sessao}_cancelar"):
+            for _, job in jobs:
+                if job: cancelar_job(job["id"])
+        with st.spinner(f"{mensagem_espera} ({len(jobs) - ativos}/{len(jobs)} candidatos concluídos)"):
+            time.sleep(1)
+        st.rerun()
+
+    concluidos = [(nome, job) for nome, job in jobs if job and job["resultado"] is not None]
+    for nome, job in jobs:
+        if job is None: st.warning(f"{nome}: resultado expirado, processe novamente.")
+        elif job["estado"] == ESTADO_CANCELADO and job["resultado"] is None: st.warning(f"{nome}: cancelado.")
+        elif job["estado"] == ESTADO_ERRO: st.error(f"{nome}: {job['erro']}")
+    if not concluidos: return
+
+    relatorios = {nome: relatorio_do_job(job["id"], tipo, job["resultado"]) for nome, job in concluidos}
+    primeiro = next(iter(relatorios.values()))
+    linhas = {"Data Anvisa": {nome: r["data_cand"] for nome, r in relatorios.items()}}
+    for nome, relatorio in relatorios.items():
+        for secao in relatorio["secoes"]:
+            celula = secao["icone"] + (f" {secao['divergencias']}" if secao["divergencias"] else "")
+            if secao["ortografia"]: celula += f" ✏️{secao['ortografia']}"
+            linhas.setdefault(secao["titulo"], {})[nome] = celula
+    linhas["Divergentes"] = {nome: sum(1 for s in r["secoes"] if s["status"] != "CONFORME") for nome, r in relatorios.items()}
+
+    st.markdown("### 🧮 Seções por Candidato")
+    st.caption(f"Referência: Data Anvisa {primeiro['data_ref']} • ⚠️ n = seção divergente com n trechos marcados • ✏️ n = possíveis erros de português")
+    st.dataframe(
+        {"Seção": list(linhas), **{nome: [str(linhas[t].get(nome, "—")) for t in linhas] for nome in relatorios}},
+        hide_index=True,
+    )
+
+    st.divider()
+    escolhido = st.selectbox("🔎 Detalhar candidato", list(relatorios), key=f"{chave_sessao}_detalhe")
+    job = dict(concluidos)[escolhido]
+    renderizar(job["resultado"], job["id"])
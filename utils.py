@@ -2,7 +2,9 @@ import streamlit as st
 import json
 import os
 from datetime import datetime
-import google.generativeai as genai
+
+from memory import memoria_da_sessao
+from routing import MODELOS
 
 # --- CONFIGURAÇÕES GERAIS ---
 ARQUIVO_CONTADOR = "contador_diario.json"
@@ -79,8 +81,50 @@ def configurar_modelo_inteligente():
         st.error("Erro: Chave de API não encontrada nos secrets.")
         return None
 
+    import google.generativeai as genai  # Carga sob demanda (ver core.py)
     genai.configure(api_key=chave)
     return genai.GenerativeModel(
-        "models/gemini-1.5-flash", 
+        MODELOS["padrao"], 
         generation_config={"response_mime_type": "application/json", "temperature": 0.0}
     )
+
+# --- TEMPOS POR ETAPA (tracing.py) ---
+NOMES_ETAPAS = {
+    "extracao": "📄 Extração", "planejamento": "🗂️ Cache de seções", "prompt": "📝 Prompt",
+    "modelo": "🤖 Modelo", "json": "🧾 JSON", "diff": "🔍 Diff", "pos_processamento": "🔍 Pós-processamento",
+    "alinhamento": "🔡 Alinhamento", "ortografia": "✏️ Ortografia", "historico": "🗄️ Histórico",
+}
+
+def mostrar_tempos_sidebar(tempos, renderizacao_ms=None):
+    """Quebra de tempo da última conferência na barra lateral (opcional, desligada por padrão)."""
+    if not tempos or not st.sidebar.toggle("⏱️ Mostrar tempos por etapa", key="mostrar_tempos"):
+        return
+    etapas = [(NOMES_ETAPAS.get(e["etapa"], e["etapa"]), e["duracao_ms"]) for e in tempos.get("etapas", [])]
+    if renderizacao_ms is not None:
+        etapas.append(("🖥️ Renderização", renderizacao_ms))
+    total = sum(ms for _, ms in etapas) or 1
+    for nome, ms in etapas:
+        st.sidebar.caption(f"{nome}: **{ms / 1000:.2f} s** ({ms / total:.0%})")
+    st.sidebar.caption(f"Total: **{total / 1000:.2f} s**")
+
+    dados = tempos.get("dados", {})
+    if dados.get("rota"):
+        rota = dados["rota"]
+        st.sidebar.caption(f"🧭 Modelo: {dados.get('modelo', rota['modelo'])} • nível {rota['nivel']} ({rota['pontuacao']} pts)")
+    if dados.get("chave_usada"):
+        st.sidebar.caption(f"🔑 Chave usada: {dados['chave_usada']} • tentativas: {dados.get('tentativas', 1)}")
+    if dados.get("tokens_entrada"):
+        em_cache = f" ({dados['tokens_em_cache']} do cache de contexto)" if dados.get("tokens_em_cache") else ""
+        st.sidebar.caption(f"🔢 Tokens: {dados['tokens_entrada']} entrada{em_cache} / {dados.get('tokens_saida') or 0} saída")
+    for raster in dados.get("rasters", []):
+        st.sidebar.caption(f"🖼️ Rasterização: {raster['dpi']} dpi • {raster['reservado_mb']} MB"
+                           + (f" • {raster['em_cache']}/{raster['paginas']} página(s) do cache" if raster.get("em_cache") else "")
+                           + (" • degradada por falta de memória" if raster["degradado"] else ""))
+    for ruido in dados.get("ruido_de_pagina", []):
+        st.sidebar.caption(f"🧹 Cabeçalhos/rodapés removidos: {ruido['linhas']} linha(s), {ruido['caracteres']} caracteres")
+    if dados.get("transcricao_em_cache"):
+        st.sidebar.caption("📄 Transcrição reaproveitada: mesmas páginas já transcritas (sem chamada ao modelo)")
+    if tempos.get("memoria_pico_mb"):
+        sessao = memoria_da_sessao()
+        st.sidebar.caption(f"🧠 Memória do processo: pico {tempos['memoria_pico_mb']:.0f} MB nesta conferência • "
+                           f"{sessao['pico_residente_mb']:.0f} MB nesta sessão (rasters: pico {sessao['pico_rasters_mb']:.0f} MB)")